@@ -0,0 +1,385 @@
+"""Opt-in log of every answer submitted, with per-student reports
+
+While an AttemptLog is running, each submission checked by
+loop.QuestionLoop.ask_question is queued with the problem key, the raw
+answers, the checker's result, which try it was, and how long the student
+took. A background thread writes the queue to SQLite (in WAL mode, so
+reports can read while it writes) in batches, so the front-end never waits
+on the disk.
+
+Each batch also adds to a totals table keyed by student and by question
+type or dominance type, so reports read a handful of summed rows rather
+than scanning every attempt:
+
+    log = attempts.start('attempts.db', student='jsmith')
+    main.run()
+    log.close()
+    log.accuracy('type')
+"""
+import collections
+import getpass
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5    # seconds the writer waits to fill a batch
+MAX_QUEUED = 100000     # attempts waiting to be written before dropping
+
+GROUP_KINDS = ['type', 'dom']      # question type, dominance type
+NO_GROUP = ''
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    student TEXT NOT NULL,
+    question_type TEXT NOT NULL,
+    dom_type TEXT NOT NULL,
+    problem_key TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    correct TEXT NOT NULL,
+    num_correct INTEGER NOT NULL,
+    num_questions INTEGER NOT NULL,
+    retry INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_student ON attempts (student, time);
+CREATE INDEX IF NOT EXISTS attempts_type ON attempts (question_type, time);
+CREATE INDEX IF NOT EXISTS attempts_problem ON attempts (problem_key);
+CREATE TABLE IF NOT EXISTS totals (
+    student TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    first_tries INTEGER NOT NULL,
+    questions INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    all_correct INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (kind, value, student)
+) WITHOUT ROWID;
+"""
+
+ADD_TOTALS = """
+INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (kind, value, student) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    first_tries = first_tries + excluded.first_tries,
+    questions = questions + excluded.questions,
+    correct = correct + excluded.correct,
+    all_correct = all_correct + excluded.all_correct,
+    seconds = seconds + excluded.seconds
+"""
+
+Attempt = collections.namedtuple(
+    'Attempt', ['time', 'student', 'question_type', 'dom_type',
+                'problem_key', 'answers', 'correct', 'num_correct',
+                'num_questions', 'retry', 'seconds'])
+
+_active = None
+
+
+def connect(path):
+    """Open an attempt database, creating its tables if needed
+
+    :param path: string
+    :return: sqlite3.Connection
+    """
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def describe_problem(question_loop):
+    """Question type, dominance type, and problem key of a loop's problem
+
+    The problem is the one the loop was made for (a PunnetSet, a
+    hardy_weinberg.Question, ...); loops made without one are logged with
+    no question type. The dominance types come from the problem's traits.
+    The key is a hash of the prompt, which is the same for the same problem.
+
+    :param question_loop: loop.QuestionLoop
+    :return: (string, string, string)
+    """
+    problem = question_loop.problem
+    if problem is None:
+        question_type = NO_GROUP
+    else:
+        question_type = type(problem).__name__
+    traits = getattr(problem, 'traits', None)
+    if traits is None:
+        traits = [getattr(problem, 'trait', None)]
+    dom_type = '+'.join(sorted(trait['dom_type'] for trait in traits
+                               if isinstance(trait, dict) and
+                               'dom_type' in trait))
+    problem_key = hashlib.blake2b(question_loop.prompt.encode('utf-8'),
+                                  digest_size=8).hexdigest()
+    return question_type, dom_type or NO_GROUP, problem_key
+
+
+def record(question_loop, raw_answers, is_correct_list, seconds):
+    """Log a submission to the running AttemptLog (if any)
+
+    :param question_loop: loop.QuestionLoop
+    :param raw_answers: list of strings
+    :param is_correct_list: list of booleans
+    :param seconds: float (time the student took to answer)
+    :return: None
+    """
+    if _active is not None:
+        _active.record(question_loop, raw_answers, is_correct_list, seconds)
+
+
+def batch_totals(batch):
+    """Sum a batch of attempts into rows to add to the totals table
+
+    :param batch: list of Attempt
+    :return: list of tuples (totals columns)
+    """
+    sums = collections.defaultdict(lambda: [0, 0, 0, 0, 0, 0.0])
+    for attempt in batch:
+        for kind, value in zip(GROUP_KINDS, (attempt.question_type,
+                                             attempt.dom_type)):
+            if value == NO_GROUP:
+                continue
+            row = sums[attempt.student, kind, value]
+            row[0] += 1
+            row[1] += attempt.retry == 0
+            row[2] += attempt.num_questions
+            row[3] += attempt.num_correct
+            row[4] += attempt.num_correct == attempt.num_questions
+            row[5] += attempt.seconds
+    return [key + tuple(row) for key, row in sums.items()]
+
+
+def write_batch(connection, batch):
+    """Insert a batch of attempts and add it to the totals in one transaction
+
+    :param connection: sqlite3.Connection
+    :param batch: list of Attempt
+    :return: None
+    """
+    with connection:
+        connection.executemany(
+            'INSERT INTO attempts (time, student, question_type, dom_type, '
+            'problem_key, answers, correct, num_correct, num_questions, '
+            'retry, seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            batch)
+        connection.executemany(ADD_TOTALS, batch_totals(batch))
+
+
+class Reports(object):
+    def __init__(self, path):
+        """Instructor reports from an attempt database
+
+        :param path: string (database file)
+        """
+        self.path = path
+
+    def query(self, sql, params=()):
+        connection = connect(self.path)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def accuracy(self, kind='type', student=None):
+        """Accuracy for each question type or dominance type
+
+        :param kind: string (one of GROUP_KINDS)
+        :param student: string or None (everyone)
+        :return: list of dicts, most attempted first
+        """
+        if kind not in GROUP_KINDS:
+            raise ValueError('Kind must be one of', GROUP_KINDS)
+        where = 'kind = ?'
+        params = [kind]
+        if student is not None:
+            where += ' AND student = ?'
+            params.append(student)
+        rows = self.query(
+            'SELECT value, SUM(attempts), SUM(first_tries), SUM(questions), '
+            'SUM(correct), SUM(all_correct), SUM(seconds) FROM totals '
+            'WHERE {} GROUP BY value ORDER BY SUM(attempts) DESC'.format(
+                where), params)
+        return [{'value': value, 'attempts': attempts,
+                 'first_tries': first_tries,
+                 'accuracy': correct / questions if questions else 0.0,
+                 'all_correct_rate': all_correct / attempts,
+                 'mean_seconds': seconds / attempts}
+                for value, attempts, first_tries, questions, correct,
+                all_correct, seconds in rows]
+
+    def students(self):
+        """Attempt counts and accuracy for each student
+
+        :return: list of dicts
+        """
+        rows = self.query(
+            "SELECT student, SUM(attempts), SUM(questions), SUM(correct) "
+            "FROM totals WHERE kind = 'type' GROUP BY student "
+            "ORDER BY student")
+        return [{'student': student, 'attempts': attempts,
+                 'accuracy': correct / questions if questions else 0.0}
+                for student, attempts, questions, correct in rows]
+
+    def recent(self, student, limit=50):
+        """A student's latest attempts
+
+        :param student: string
+        :param limit: int
+        :return: list of Attempt
+        """
+        rows = self.query(
+            'SELECT time, student, question_type, dom_type, problem_key, '
+            'answers, correct, num_correct, num_questions, retry, seconds '
+            'FROM attempts WHERE student = ? ORDER BY time DESC LIMIT ?',
+            (student, limit))
+        return [Attempt(*row) for row in rows]
+
+    def rebuild_totals(self):
+        """Recompute the totals table from every attempt
+
+        :return: None
+        """
+        connection = connect(self.path)
+        try:
+            with connection:
+                connection.execute('DELETE FROM totals')
+                for kind, column in zip(GROUP_KINDS,
+                                        ('question_type', 'dom_type')):
+                    connection.execute(
+                        'INSERT INTO totals SELECT student, ?, {0}, '
+                        'COUNT(*), SUM(retry = 0), SUM(num_questions), '
+                        'SUM(num_correct), SUM(num_correct = num_questions), '
+                        'SUM(seconds) FROM attempts WHERE {0} != ? '
+                        'GROUP BY student, {0}'.format(column),
+                        (kind, NO_GROUP))
+        finally:
+            connection.close()
+
+
+class AttemptLog(Reports):
+    def __init__(self, path, student=None, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_queued=MAX_QUEUED):
+        """Write attempts to a SQLite file from a background thread
+
+        :param path: string (database file)
+        :param student: string or None (the logged in user)
+        :param batch_size: int (most attempts written per transaction)
+        :param flush_interval: float (seconds to wait for a full batch)
+        :param max_queued: int (attempts beyond this are dropped rather
+            than making the front-end wait)
+        """
+        super().__init__(path)
+        if student is None:
+            student = getpass.getuser()
+        self.student = student
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(max_queued)
+        self.dropped = 0
+        self.written = 0
+        self.last_error = None
+        connect(path).close()   # create the tables before anyone reads
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, question_loop, raw_answers, is_correct_list, seconds):
+        """Queue a submission without waiting for it to be written
+
+        :param question_loop: loop.QuestionLoop
+        :param raw_answers: list of strings
+        :param is_correct_list: list of booleans
+        :param seconds: float
+        :return: None
+        """
+        question_type, dom_type, problem_key = describe_problem(
+            question_loop)
+        correct = [bool(each) for each in is_correct_list]
+        attempt = Attempt(
+            time.time(), self.student, question_type, dom_type,
+            problem_key, json.dumps(list(raw_answers)), json.dumps(correct),
+            sum(correct[:len(question_loop.correct_answers)]),
+            len(question_loop.correct_answers),
+            getattr(question_loop, 'tries', 1) - 1, seconds)
+        try:
+            self.queue.put_nowait(attempt)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        connection = connect(self.path)
+        finished = False
+        while not finished:
+            batch = []
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            finished = item is None     # close() queues None
+            try:
+                if batch:
+                    write_batch(connection, batch)
+                    self.written += len(batch)
+            except sqlite3.Error as error:
+                self.last_error = error
+            for _ in range(len(batch) + finished):
+                self.queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """Wait until everything queued so far is written
+
+        :return: None
+        """
+        self.queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer
+
+        :return: None
+        """
+        global _active
+        if _active is self:
+            _active = None
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+def start(path, student=None, **log_args):
+    """Start logging every submission to path
+
+    :param path: string (database file)
+    :param student: string or None (the logged in user)
+    :param log_args: passed to AttemptLog
+    :return: AttemptLog
+    """
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = AttemptLog(path, student, **log_args)
+    return _active
+
+
+if __name__ == "__main__":
+    import sys
+    report = Reports(sys.argv[1])
+    print(json.dumps({'students': report.students(),
+                      'types': report.accuracy('type'),
+                      'dominance': report.accuracy('dom')}, indent=2))
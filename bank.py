@@ -0,0 +1,524 @@
+"""Fixed-width binary banks of pre-generated problems
+
+A bank file is a HEADER.size byte header followed by RECORD.size byte
+records. Each record stores indices and codes rather than text, so a bank
+of millions of problems can be opened with mmap and any problem rebuilt on
+demand.
+
+Punnet records store trait positions, so the header holds the fingerprint
+of the trait catalog they refer to. A bank only opens under a catalog with
+the same fingerprint, and keeps that catalog for decoding even if the
+catalog is reloaded while it is open.
+"""
+import bisect
+import concurrent.futures
+import json
+import mmap
+import random
+import struct
+
+import catalog
+import hardy_weinberg
+import punnet
+import registry
+
+MAGIC = b'PMBANK\x02\x00'
+
+# magic, catalog fingerprint
+HEADER = struct.Struct('<8s8s')
+
+# kind, six small fields, padding, two wide fields
+RECORD = struct.Struct('<BBBBBBBxHH')
+
+HARDY_WEINBERG = 0
+PUNNET = 1
+NO_TRAIT = 255
+
+HW_TYPES = [hardy_weinberg.GivenPorQ, hardy_weinberg.GivenPQWithPop,
+            hardy_weinberg.GivenP2orQ2, hardy_weinberg.GivenSqWithPop,
+            hardy_weinberg.GivenTwo]
+INFO_TYPES = ['geno', 'pheno', 'zygous']
+
+GENERATE_CHUNK_SIZE = 500
+
+INDEX_BLOCK_BITS = 1 << 16
+ATTRIBUTES = ['kind', 'loci_num', 'dom_types', 'mom_info', 'dad_info',
+              'question_type', 'pop_size']   # see record_attributes
+BYTE_POPCOUNT = [bin(byte).count('1') for byte in range(256)]
+
+
+def encode_problem(problem, trait_catalog=None):
+    """Convert a problem into a bank record
+
+    :param problem: hardy_weinberg.Question, punnet.PunnetSet,
+        or punnet.Configuration
+    :param trait_catalog: catalog.Catalog or None (the current one; the
+        catalog trait indices are stored for)
+    :return: tuple of ints (RECORD fields)
+    :raises ValueError: if a PunnetSet was made from a different catalog
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    if isinstance(problem, punnet.PunnetSet):
+        if problem.recombination is not None:
+            raise ValueError('Linked punnet sets cannot be stored in a bank.')
+        if problem.catalog.fingerprint != trait_catalog.fingerprint:
+            raise ValueError('Punnet set was made from a different trait '
+                             'catalog than the bank.')
+        problem = problem.configuration
+    if isinstance(problem, punnet.Configuration):
+        traits = [trait_catalog.traits[index] for index in problem.traits]
+        trait2 = problem.traits[1] if len(traits) == 2 else NO_TRAIT
+        return (PUNNET, problem.traits[0], trait2,
+                punnet.encode_genotype(problem.genotypes[0], traits),
+                punnet.encode_genotype(problem.genotypes[1], traits),
+                INFO_TYPES.index(problem.info_type[0]),
+                INFO_TYPES.index(problem.info_type[1]), 0, 0)
+    if isinstance(problem, hardy_weinberg.Question):
+        return (HARDY_WEINBERG, HW_TYPES.index(type(problem)),
+                hardy_weinberg.animals.index(problem.animal),
+                hardy_weinberg.phenotypes.index(
+                    (problem.trait_dom, problem.trait_rec)),
+                problem.term_type,
+                problem.given_options.index(problem.given), 0,
+                int(round(problem.values['p'] * 100)),
+                getattr(problem, 'pop_size', 0))
+    raise TypeError('Cannot store problem of type', type(problem))
+
+
+def decode_configuration(record, trait_catalog=None):
+    """Convert a punnet bank record into a Configuration
+
+    :param record: tuple of ints (RECORD fields)
+    :param trait_catalog: catalog.Catalog or None (the current one)
+    :return: punnet.Configuration
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    _, trait1, trait2, mom, dad, mom_info, dad_info, _, _ = record
+    if trait2 == NO_TRAIT:
+        trait_set = (trait1,)
+    else:
+        trait_set = (trait1, trait2)
+    traits = [trait_catalog.traits[index] for index in trait_set]
+    genotypes = []
+    for code in (mom, dad):
+        genotype = tuple(trait['genotypes'][locus] for trait, locus in zip(
+            traits, punnet.locus_codes(code, len(traits))))
+        if len(genotype) == 1:
+            genotype = genotype[0]
+        genotypes.append(genotype)
+    return punnet.Configuration(trait_set, tuple(genotypes),
+                                (INFO_TYPES[mom_info], INFO_TYPES[dad_info]))
+
+
+def decode_problem(record, trait_catalog=None):
+    """Build the problem stored in a bank record
+
+    :param record: tuple of ints (RECORD fields)
+    :param trait_catalog: catalog.Catalog or None (the current one)
+    :return: hardy_weinberg.Question or punnet.PunnetSet
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    if record[0] == PUNNET:
+        configuration = decode_configuration(record, trait_catalog)
+        return punnet.PunnetSet(len(configuration.traits), configuration,
+                                trait_catalog=trait_catalog)
+    if record[0] == HARDY_WEINBERG:
+        _, q_type, animal, trait, term_type, given, _, p, pop_size = record
+        question_class = HW_TYPES[q_type]
+        return question_class.from_fields(
+            animal=hardy_weinberg.animals[animal],
+            trait=hardy_weinberg.phenotypes[trait], p=p / 100,
+            term_type=term_type,
+            given=question_class.given_options[given],
+            pop_size=pop_size or None)
+    raise ValueError('Unknown problem kind in record', record)
+
+
+def record_attributes(record, trait_catalog=None):
+    """List the queryable attributes of a bank record
+
+    :param record: tuple of ints (RECORD fields)
+    :param trait_catalog: catalog.Catalog or None (the current one)
+    :return: dict {attribute name: value}
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    if record[0] == PUNNET:
+        traits = [trait_catalog.traits[index] for index in record[1:3]
+                  if index != NO_TRAIT]
+        return {'kind': 'punnet', 'loci_num': len(traits),
+                'dom_types': tuple(sorted(trait['dom_type']
+                                          for trait in traits)),
+                'mom_info': INFO_TYPES[record[5]],
+                'dad_info': INFO_TYPES[record[6]]}
+    attributes = {'kind': 'hardy-weinberg',
+                  'question_type': HW_TYPES[record[1]].__name__}
+    if record[8]:
+        attributes['pop_size'] = record[8]
+    return attributes
+
+
+def problem_from_dict(data, trait_catalog=None):
+    """Restore a problem saved with its to_dict method
+
+    :param data: dict
+    :param trait_catalog: catalog.Catalog or None (the current one)
+    :return: hardy_weinberg.Question or punnet.PunnetSet
+    :raises ValueError: if a PunnetSet was saved under a different catalog
+    """
+    if data['type'] == 'PunnetSet':
+        return punnet.PunnetSet.from_dict(data, trait_catalog)
+    return hardy_weinberg.Question.from_dict(data)
+
+
+def write_jsonl(path, problems):
+    """Stream problems into a JSON lines file, one problem per line
+
+    :param path: string (file path)
+    :param problems: iterable of hardy_weinberg.Question or punnet.PunnetSet
+    :return: int (number of problems written)
+    """
+    written = 0
+    with open(path, 'w', encoding='utf-8') as jsonl_file:
+        for problem in problems:
+            jsonl_file.write(json.dumps(problem.to_dict(),
+                                        separators=(',', ':')) + '\n')
+            written += 1
+    return written
+
+
+def read_jsonl(path, trait_catalog=None):
+    """Lazily restore the problems in a JSON lines file
+
+    :param path: string (file path)
+    :param trait_catalog: catalog.Catalog or None (the current one; the
+        whole file is read with the same catalog even if it is reloaded)
+    :return: generator of hardy_weinberg.Question or punnet.PunnetSet
+    :raises ValueError: if a PunnetSet was saved under a different catalog
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    with open(path, encoding='utf-8') as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield problem_from_dict(json.loads(line), trait_catalog)
+
+
+def random_problem(rng=random):
+    """Make one random Hardy-Weinberg or punnet problem
+
+    :param rng: random.Random or the random module
+    :return: hardy_weinberg.Question or punnet.PunnetSet
+    """
+    if rng.choice([True, False]):
+        return registry.QUESTIONS.make(['hardy-weinberg'], rng)
+    return registry.QUESTIONS.make(punnet.PROB_TYPE_TAGS['both'], rng)
+
+
+def random_problems(count, rng=random):
+    """Yield random Hardy-Weinberg and punnet problems
+
+    :param count: int
+    :param rng: random.Random or the random module
+    :return: generator of hardy_weinberg.Question or punnet.PunnetSet
+    """
+    for _ in range(count):
+        yield random_problem(rng)
+
+
+def problem_rng(seed, problem_num):
+    """Make the random stream for one problem of a generated set
+
+    Each problem has its own stream, so a problem depends only on the
+    master seed and its position, not on how the set is split up.
+
+    :param seed: string or int (master seed)
+    :param problem_num: int
+    :return: random.Random
+    """
+    return random.Random('{}-{}'.format(seed, problem_num))
+
+
+def generate_chunk(seed, start, count):
+    """Make problems start to start + count - 1 of a generated set
+
+    :param seed: string or int (master seed)
+    :param start: int
+    :param count: int
+    :return: list of dicts (see problem_from_dict)
+    """
+    return [random_problem(problem_rng(seed, problem_num)).to_dict()
+            for problem_num in range(start, start + count)]
+
+
+def generate_parallel(count, workers=None, seed=None,
+                      chunk_size=GENERATE_CHUNK_SIZE):
+    """Make count random problems across a pool of worker processes
+
+    The same seed gives the same problems for any number of workers.
+
+    :param count: int
+    :param workers: int or None (processes; 1 generates in this process)
+    :param seed: string, int, or None (master seed)
+    :param chunk_size: int (problems made per task)
+    :return: list of hardy_weinberg.Question or punnet.PunnetSet
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    starts = range(0, count, chunk_size)
+    counts = [min(chunk_size, count - start) for start in starts]
+    seeds = [seed] * len(counts)
+    if workers == 1:
+        chunks = map(generate_chunk, seeds, starts, counts)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            chunks = list(pool.map(generate_chunk, seeds, starts, counts))
+    return [problem_from_dict(data) for chunk in chunks for data in chunk]
+
+
+def write_bank(path, problems, trait_catalog=None):
+    """Stream problems into a bank file one record at a time
+
+    :param path: string (file path)
+    :param problems: iterable of problems (see encode_problem)
+    :param trait_catalog: catalog.Catalog or None (the current one)
+    :return: int (number of records written)
+    """
+    if trait_catalog is None:
+        trait_catalog = catalog.current()
+    written = 0
+    with open(path, 'wb') as bank_file:
+        bank_file.write(HEADER.pack(MAGIC, trait_catalog.fingerprint))
+        for problem in problems:
+            bank_file.write(RECORD.pack(*encode_problem(problem,
+                                                        trait_catalog)))
+            written += 1
+    return written
+
+
+class ProblemBank(object):
+    def __init__(self, path):
+        """Open a bank written under the current trait catalog
+
+        :param path: string (file path)
+        :raises ValueError: if the file is not a bank, or its trait
+            indices refer to a different catalog
+        """
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError('{} is not a problem bank.'.format(path))
+        if self.data[:len(MAGIC)] != MAGIC or len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError('{} is not a problem bank.'.format(path))
+        # decode with this catalog even if the current one is reloaded
+        self.catalog = catalog.current()
+        if HEADER.unpack_from(self.data)[1] != self.catalog.fingerprint:
+            self.close()
+            raise ValueError('{} was written with a different trait catalog.'
+                             ''.format(path))
+        self.size = (len(self.data) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return decode_problem(self.record(index), self.catalog)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, index):
+        """Read the raw fields of one record
+
+        :param index: int
+        :return: tuple of ints (RECORD fields)
+        """
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('Bank index out of range.')
+        return RECORD.unpack_from(self.data,
+                                  HEADER.size + index * RECORD.size)
+
+    def records(self):
+        """Iterate over the raw fields of every record
+
+        Each record is unpacked straight from the mapped file, without
+        copying the bank or holding on to its buffer, so the bank can be
+        closed at any time.
+
+        :return: generator of tuples of ints
+        """
+        end = HEADER.size + self.size * RECORD.size
+        for offset in range(HEADER.size, end, RECORD.size):
+            yield RECORD.unpack_from(self.data, offset)
+
+    def random_problem(self, rng=random):
+        """Build a random problem from the bank
+
+        :param rng: random.Random or the random module
+        :return: hardy_weinberg.Question or punnet.PunnetSet
+        """
+        return self[rng.randrange(self.size)]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class BankIndex(object):
+    def __init__(self, bank):
+        """Build a bitmap for every attribute value found in a bank
+
+        :param bank: ProblemBank
+        """
+        self.bank = bank
+        byte_num = (len(bank) + 7) // 8
+        bit_arrays = {}
+        seen = {}   # identical records share attributes
+        for record_num, record in enumerate(bank.records()):
+            try:
+                attributes = seen[record]
+            except KeyError:
+                attributes = seen[record] = list(
+                    record_attributes(record, bank.catalog).items())
+            for attribute in attributes:
+                try:
+                    bits = bit_arrays[attribute]
+                except KeyError:
+                    bits = bit_arrays[attribute] = bytearray(byte_num)
+                bits[record_num >> 3] |= 1 << (record_num & 7)
+        self.bitmaps = {attribute: int.from_bytes(bits, 'little')
+                        for attribute, bits in bit_arrays.items()}
+        self.all = (1 << len(bank)) - 1
+
+    def values(self, attribute):
+        """List the values found in the bank for an attribute
+
+        :param attribute: string
+        :return: list
+        """
+        return sorted(value for name, value in self.bitmaps
+                      if name == attribute)
+
+    def select(self, **criteria):
+        """Find the records matching every criterion
+
+        A criterion may be a single value or a list of accepted values. A
+        dom_types value is the dominance type of every trait, and a single
+        string stands for a one trait problem.
+        Ex: select(loci_num=2, dom_types=('co-dom', 'incomplete'),
+                   mom_info='zygous')
+
+        :param criteria: attribute name = value(s)
+        :return: Selection
+        :raises ValueError: if an attribute is not one of ATTRIBUTES
+        """
+        bitmap = self.all
+        for attribute, accepted in criteria.items():
+            if attribute not in ATTRIBUTES:
+                raise ValueError('Attribute must be one of', ATTRIBUTES)
+            if not isinstance(accepted, list):
+                accepted = [accepted]
+            matches = 0
+            for value in accepted:
+                if attribute == 'dom_types':
+                    if isinstance(value, str):
+                        value = (value,)
+                    value = tuple(sorted(value))
+                matches |= self.bitmaps.get((attribute, value), 0)
+            bitmap &= matches
+        return Selection(self.bank, bitmap)
+
+
+class Selection(object):
+    def __init__(self, bank, bitmap):
+        """Records in a bank that matched a BankIndex query
+
+        :param bank: ProblemBank
+        :param bitmap: int (bit n is set if record n matched)
+        """
+        self.bank = bank
+        self.bitmap = bitmap
+        # blocks are sliced out of the bytes, so a draw never shifts the
+        # whole bitmap
+        self.bytes = bitmap.to_bytes(
+            max(len(bank), bitmap.bit_length()) // 8 + 1, 'little')
+        self.starts = []   # first record of each block with a match
+        self.before = []   # matches in the blocks before it
+        self.size = 0
+        for start in range(0, len(bank), INDEX_BLOCK_BITS):
+            count = int.from_bytes(self.block_bytes(start),
+                                   'little').bit_count()
+            if count:
+                self.starts.append(start)
+                self.before.append(self.size)
+                self.size += count
+
+    def block_bytes(self, start):
+        """The bitmap bytes of the block starting at record start
+
+        :param start: int (a multiple of INDEX_BLOCK_BITS)
+        :return: bytes
+        """
+        return self.bytes[start // 8:(start + INDEX_BLOCK_BITS) // 8]
+
+    def __len__(self):
+        return self.size
+
+    def record_number(self, match_num):
+        """Find the bank index of the nth matching record
+
+        :param match_num: int
+        :return: int
+        """
+        if not 0 <= match_num < self.size:
+            raise IndexError('Selection index out of range.')
+        block_num = bisect.bisect_right(self.before, match_num) - 1
+        start = self.starts[block_num]
+        remaining = match_num - self.before[block_num]
+        for byte_num, byte in enumerate(self.block_bytes(start)):
+            if remaining < BYTE_POPCOUNT[byte]:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        if remaining == 0:
+                            return start + byte_num * 8 + bit
+                        remaining -= 1
+            remaining -= BYTE_POPCOUNT[byte]
+
+    def record_numbers(self):
+        """Iterate over the bank indices of every matching record
+
+        :return: generator of ints
+        """
+        for start in self.starts:
+            for byte_num, byte in enumerate(self.block_bytes(start)):
+                while byte:
+                    lowest = byte & -byte
+                    yield start + byte_num * 8 + lowest.bit_length() - 1
+                    byte ^= lowest
+
+    def sample(self, count=None, rng=random):
+        """Build random matching problems without redrawing
+
+        :param count: int or None (None returns a single problem)
+        :param rng: random.Random or the random module
+        :return: problem or list of problems
+        """
+        if count is None:
+            if not self.size:
+                raise IndexError('No problems match this selection.')
+            return self.bank[self.record_number(rng.randrange(self.size))]
+        return [self.bank[self.record_number(match_num)]
+                for match_num in rng.sample(range(self.size), count)]
@@ -0,0 +1,312 @@
+"""Headless simulated student for load and soak testing
+
+A Bot is a front-end (see frontend.py) that answers every question and
+clicks every button itself, so the whole question flow can run thousands
+of times per second without a display:
+
+    student = bot.Bot(answers='random', max_steps=100000, seed=1)
+    report = student.drive(main.run)
+
+Every answer and click is a step. A Bot records its steps as a trace, and
+Bot(trace=old_bot.trace) replays them exactly, raising ReplayError if the
+program asks for something different than it did the first time. Replay
+a target that makes its own problems (main.run, hardy_weinberg.run, ...),
+since problems are only reproducible once drive() has seeded random. Pass
+record=False for soak runs, so the trace does not count as memory growth.
+"""
+import collections
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+import frontend
+import loop
+import watchdog
+
+ANSWER_MODES = ['correct', 'wrong', 'random']
+
+BUTTON_WEIGHTS = {'New Question': 6, 'Try Again': 2, 'Show Answers': 1,
+                  'Show Solution': 1, 'Main Menu': 0.2, 'Exit Program': 0,
+                  'Exit': 0}
+FINISH_BUTTONS = ['Exit Program', 'Exit', 'Main Menu']
+
+WRONG_ANSWER = '?'
+
+MEMORY_SAMPLES = 100    # tracemalloc readings kept per run
+
+
+class ReplayError(Exception):
+    pass
+
+
+class QuestionLoop(loop.QuestionLoop):
+    bot = None      # set by Bot.QuestionLoop
+
+    def get_answers(self, old_answers, old_correct_list):
+        return self.bot.answer(self.correct_answers)
+
+    def display_correct_window(self):
+        return self.bot.click(self.correct_buttons())
+
+    def display_incorrect_window(self, is_correct_list):
+        self.incorrect_message(is_correct_list)
+        return self.bot.click(['Try Again', 'Show Answers', 'Show Solution',
+                               'Main Menu'])
+
+    def show_answers(self, correct_answers, raw_answers, is_correct_list):
+        self.corrected_answers(correct_answers, raw_answers, is_correct_list)
+        return self.bot.click(self.correct_buttons())
+
+    def show_solution(self):
+        return self.bot.click(['New Question', 'Main Menu'])
+
+
+class RadioLoop(loop.RadioLoop, QuestionLoop):
+    def get_answers(self, old_answers, old_correct_list):
+        return self.bot.answer(self.correct_answers, self.choices)
+
+
+class SimpleWindow(object):
+    def __init__(self, bot, title='', msg='', buttons=None):
+        if buttons is None:
+            buttons = ['Okay']
+        self.bot = bot
+        self.title = title
+        self.msg = msg
+        self.buttons = buttons
+        self.clicked = None
+
+    def run(self):
+        self.clicked = self.bot.click(self.buttons)
+
+
+class Bot(object):
+    def __init__(self, answers='random', buttons=None, max_steps=1000,
+                 seed=None, record=True, trace=None, on_screen=None):
+        """A scripted student that can stand in for a front-end
+
+        :param answers: string ('correct', 'wrong', or 'random': each
+            answer is right or wrong by a coin flip)
+        :param buttons: dict {button name: weight} (defaults to
+            BUTTON_WEIGHTS; buttons not listed have weight 1)
+        :param max_steps: int (after this many steps the bot heads for
+            the exit)
+        :param seed: int, string, or None (seeds the problems and the bot)
+        :param record: bool (keep a trace of every step)
+        :param trace: dict (a trace to replay; overrides the other
+            arguments)
+        :param on_screen: function or None (called after every step;
+            defaults to watchdog.screen_shown)
+        """
+        if trace is not None:
+            answers = trace['answers']
+            max_steps = trace['max_steps']
+            seed = trace['seed']
+        if answers not in ANSWER_MODES:
+            raise ValueError('Answers must be one of', ANSWER_MODES)
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.answer_mode = answers
+        self.button_weights = dict(BUTTON_WEIGHTS)
+        self.button_weights.update(buttons or {})
+        self.max_steps = max_steps
+        self.seed = seed
+        self.record = record
+        self.replay_steps = None if trace is None else trace['steps']
+        if on_screen is None:
+            on_screen = watchdog.screen_shown
+        self.on_screen = on_screen
+        self.reset()
+
+    def reset(self):
+        self.rng = random.Random(self.seed)
+        self.steps = 0
+        self.steps_taken = []
+        self.outcomes = collections.Counter()
+        self.latencies = collections.Counter()   # log2 microsecond buckets
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.memory = []
+        self.memory_every = max(self.max_steps // MEMORY_SAMPLES, 1)
+        self.last_step_time = None
+
+    @property
+    def trace(self):
+        """Everything needed to replay this run
+
+        :return: dict
+        """
+        return {'answers': self.answer_mode, 'max_steps': self.max_steps,
+                'seed': self.seed, 'steps': list(self.steps_taken)}
+
+    # region front-end
+    def QuestionLoop(self, *args, **kwargs):
+        the_loop = QuestionLoop(*args, **kwargs)
+        the_loop.bot = self
+        return the_loop
+
+    def RadioLoop(self, *args, **kwargs):
+        the_loop = RadioLoop(*args, **kwargs)
+        the_loop.bot = self
+        return the_loop
+
+    def SimpleWindow(self, title='', msg='', buttons=None):
+        return SimpleWindow(self, title, msg, buttons)
+    # endregion
+
+    # region decisions
+    def answer(self, correct_answers, choices=None):
+        """Answer a question right or wrong according to the answer mode
+
+        :param correct_answers: list
+        :param choices: list of lists of strings (for radio questions)
+        :return: list of strings
+        """
+        answers = []
+        for num, correct in enumerate(correct_answers):
+            if self.answer_mode == 'random':
+                right = self.rng.random() < 0.5
+            else:
+                right = self.answer_mode == 'correct'
+            if right:
+                answers.append(str(correct))
+            elif choices:
+                wrong = [x for x in choices[num] if x != correct]
+                answers.append(self.rng.choice(wrong) if wrong
+                               else WRONG_ANSWER)
+            else:
+                answers.append(WRONG_ANSWER)
+        return self.step('answer', len(correct_answers), answers)
+
+    def click(self, buttons):
+        """Pick a button by weight, or head for the exit once done
+
+        :param buttons: list of strings
+        :return: string (button name)
+        """
+        if self.steps >= self.max_steps:
+            choice = next((x for x in FINISH_BUTTONS if x in buttons),
+                          buttons[-1])
+        else:
+            weights = [self.button_weights.get(x, 1) for x in buttons]
+            if sum(weights) > 0:
+                choice = self.rng.choices(buttons, weights)[0]
+            else:
+                choice = self.rng.choice(buttons)
+        choice = self.step('click', list(buttons), choice)
+        self.outcomes[choice] += 1
+        return choice
+
+    def step(self, kind, context, action):
+        """Record (or replay) one step and time the program between steps
+
+        :param kind: string ('answer' or 'click')
+        :param context: int or list (what the program asked for)
+        :param action: list of strings or string (the bot's response)
+        :return: the action taken
+        """
+        now = time.perf_counter()
+        if self.last_step_time is not None:
+            self.add_latency(now - self.last_step_time)
+
+        if self.replay_steps is not None:
+            if self.steps >= len(self.replay_steps):
+                raise ReplayError('Trace ended after', self.steps, 'steps')
+            old_kind, old_context, action = self.replay_steps[self.steps]
+            if (old_kind, old_context) != (kind, context):
+                raise ReplayError('Step', self.steps, 'expected',
+                                  (old_kind, old_context), 'got',
+                                  (kind, context))
+        if self.record:
+            self.steps_taken.append([kind, context, action])
+        self.steps += 1
+        self.on_screen()
+        if tracemalloc.is_tracing() and self.steps % self.memory_every == 0:
+            self.memory.append((self.steps,
+                                tracemalloc.get_traced_memory()[0]))
+        self.last_step_time = time.perf_counter()
+        return action
+
+    def add_latency(self, seconds):
+        self.latency_total += seconds
+        self.latency_max = max(self.latency_max, seconds)
+        micro = seconds * 1e6
+        self.latencies[int(math.log2(micro)) + 1 if micro >= 1 else 0] += 1
+    # endregion
+
+    # region reporting
+    def latency_percentile(self, fraction):
+        """Approximate latency percentile from the log2 histogram
+
+        :param fraction: float (0.5 for the median)
+        :return: float (seconds, upper edge of the bucket)
+        """
+        wanted = fraction * sum(self.latencies.values())
+        seen = 0
+        for bucket in sorted(self.latencies):
+            seen += self.latencies[bucket]
+            if seen >= wanted:
+                return 2 ** bucket / 1e6
+        return 0.0
+
+    def report(self, seconds):
+        """Summarize a run
+
+        :param seconds: float (wall time of the run)
+        :return: dict
+        """
+        timed = sum(self.latencies.values())
+        result = {'steps': self.steps, 'seconds': seconds,
+                  'steps_per_second': self.steps / seconds if seconds else 0,
+                  'latency': {'mean': (self.latency_total / timed
+                                       if timed else 0.0),
+                              'p50': self.latency_percentile(0.5),
+                              'p95': self.latency_percentile(0.95),
+                              'p99': self.latency_percentile(0.99),
+                              'max': self.latency_max},
+                  'clicks': dict(self.outcomes)}
+        if len(self.memory) >= 2:
+            (first_step, first), (last_step, last) = self.memory[0], \
+                self.memory[-1]
+            growth = (last - first) * 1000 / (last_step - first_step)
+            result['memory'] = {'start': first, 'end': last,
+                                'peak': max(x[1] for x in self.memory),
+                                'growth_per_1000_steps': growth}
+        return result
+    # endregion
+
+    def drive(self, target, *args, trace_memory=True):
+        """Run target with this bot as the front-end
+
+        :param target: function (main.run, hardy_weinberg.run,
+            punnet.ask_questions, PunnetSet.ask, ...)
+        :param args: passed to target
+        :param trace_memory: bool (sample memory with tracemalloc)
+        :return: dict (see report)
+        """
+        self.reset()
+        random.seed(self.seed)
+        previous = frontend.chosen()
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        frontend.use(self)
+        start = time.perf_counter()
+        try:
+            target(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            frontend.use(previous)
+            if started_tracing:
+                tracemalloc.stop()
+        return self.report(seconds)
+
+
+if __name__ == "__main__":
+    import json
+    import main
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print(json.dumps(Bot(max_steps=steps, record=False).drive(main.run),
+                     indent=2))
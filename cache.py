@@ -0,0 +1,164 @@
+"""Bounded caches shared by the problem modules
+
+SOLUTIONS holds solution text and GRADES holds checker results, both keyed
+by a canonical problem key (the values that the text or result depends on)
+rather than by problem instance, so identical problems share entries.
+Server processes can change their size limits with resize_caches().
+"""
+import collections
+import functools
+import threading
+
+SOLUTION_CACHE_SIZE = 4096
+GRADE_CACHE_SIZE = 16384
+
+
+class LRUCache(object):
+    def __init__(self, max_size=128):
+        """A size-bounded, thread-safe least recently used cache
+
+        :param max_size: int (most items kept before the oldest is dropped)
+        """
+        if max_size < 1:
+            raise ValueError('Cache size must be at least 1.')
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        """Return the cached value for key and mark it as recently used
+
+        :param key: hashable
+        :param default: returned when key is not cached
+        :return: cached value or default
+        """
+        with self.lock:
+            try:
+                value = self.items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, dropping the least recently used items
+
+        :param key: hashable
+        :param value: anything
+        :return: None
+        """
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def get_or_make(self, key, make):
+        """Return the cached value for key, calling make() on a miss
+
+        :param key: hashable
+        :param make: function with no arguments
+        :return: cached or new value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = make()
+            self.put(key, value)
+        return value
+
+    def resize(self, max_size):
+        """Change the size limit, dropping items if needed
+
+        :param max_size: int
+        :return: None
+        """
+        if max_size < 1:
+            raise ValueError('Cache size must be at least 1.')
+        with self.lock:
+            self.max_size = max_size
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def hit_rate(self):
+        """Fraction of lookups that were found in the cache
+
+        :return: float
+        """
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
+
+    def stats(self):
+        """Summarize cache use
+
+        :return: dict
+        """
+        return {'size': len(self.items), 'max_size': self.max_size,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate()}
+
+
+SOLUTIONS = LRUCache(SOLUTION_CACHE_SIZE)
+GRADES = LRUCache(GRADE_CACHE_SIZE)
+
+
+def cached_method(the_cache, key, copy=None):
+    """Decorate a method to keep its results in the_cache
+
+    :param the_cache: LRUCache
+    :param key: function(self, *args) returning a hashable canonical key
+    :param copy: function or None (applied to each returned result, so
+        callers cannot change a cached list; results are stored as tuples)
+    :return: decorator
+    """
+    def decorate(method):
+        name = method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            if copy is None:
+                return the_cache.get_or_make(
+                    (name, key(self, *args)), lambda: method(self, *args))
+            return copy(the_cache.get_or_make(
+                (name, key(self, *args)), lambda: tuple(method(self, *args))))
+        return wrapper
+    return decorate
+
+
+def resize_caches(solutions=None, grades=None):
+    """Change the size limits of the shared caches
+
+    :param solutions: int or None (keep the current limit)
+    :param grades: int or None (keep the current limit)
+    :return: None
+    """
+    if solutions is not None:
+        SOLUTIONS.resize(solutions)
+    if grades is not None:
+        GRADES.resize(grades)
+
+
+def cache_stats():
+    """Summarize use of the shared caches
+
+    :return: dict {'solutions': dict, 'grades': dict}
+    """
+    return {'solutions': SOLUTIONS.stats(), 'grades': GRADES.stats()}
@@ -0,0 +1,315 @@
+"""Hot reloading of the punnet trait catalog
+
+A Catalog is an unchanging snapshot of the traits and everything worked
+out from them: which traits can be paired, where each trait sits in the
+list, and (lazily) the offspring ratios of every cross for each set of
+traits.
+A new Catalog only converts the traits that changed and copies everything
+else from the one before. swap() replaces the current Catalog in a single
+assignment, and a PunnetSet keeps the Catalog it was made with, so problems
+in progress are unaffected by a reload.
+
+A CatalogWatcher polls a JSON file holding a list of [name, phenotypes]
+entries (the format of punnet.TRAIT_SOURCE) and swaps in a new Catalog
+whenever the file changes. Traits are identified by position, so files
+that store positions (banks and saved PunnetSets) also store the catalog's
+fingerprint and are only read back under the same catalog.
+"""
+import hashlib
+import json
+import os
+import threading
+
+WATCH_INTERVAL = 1.0    # seconds between checks of the catalog file
+
+_current = None
+_lock = threading.Lock()
+
+
+def entry_key(entry):
+    """Hashable form of a catalog entry, for comparing versions
+
+    :param entry: [name, {genotype: phenotype}]
+    :return: tuple
+    """
+    name, pheno_dict = entry
+    return name, tuple(sorted(pheno_dict.items()))
+
+
+def fingerprint_entries(entries):
+    """Short hash identifying a whole catalog, for files that store indices
+
+    :param entries: list of entry_key tuples
+    :return: bytes (8 long)
+    """
+    return hashlib.blake2b(json.dumps(entries).encode('utf-8'),
+                           digest_size=8).digest()
+
+
+class Catalog(object):
+    def __init__(self, entries, previous=None, traits=None):
+        """Convert a trait list, reusing what previous already worked out
+
+        :param entries: list of [name, {genotype: phenotype}]
+        :param previous: Catalog or None
+        :param traits: list of trait dictionaries or None (already
+            converted from entries)
+        :raises ValueError: if a changed entry is not a valid trait (see
+            punnet.convert_traits)
+        """
+        import punnet
+        self.entries = [entry_key(entry) for entry in entries]
+        self.fingerprint = fingerprint_entries(self.entries)
+        if previous is None:
+            previous_entries = []
+            self.version = 0
+        else:
+            previous_entries = previous.entries
+            self.version = previous.version + 1
+        self.changed = frozenset(
+            index for index in range(max(len(self.entries),
+                                         len(previous_entries)))
+            if index >= len(self.entries) or index >= len(previous_entries) or
+            self.entries[index] != previous_entries[index])
+
+        if traits is None:
+            traits = [previous.traits[index] if index not in self.changed
+                      else punnet.convert_traits([entry])[0]
+                      for index, entry in enumerate(entries)]
+        self.traits = traits
+        self.positions = {id(trait): index
+                          for index, trait in enumerate(self.traits)}
+        self.partners = self.find_partners(previous)
+        self._crosses = {}
+        if previous is not None:
+            self._crosses = {trait_set: crosses for trait_set, crosses
+                             in previous._crosses.items()
+                             if self.changed.isdisjoint(trait_set)}
+
+    def find_partners(self, previous):
+        """List the traits each trait can be paired with
+
+        :param previous: Catalog or None
+        :return: list of tuples of ints
+        """
+        import punnet
+        partners = []
+        for index, trait in enumerate(self.traits):
+            if previous is None or index in self.changed:
+                others = range(len(self.traits))
+            else:
+                # only pairings with changed traits can differ
+                kept = [other for other in previous.partners[index]
+                        if other not in self.changed]
+                others = kept + [other for other in self.changed
+                                 if other < len(self.traits)]
+            partners.append(tuple(sorted(
+                other for other in set(others) if other != index and
+                punnet.can_pair(trait, self.traits[other]))))
+        return partners
+
+    def index(self, trait):
+        """Position of a trait in this catalog
+
+        :param trait: trait dictionary (one of traits)
+        :return: int
+        :raises ValueError: if trait is not from this catalog
+        """
+        try:
+            return self.positions[id(trait)]
+        except KeyError:
+            raise ValueError('Trait is not in this catalog:', trait['name'])
+
+    def trait_key(self, trait_set):
+        """Hashable form of a set of traits that survives reloads
+
+        :param trait_set: tuple of ints (indices into traits)
+        :return: tuple of entries
+        """
+        return tuple(self.entries[index] for index in trait_set)
+
+    def trait_sets(self):
+        """Every single trait, and every ordered pair that can be crossed
+
+        :return: list of tuples of ints
+        """
+        return ([(index,) for index in range(len(self.traits))] +
+                [(index, other) for index in range(len(self.traits))
+                 for other in self.partners[index]])
+
+    def crosses(self, trait_set):
+        """Offspring ratios of every cross for a set of traits
+
+        Worked out on first use, and kept by later Catalogs as long as none
+        of the traits change.
+
+        :param trait_set: tuple of ints (indices into traits)
+        :return: dict {(kind, ratio): frozenset of (mom code, dad code)}
+            (see inverse.ratio_key)
+        """
+        crosses = self._crosses.get(trait_set)
+        if crosses is None:
+            import inverse
+            crosses = inverse.build_crosses(
+                [self.traits[index] for index in trait_set])
+            self._crosses[trait_set] = crosses
+        return crosses
+
+    def to_entries(self):
+        """The catalog as a JSON-ready list, as read by load_entries
+
+        :return: list of [name, {genotype: phenotype}]
+        """
+        return [[name, dict(phenos)] for name, phenos in self.entries]
+
+
+def current():
+    """Return the current Catalog, building it from punnet on first use
+
+    :return: Catalog
+    """
+    global _current
+    if _current is None:
+        import punnet
+        with _lock:
+            if _current is None:
+                _current = Catalog(punnet.TRAIT_SOURCE, traits=punnet.TRAITS)
+    return _current
+
+
+def swap(new_catalog):
+    """Make new_catalog the current Catalog
+
+    :param new_catalog: Catalog
+    :return: Catalog (the one replaced)
+    """
+    global _current
+    import punnet
+    with _lock:
+        old, _current = _current, new_catalog
+        punnet.TRAITS = new_catalog.traits
+    return old
+
+
+def valid_entry(entry):
+    """Check that an entry has the types punnet.convert_traits expects
+
+    :param entry: anything read from a catalog file
+    :return: boolean
+    """
+    if not (isinstance(entry, list) and len(entry) == 2):
+        return False
+    name, pheno_dict = entry
+    return (isinstance(name, str) and isinstance(pheno_dict, dict) and
+            bool(pheno_dict) and
+            all(isinstance(genotype, str) and genotype and
+                isinstance(phenotype, str)
+                for genotype, phenotype in pheno_dict.items()))
+
+
+def load_entries(path):
+    """Read catalog entries from a JSON file
+
+    :param path: string
+    :return: list of [name, {genotype: phenotype}]
+    :raises ValueError: if the file is not a list of valid entries
+    """
+    with open(path, encoding='utf-8') as catalog_file:
+        entries = json.load(catalog_file)
+    if not isinstance(entries, list) or not all(
+            valid_entry(entry) for entry in entries):
+        raise ValueError('A catalog must be a list of [name, {genotype: '
+                         'phenotype}] with string names and phenotypes.')
+    return entries
+
+
+def write_entries(path, the_catalog=None):
+    """Write a catalog to a JSON file that a CatalogWatcher can watch
+
+    :param path: string
+    :param the_catalog: Catalog or None (the current one)
+    :return: None
+    """
+    if the_catalog is None:
+        the_catalog = current()
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as catalog_file:
+        json.dump(the_catalog.to_entries(), catalog_file, indent=1)
+    os.replace(temp_path, path)
+
+
+def reload(path):
+    """Load a catalog file and swap it in if it is valid
+
+    :param path: string
+    :return: Catalog (the new current Catalog)
+    :raises ValueError, OSError: if the file cannot be used; the current
+        Catalog is kept
+    """
+    new_catalog = Catalog(load_entries(path), previous=current())
+    swap(new_catalog)
+    return new_catalog
+
+
+class CatalogWatcher(object):
+    def __init__(self, path, interval=WATCH_INTERVAL):
+        """Reload the trait catalog whenever a file changes
+
+        :param path: string (JSON catalog file)
+        :param interval: float (seconds between checks)
+        """
+        self.path = path
+        self.interval = interval
+        self.last_stamp = None
+        self.last_error = None
+        self.reloads = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self):
+        """Reload once if the file changed since the last check
+
+        :return: boolean (whether a new Catalog was swapped in)
+        """
+        try:
+            stamp = self.stamp()
+        except OSError as error:
+            self.last_error = error
+            return False
+        if stamp == self.last_stamp:
+            return False
+        self.last_stamp = stamp
+        try:
+            reload(self.path)
+        except Exception as error:
+            # whatever is wrong with the file, keep the old catalog and
+            # keep watching
+            self.last_error = error
+            return False
+        self.last_error = None
+        self.reloads += 1
+        return True
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.check()
+            self.stopping.wait(self.interval)
+
+    def start(self):
+        """Check the file in a background thread until stop()
+
+        :return: None
+        """
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,62 @@
+"""Pick the user interface that questions are displayed with
+
+Problem modules ask frontend.current() for QuestionLoop, RadioLoop, and
+SimpleWindow instead of importing gui, so the Tk front-end (and tkinter
+and PIL) is only loaded when it is actually used.
+
+A front-end is any module or object providing:
+    QuestionLoop(title, prompt, questions, correct_answers, solution, ...)
+        a loop.QuestionLoop whose main_loop() returns the button clicked
+    RadioLoop(title, prompt, questions, correct_answers, solution,
+              choices, ...)
+        the same, answered by picking one of choices per question
+    SimpleWindow(title, msg, buttons)
+        with run(), after which .clicked holds the button name
+
+A bot.Bot is a front-end object too, but it has no module-level default:
+select it with Bot.drive(), which passes the instance to use().
+"""
+import importlib
+
+FRONTENDS = {'gui': 'gui', 'tui': 'tui'}
+
+_name = 'gui'
+_module = None
+
+
+def use(name):
+    """Choose the front-end used from now on
+
+    :param name: string (a key of FRONTENDS) or a front-end object
+    :return: None
+    """
+    global _name, _module
+    if not isinstance(name, str):
+        _name = None
+        _module = name
+        return
+    if name not in FRONTENDS:
+        raise ValueError('Front-end must be one of', sorted(FRONTENDS))
+    _name = name
+    _module = None
+
+
+def chosen():
+    """Return what was last passed to use(), to restore it later
+
+    :return: string or front-end object
+    """
+    if _name is None:
+        return _module
+    return _name
+
+
+def current():
+    """Return the module of the chosen front-end, importing it if needed
+
+    :return: module (with QuestionLoop, RadioLoop, and SimpleWindow)
+    """
+    global _module
+    if _module is None:
+        _module = importlib.import_module(FRONTENDS[_name])
+    return _module
@@ -1,5 +1,10 @@
+import concurrent.futures
 import tkinter
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageFont, ImageTk
+
+import cache
+import loop
+import watchdog
 
 
 BOX_TITLE = "BZ 111 Quiz Program"
@@ -8,6 +13,8 @@ DEFAULT_FONT = "Helvetica 11"
 
 NUMBERS = tuple(range(0, 100))
 
+SQUARE_CACHE_SIZE = 64
+
 
 def longest_line(string_list):
     """Return the length of the longest line in list
@@ -20,61 +27,94 @@ def longest_line(string_list):
     return max([len(line) for line in line_list])
 
 
-class QuestionLoop(object):
-    def __init__(self, title, prompt, questions, correct_answers, solution,
-                 solution_table=None, checker=None):
-        self.title = title
-        self.prompt = prompt
-        self.questions = questions
-        self.correct_answers = correct_answers
-        self.solution = solution
-        self.solution_table = solution_table
+def render_table(nested_list, pad=6):
+    """Draw a table (such as a punnet square) as a single image
 
-        if checker is None:
-            checker = self.default_checker
-        self.answer_checker = checker
+    :param nested_list: list of lists of strings (first row and column are
+        headers)
+    :param pad: int padding around each cell
+    :return: PIL.Image
+    """
+    font = ImageFont.load_default()
+    scratch = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+    sizes = [[scratch.multiline_textbbox((0, 0), cell, font=font)[2:]
+              for cell in row] for row in nested_list]
+    widths = [max(row[col_num][0] for row in sizes) + 2 * pad
+              for col_num in range(len(sizes[0]))]
+    heights = [max(height for _, height in row) + 2 * pad for row in sizes]
+
+    image = Image.new('RGB', (sum(widths) + 1, sum(heights) + 1), 'white')
+    draw = ImageDraw.Draw(image)
+    top = 0
+    for row_num, row in enumerate(nested_list):
+        left = 0
+        for col_num, cell in enumerate(row):
+            if row_num != 0 and col_num != 0:
+                draw.rectangle((left, top, left + widths[col_num],
+                                top + heights[row_num]), outline='gray')
+            width, height = sizes[row_num][col_num]
+            draw.multiline_text(
+                (left + (widths[col_num] - width) // 2,
+                 top + (heights[row_num] - height) // 2),
+                cell, fill='black', font=font, align='center')
+            left += widths[col_num]
+        top += heights[row_num]
+    return image
+
+
+class SquareImages(object):
+    def __init__(self, max_size=SQUARE_CACHE_SIZE):
+        """Render tables to images on a worker thread and keep the newest
+
+        :param max_size: int (most images kept)
+        """
+        self.cache = cache.LRUCache(max_size)
+        self.worker = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
-    def default_checker(self, raw_answers):
-        """Compare raw_answers to correct answers
+    def request(self, key, table):
+        """Start rendering table unless an image for key is cached
 
-        :param raw_answers: list of strings (user answers)
-        :return: list of booleans
+        :param key: hashable problem key
+        :param table: list of lists of strings
+        :return: concurrent.futures.Future (result is a PIL.Image)
         """
-        formatted_answers = [x.strip().lower() for x in raw_answers]
-        result = [user == correct for user, correct
-                  in zip(formatted_answers, self.correct_answers)]
-        len_diff = len(self.correct_answers) - len(formatted_answers)
-        if len_diff > 0:
-            for _ in range(len_diff):
-                result.append(False)
-        return result
-
-    def ask_question(self, old_answers, old_correct_list):
-        """Display the question and request a user response
-
-        :param old_answers: list of strings
-        :param old_correct_list: list of booleans
-        :return: (list of strings, list of booleans)
+        return self.cache.get_or_make(
+            key, lambda: self.worker.submit(render_table, table))
+
+    def get(self, key, table):
+        """Return the image for key, waiting for it to render if needed
+
+        :param key: hashable problem key
+        :param table: list of lists of strings
+        :return: PIL.Image
         """
+        return self.request(key, table).result()
+
+
+SQUARE_IMAGES = SquareImages()
+
+
+class QuestionLoop(loop.QuestionLoop):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.solution_table and self.solution_key is not None:
+            SQUARE_IMAGES.request(self.solution_key, self.solution_table)
+
+    def get_answers(self, old_answers, old_correct_list):
         the_question = EntryQuestion(title=self.title, msg=self.prompt,
                                      questions=self.questions,
                                      default_entry=old_answers,
                                      colors=old_correct_list)
         the_question.run()
-        raw_answers = the_question.user_entries
-        is_correct_list = self.answer_checker(raw_answers)
-        return raw_answers, is_correct_list
+        return the_question.user_entries
 
     def display_correct_window(self):
         """Display the correct answers including user's wrong answers
 
         :return: Window
         """
-        all_buttons = ['New Question', 'Show Solution', 'Main Menu']
-        if self.solution is None:
-            all_buttons.remove('Show Solution')
         window = SimpleWindow(self.title, msg="That's right!",
-                              buttons=all_buttons)
+                              buttons=self.correct_buttons())
         window.run()
         return window.clicked
 
@@ -84,13 +124,10 @@ class QuestionLoop(object):
         :param is_correct_list: list of booleans
         :return: Window
         """
-        correct_num = sum(is_correct_list)
-        tried_num = len(self.correct_answers)
-        if correct_num == tried_num:
-            correct_num -= 1  # -1 credit if given extra answers
-        window = SimpleWindow(self.title, msg='{} of {} correct.'.format(
-            correct_num, tried_num), buttons=['Try Again', 'Show Answers',
-                                              'Show Solution', 'Main Menu'])
+        window = SimpleWindow(self.title,
+                              msg=self.incorrect_message(is_correct_list),
+                              buttons=['Try Again', 'Show Answers',
+                                       'Show Solution', 'Main Menu'])
         window.run()
         return window.clicked
 
@@ -102,20 +139,15 @@ class QuestionLoop(object):
         :param is_correct_list: list of booleans
         :return: Window
         """
-        corrected_answers = [real if is_correct
-                             else '{} ({})'.format(real, user)
-                             for real, user, is_correct in
-                             zip(correct_answers, raw_answers,
-                                 is_correct_list)]
-        all_buttons = ['New Question', 'Show Solution', 'Main Menu']
-        if self.solution is None:
-            all_buttons.remove('Show Solution')
+        corrected_answers = self.corrected_answers(
+            correct_answers, raw_answers, is_correct_list)
         window = EntryQuestion(title=self.title, questions=self.questions,
                                msg=('{}\n\nCorrect answer (Your answer)\n'
                                     ''.format(self.prompt)),
                                default_entry=corrected_answers,
                                colors=is_correct_list,
-                               buttons=all_buttons, is_disabled=True)
+                               buttons=self.correct_buttons(),
+                               is_disabled=True)
         window.run()
         return window.clicked
 
@@ -125,8 +157,13 @@ class QuestionLoop(object):
         :return: Window
         """
         buttons = ['New Question', 'Main Menu']
-        message = ('{}\n\n{}'.format(self.prompt, self.solution))
-        if self.solution_table:
+        message = ('{}\n\n{}'.format(self.prompt, self.solution_text()))
+        if self.solution_table and self.solution_key is not None:
+            image = SQUARE_IMAGES.get(self.solution_key, self.solution_table)
+            window = TableWindow(title=self.title, buttons=buttons,
+                                 msg=message, table=self.solution_table,
+                                 image=image)
+        elif self.solution_table:
             window = TableWindow(title=self.title, buttons=buttons,
                                  msg=message, table=self.solution_table)
         else:
@@ -135,53 +172,16 @@ class QuestionLoop(object):
         window.run()
         return window.clicked
 
-    def main_loop(self, old_answers=None, old_correct_list=None):
-        """Display the question, solution, and answer as requested by the user
 
-        :param old_answers: list of strings: user's previous answers
-        :param old_correct_list: list of booleans: if old answers were correct
-        :return: string): user-response
-        """
-        if old_answers is None:
-            old_answers = []
-        if old_correct_list is None:
-            old_correct_list = []
-        raw_answers, is_correct_list = self.ask_question(old_answers,
-                                                         old_correct_list)
-
-        if sum(is_correct_list) == len(self.correct_answers):
-            user_response = self.display_correct_window()
-        else:
-            user_response = self.display_incorrect_window(is_correct_list)
-            if user_response == 'Try Again':
-                self.main_loop(raw_answers, is_correct_list)
-        if user_response == 'Show Answers':
-            user_response = self.show_answers(self.correct_answers,
-                                              raw_answers, is_correct_list)
-        if user_response == 'Show Solution':
-            user_response = self.show_solution()
-        return user_response
-
-
-class RadioLoop(QuestionLoop):
-    def __init__(self, title, prompt, questions, correct_answers, solution,
-                 choices, solution_table=None, checker=None):
-        super().__init__(title, prompt, questions, correct_answers, solution,
-                         solution_table, checker)
-        if type(choices[0]) is not list:
-            raise TypeError('Choices must be a nested list, not', choices)
-        self.choices = choices
-
-    def ask_question(self, old_answers, old_correct_list):
+class RadioLoop(loop.RadioLoop, QuestionLoop):
+    def get_answers(self, old_answers, old_correct_list):
         the_question = RadioQuestion(title=self.title, msg=self.prompt,
                                      questions=self.questions,
                                      default_entry=old_answers,
                                      colors=old_correct_list,
                                      choices=self.choices)
         the_question.run()
-        raw_answers = the_question.user_entries
-        is_correct_list = self.answer_checker(raw_answers)
-        return raw_answers, is_correct_list
+        return the_question.user_entries
 
 
 class Window(object):
@@ -194,6 +194,7 @@ class Window(object):
         self.window = self.scroll_window()
         self.clicked = None
         self.images = []
+        watchdog.screen_shown(self)
 
     def scroll_window(self):
         """Create a frame with a scroll bar
@@ -262,6 +263,17 @@ class Window(object):
         self.images.append(pic)
         return pic
 
+    def make_image(self, location, image):
+        """Create a Label showing an image
+
+        :param location: tkinter.Frame or tkinter.Tk
+        :param image: PIL.Image or string (path to an image file)
+        :return: tkinter.Label
+        """
+        if isinstance(image, str):
+            image = Image.open(image)
+        return tkinter.Label(location, image=self.to_ImageTk(image))
+
     @staticmethod
     def make_spacer(location, height=1, width=1):
         space = tkinter.Label(location, text='', font='Helvetica 1',
@@ -275,7 +287,15 @@ class Window(object):
         :return: None
         """
         self.clicked = button_name
+        self.close()
+
+    def close(self):
+        """Destroy the window and let go of its images
+
+        :return: None
+        """
         self.root.destroy()
+        self.images.clear()
 
     def configure_canvas(self):
         """Calculate and implement proper scrolling area.
@@ -311,12 +331,15 @@ class SimpleWindow(Window):
 
 
 class TableWindow(Window):
-    def __init__(self, table, title='', msg='', buttons=None):
+    def __init__(self, table, title='', msg='', buttons=None, image=None):
         super().__init__(title)
         if buttons is None:
             buttons = ['Okay']
         self.make_text(self.window, msg).pack()
-        self.make_table(self.window, table).pack()
+        if image is not None:
+            self.make_image(self.window, image).pack()
+        else:
+            self.make_table(self.window, table).pack()
         self.make_buttons(self.window, buttons).pack()
 
     @staticmethod
@@ -401,7 +424,7 @@ class EntryQuestion(Window):
 
     def submit(self):
         self.user_entries = [x.get() for x in self.entries]
-        self.root.destroy()
+        self.close()
 
 
 class RadioQuestion(Window):
@@ -468,7 +491,7 @@ class RadioQuestion(Window):
         :return: None
         """
         self.user_entries = [x.get() for x in self.entries]
-        self.root.destroy()
+        self.close()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,17 @@
+import abc
+import collections
+import html
 import random
-import gui
+
+import cache
+import frontend
+import registry
 
 BOX_TITLE = "BZ 111 Quiz Program"
 
+P_RANGE = (5, 95)   # smallest and largest p drawn, in hundredths
+POP_SIZES = [1000, 2000, 5000, 10000]
+
 
 def fuzzy_equal(user, real, fuzz=0.01):
     try:
@@ -14,15 +23,186 @@ def fuzzy_equal(user, real, fuzz=0.01):
         return False
 
 
+# Every value is in integer hundredths. sums_to_one is whether the rounded
+# p², 2pq, and q² add back up to 1, and exact_pop_sizes are the
+# POP_SIZES where every genotype and allele count is a whole number.
+VALUE_NAMES = ['p', 'q', 'p2', '_2pq', 'q2']
+ValueRow = collections.namedtuple('ValueRow', ['p', 'q', 'p2', 'two_pq', 'q2',
+                                               'sums_to_one',
+                                               'exact_pop_sizes'])
+
+
+def round_hundredths(ten_thousandths):
+    """Round ten-thousandths to the nearest hundredth, halves up
+
+    :param ten_thousandths: int
+    :return: int
+    """
+    return (ten_thousandths + 50) // 100
+
+
+def build_value_table():
+    """Work out the values for every p on the hundredths grid
+
+    :return: list of ValueRow (index is p in hundredths, 0 to 100)
+    """
+    table = []
+    for p in range(101):
+        q = 100 - p
+        p2 = round_hundredths(p * p)
+        q2 = round_hundredths(q * q)
+        _2pq = round_hundredths(2 * p * q)
+        exact = tuple(size for size in POP_SIZES
+                      if all(value * size % 100 == 0
+                             for value in (p2, q2, 2 * p, 2 * q)))
+        table.append(ValueRow(p, q, p2, _2pq, q2, p2 + _2pq + q2 == 100,
+                              exact))
+    return table
+
+VALUE_TABLE = build_value_table()
+VALID_P = [row.p for row in VALUE_TABLE[P_RANGE[0]:P_RANGE[1] + 1]
+           if row.sums_to_one]
+VALID_POP_P = {size: [p for p in VALID_P
+                      if size in VALUE_TABLE[p].exact_pop_sizes]
+               for size in POP_SIZES}
+
+
 class ProblemValues(object):
     def __init__(self, p):
-        if 0 < p > 1:
+        if not 0 <= p <= 1:
             raise ArithmeticError("P must be between 0 and 1")
-        self.p = round(p, 2)
-        self.q = round(1 - p, 2)
-        self.p2 = round(self.p**2, 2)
-        self.q2 = round(self.q**2, 2)
-        self._2pq = round(2 * self.p * self.q, 2)
+        row = VALUE_TABLE[int(round(p * 100))]
+        self.p = row.p / 100
+        self.q = row.q / 100
+        self.p2 = row.p2 / 100
+        self.q2 = row.q2 / 100
+        self._2pq = row.two_pq / 100
+
+
+# A solution is a list of Steps. Each is rendered from STEP_TEMPLATES only
+# when the solution is shown: the first line is the heading, and the rest
+# are indented beneath it. Terms (p, q, p², ...) are rendered by format.
+Step = collections.namedtuple('Step', ['operation', 'operands', 'result'])
+Term = collections.namedtuple('Term', ['name'])
+
+STEP_TEMPLATES = {
+    'p_plus_q': ['Solve for {0} using {1} = {2}:', '{0} + {1} = 1',
+                 '{0} = 1 - {1} = 1 - {2} = {r}'],
+    'root': ['Solve for {0} using {0}{sq} = {1}:', '{0} = {root}({0}{sq})',
+             '{0} = {root}({1}) = {r}'],
+    'square': ['Solve for {0}{sq} using {0} = {1}:', '{0}{sq} = ({0}){sq}',
+               '{0}{sq} = ({1}){sq} = {r}'],
+    '2pq': ['Solve for 2pq using p = {0} and q = {1}:', '2pq = 2 x p x q',
+            '2pq = 2 x {0} x {1} = 2 x {2:g} = {r}'],
+    'check_alleles': ['Double-check allele frequencies:', 'p + q = 1',
+                      '{0} + {1} = {r}'],
+    'check_genotypes': ['Double-check genotype frequencies:',
+                        'p2 + 2pq + q2 = 1', '{0} + {1} + {2} = {r}'],
+    'from_two': ['Solve for {0} using {1} = {2} and {3} = {4}:',
+                 'p{sq} + 2pq + q{sq} = 1',
+                 '{0} = 1 - {1} - {3} = 1 - {2} - {4}', '{0} = 1 - {5} = {r}'],
+    'geno_from_pop': ['Solve for {0} frequency:',
+                      'There are {1} {2}s in the population.',
+                      '{3} are {4} ({0}).', '{5}{sq} = {3} / {1}',
+                      '{5}{sq} = {r}'],
+    'alleles_from_pop': ['Solve for {0} allele frequency:',
+                         'There are {1} {2} in the population.',
+                         'Each individual has 2 alleles.',
+                         '{1} {2}s x 2 alleles = {3} alleles in the '
+                         'population',
+                         '{4} = {0} alleles / alleles in the population',
+                         '{4} = {5} {0} alleles / {3} alleles in the '
+                         'population', '{4} = {r}']}
+
+SolutionFormat = collections.namedtuple(
+    'SolutionFormat', ['escape', 'symbols', 'indent', 'separator', 'wrap'])
+
+
+LATEX_ESCAPES = {'\\': r'\textbackslash{}', '&': r'\&', '%': r'\%',
+                 '$': r'\$', '#': r'\#', '_': r'\_', '{': r'\{', '}': r'\}',
+                 '~': r'\textasciitilde{}', '^': r'\textasciicircum{}',
+                 '\u00b2': r'\textsuperscript{2}', '\u221A': r'$\surd$',
+                 '\u2019': "'"}
+
+
+def latex_escape(text):
+    """Escape text for LaTeX, keeping line breaks and indents
+
+    :param text: string
+    :return: string
+    """
+    text = ''.join(LATEX_ESCAPES.get(char, char) for char in text)
+    text = text.replace('\t', '\\quad ')
+    paragraphs = [paragraph.strip('\n').replace('\n', '\\\\\n')
+                  for paragraph in text.split('\n\n')]
+    return '\n\n'.join(paragraph for paragraph in paragraphs if paragraph)
+
+
+SOLUTION_FORMATS = {
+    'text': SolutionFormat(str, {'sq': '\u00b2', 'root': '\u221A'}, '\n\t',
+                           '\n\n', '{}'),
+    'html': SolutionFormat(html.escape,
+                           {'sq': '<sup>2</sup>', 'root': '&radic;'},
+                           '<br>\n&emsp;', '</p>\n<p>', '<p>{}</p>\n'),
+    'latex': SolutionFormat(latex_escape,
+                            {'sq': r'\textsuperscript{2}', 'root': r'$\surd$'},
+                            '\\\\\n\\quad ', '\n\n', '{}\n')}
+
+
+def render_operand(operand, solution_format):
+    if isinstance(operand, Term):
+        return ''.join(solution_format.symbols['sq'] if char == '2' and
+                       operand.name != '_2pq' else char
+                       for char in operand.name.replace('_2pq', '2pq'))
+    if isinstance(operand, str):
+        return solution_format.escape(operand)
+    return operand
+
+
+def render_steps(steps, fmt='text'):
+    """Write out solution steps as plain text, HTML, or LaTeX
+
+    :param steps: list of Steps
+    :param fmt: string (a key of SOLUTION_FORMATS)
+    :return: string
+    """
+    solution_format = SOLUTION_FORMATS[fmt]
+    rendered = []
+    for step in steps:
+        operands = [render_operand(operand, solution_format)
+                    for operand in step.operands]
+        lines = [line.format(*operands, r=step.result,
+                             **solution_format.symbols)
+                 for line in STEP_TEMPLATES[step.operation]]
+        rendered.append(solution_format.indent.join(lines))
+    return solution_format.wrap.format(
+        solution_format.separator.join(rendered))
+
+
+def steps_key(question, fmt='text'):
+    """Cache key for a rendered solution: its steps and the format
+
+    :param question: Question
+    :param fmt: string
+    :return: tuple
+    """
+    return tuple(question.steps), fmt
+
+
+def grade_key(question, raw_answers):
+    """Cache key for grading, with numeric answers compared as numbers
+
+    :param question: Question
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    formatted_answers = []
+    for each in raw_answers:
+        try:
+            formatted_answers.append(float(each))
+        except ValueError:
+            formatted_answers.append(each)
+    return tuple(question.answers), tuple(formatted_answers)
 
 animals = ['bears', 'deer', 'rabbits', 'robins', 'hawks', 'sea stars',
            'sharks', 'dolphins', 'pufferfish', 'snakes', 'lizards', 'turtles']
@@ -40,18 +220,108 @@ terms = {'p': ['p', 'The frequency of dominant alleles',
                   'The frequency of Aa individuals']}
 
 
-class Question(object):
-    def __init__(self):
-        self.animal = random.choice(animals)
-        trait = random.choice(phenotypes)
+class Question(abc.ABC):
+    given_options = []
+
+    def __init__(self, rng=random):
+        """Draw a random question
+
+        :param rng: random.Random or the random module
+        """
+        self.set_values(animal=rng.choice(animals),
+                        trait=rng.choice(phenotypes),
+                        p=rng.choice(self.p_choices()) / 100,
+                        term_type=rng.randint(0, 2))
+
+    def p_choices(self):
+        """Values of p (in hundredths) this question can be drawn with
+
+        :return: list of ints
+        """
+        return VALID_P
+
+    @classmethod
+    def from_fields(cls, animal, trait, p, term_type, given, pop_size=None):
+        """Rebuild a question from stored fields without drawing new values
+
+        :param animal: string (one of animals)
+        :param trait: tuple of strings (one of phenotypes)
+        :param p: float (rounded to two decimal places)
+        :param term_type: int (0, 1, or 2)
+        :param given: one of cls.given_options
+        :param pop_size: int (only for PopSizeQuestions)
+        :return: Question
+        """
+        question = cls.__new__(cls)
+        question.set_values(animal, trait, p, term_type)
+        question.given = given
+        if pop_size is not None:
+            question.pop_size = pop_size
+        question.make_question()
+        return question
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a question saved with to_dict without regenerating it
+
+        :param data: dict
+        :return: Question
+        """
+        question_class = QUESTION_CLASSES[data['type']]
+        question = question_class.__new__(question_class)
+        question.animal = animals[data['animal']]
+        question.trait_dom, question.trait_rec = phenotypes[data['trait']]
+        for name, value in data.items():
+            if name not in ('type', 'animal', 'trait', 'steps', 'solution'):
+                setattr(question, name, value)
+        question.steps = question.solve()
+        return question
+
+    def to_dict(self):
+        """Convert to a JSON-ready dict, with the animal and trait as indices
+
+        :return: dict
+        """
+        data = {'type': type(self).__name__,
+                'animal': animals.index(self.animal),
+                'trait': phenotypes.index((self.trait_dom, self.trait_rec))}
+        for name, value in vars(self).items():
+            if name not in ('animal', 'trait_dom', 'trait_rec', 'steps'):
+                data[name] = value
+        return data
+
+    def set_values(self, animal, trait, p, term_type):
+        self.animal = animal
         self.trait_dom = trait[0]
         self.trait_rec = trait[1]
-        self.values = vars(ProblemValues(p=random.uniform(0.05, 0.95)))
-        self.term_type = random.randint(0, 2)   # variable, genotype, or zygous
+        self.values = vars(ProblemValues(p=p))
+        self.term_type = term_type   # variable, genotype, or zygous
         self.question = None
-        self.solution = ''
+        self.steps = []
         self.answers = [self.values[x] for x in ['p', 'q', 'p2', '_2pq', 'q2']]
 
+    def value_row(self):
+        """The value table row for this question's p
+
+        :return: ValueRow
+        """
+        return VALUE_TABLE[int(round(self.values['p'] * 100))]
+
+    def hundredths(self, name):
+        """One of this question's values in integer hundredths
+
+        :param name: string (one of VALUE_NAMES)
+        :return: int
+        """
+        return self.value_row()[VALUE_NAMES.index(name)]
+
+    @abc.abstractmethod
+    def make_question(self):
+        """Write the question text and solution steps from the given values
+
+        :return: None
+        """
+
     def ask(self):
         prompt = ('Assuming the population is at hardy-weinberg equilibrium, '
                   'report the requested values below as a '
@@ -62,14 +332,17 @@ class Question(object):
         question_list = [question_dict[x]
                          for x in ['p', 'q', 'p2', '_2pq', 'q2']]
 
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.question + '\n\n' + prompt,
-                                questions=question_list,
-                                correct_answers=self.answers,
-                                solution=self.solution,
-                                checker=self.answer_checker)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + '\n\n' + prompt,
+            questions=question_list,
+            correct_answers=self.answers,
+            solution=self.render_solution,
+            checker=self.answer_checker,
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.GRADES, grade_key, copy=list)
     def answer_checker(self, raw_answers):
         formatted_answers = []
         for each in raw_answers:
@@ -82,18 +355,34 @@ class Question(object):
                   for user, correct in zip(formatted_answers, self.answers)]
         return result
 
+    @property
+    def solution(self):
+        return self.render_solution('text')
+
+    @cache.cached_method(cache.SOLUTIONS, steps_key)
+    def render_solution(self, fmt='text'):
+        """Write out the solution, only when it is asked for
+
+        :param fmt: string ('text', 'html', or 'latex')
+        :return: string
+        """
+        return render_steps(self.steps, fmt)
+
+    @abc.abstractmethod
+    def solve(self):
+        """List the steps that solve this question
+
+        :return: list of Steps
+        """
+
     def solve_p_plus_q(self, solve_for):
         solve_dict = {'p': 'q', 'q': 'p'}
         try:
             given = solve_dict[solve_for]
         except KeyError:
             raise ValueError('Can only solve for p or q.')
-
-        step = ('Solve for {0} using {1} = {2}:\n\t{0} + {1} = 1\n\t'
-                '{0} = 1 - {1} = 1 - {2} = {3}'
-                ''.format(solve_for, given,
-                          self.values[given], self.values[solve_for]))
-        return step
+        return Step('p_plus_q', (Term(solve_for), Term(given),
+                                 self.values[given]), self.values[solve_for])
 
     def solve_square_or_root(self, solve_for):
         solve_dict = {'p': 'p2', 'p2': 'p', 'q': 'q2', 'q2': 'q'}
@@ -102,86 +391,86 @@ class Question(object):
         except KeyError:
             raise ValueError('Can only solve for p, q, p\u00b2, or q\u00b2.')
         if '2' in given:
-            step = ('Solve for {0} using {0}\u00b2 = {1}:\n\t'
-                    '{0} = \u221A({0}\u00b2)\n\t{0} = \u221A({1}) = {2}'
-                    ''.format(solve_for, self.values[given],
-                              self.values[solve_for]))
-        else:
-            step = ('Solve for {0}\u00b2 using {0} = {1}:\n\t'
-                    '{0}\u00b2 = ({0})\u00b2\n\t{0}\u00b2 = ({1})\u00b2 = {2}'
-                    ''. format(given, self.values[given],
-                               self.values[solve_for]))
-        return step
+            return Step('root', (Term(solve_for), self.values[given]),
+                        self.values[solve_for])
+        return Step('square', (Term(given), self.values[given]),
+                    self.values[solve_for])
 
     def solve_2pq(self):
-        step = ('Solve for 2pq using p = {0} and q = {1}:\n\t'
-                '2pq = 2 x p x q\n\t2pq = 2 x {0} x {1} = 2 x {2} = {3}'
-                ''.format(self.values['p'], self.values['q'],
-                          round((self.values['p'] * self.values['q']), 2),
-                          self.values['_2pq']))
-        return step
+        row = self.value_row()
+        return Step('2pq', (self.values['p'], self.values['q'],
+                            row.p * row.q / 10000), self.values['_2pq'])
 
     def check_equations(self):
         val = self.values
-        step1 = ('Double-check allele frequencies:\n\tp + q = 1\n\t'
-                 '{0} + {1} = {2}'.format(val['p'], val['q'],
-                                          val['p'] + val['q']))
-        step2 = ('Double-check genotype frequencies:\n\tp2 + 2pq + q2 = 1\n\t'
-                 '{0} + {1} + {2} = {3}'
-                 ''.format(val['p2'], val['_2pq'], val['q2'],
-                           val['p2'] + val['_2pq'] + val['q2']))
-        return '\n\n'.join([step1, step2])
+        row = self.value_row()
+        return [Step('check_alleles', (val['p'], val['q']),
+                     (row.p + row.q) / 100),
+                Step('check_genotypes', (val['p2'], val['_2pq'], val['q2']),
+                     (row.p2 + row.two_pq + row.q2) / 100)]
 
 
 class GivenPorQ(Question):
-    def __init__(self):
-        super().__init__()
-        self.given = random.choice(['p', 'q'])
+    given_options = ['p', 'q']
+
+    def __init__(self, rng=random):
+        super().__init__(rng)
+        self.given = rng.choice(self.given_options)
+        self.make_question()
+
+    def make_question(self):
         self.question = ("In a population of {0}, being {1} is "
                          "dominant over being {2}. {3} is {4}."
                          "".format(self.animal, self.trait_dom, self.trait_rec,
                                    terms[self.given][self.term_type],
                                    self.values[self.given]))
-        self.solution = self.solve()
+        self.steps = self.solve()
 
     def solve(self):
         solve_dict = {'p': 'q', 'q': 'p'}
         solve_for = solve_dict[self.given]
 
-        steps = [self.solve_p_plus_q(solve_for),
-                 self.solve_square_or_root('p2'),
-                 self.solve_square_or_root('q2'),
-                 self.solve_2pq(), self.check_equations()]
-        return '\n\n'.join(steps)
+        return [self.solve_p_plus_q(solve_for),
+                self.solve_square_or_root('p2'),
+                self.solve_square_or_root('q2'),
+                self.solve_2pq()] + self.check_equations()
 
 
 class GivenP2orQ2(Question):
-    def __init__(self):
-        super().__init__()
-        self.given = random.choice(['p2', 'q2'])
+    given_options = ['p2', 'q2']
+
+    def __init__(self, rng=random):
+        super().__init__(rng)
+        self.given = rng.choice(self.given_options)
+        self.make_question()
+
+    def make_question(self):
         self.question = ("In a population of {0}, being {1} is "
                          "dominant over being {2}. {3} is {4}."
                          "".format(self.animal, self.trait_dom, self.trait_rec,
                                    terms[self.given][self.term_type],
                                    self.values[self.given]))
-        self.solution = self.solve()
+        self.steps = self.solve()
 
     def solve(self):
         solve_for1 = self.given[0]   # p or q
         solve_dict2 = {'p': 'q', 'q': 'p'}
         solve_for2 = solve_dict2[solve_for1]
-        steps = [self.solve_square_or_root(solve_for1),
-                 self.solve_p_plus_q(solve_for2),
-                 self.solve_square_or_root(solve_for2 + '2'),
-                 self.solve_2pq(), self.check_equations()]
-        return '\n\n'.join(steps)
+        return [self.solve_square_or_root(solve_for1),
+                self.solve_p_plus_q(solve_for2),
+                self.solve_square_or_root(solve_for2 + '2'),
+                self.solve_2pq()] + self.check_equations()
 
 
 class GivenTwo(Question):
-    def __init__(self):
-        super().__init__()
-        self.given = ['p2', 'q2', '_2pq']
-        self.given.remove(random.choice(self.given))
+    given_options = [['q2', '_2pq'], ['p2', '_2pq'], ['p2', 'q2']]
+
+    def __init__(self, rng=random):
+        super().__init__(rng)
+        self.given = list(rng.choice(self.given_options))
+        self.make_question()
+
+    def make_question(self):
         self.question = (
             "In a population of {0}, being {1} is dominant over being {2}. "
             "{3} is {4}. {5} is {6}."
@@ -190,44 +479,54 @@ class GivenTwo(Question):
                       self.values[self.given[0]],
                       terms[self.given[1]][self.term_type],
                       self.values[self.given[1]]))
-        self.solution = self.solve()
+        self.steps = self.solve()
 
     def solve_from_two(self, solve_for):
         givens = ['p2', '_2pq', 'q2']
         givens.remove(solve_for)
-        as_text = {'p2': 'p\u00b2', '_2pq': '2pq', 'q2': 'q\u00b2'}
-        step = ('Solve for {0} using {1} = {2} and {3} = {4}:\n\t'
-                'p\u00b2 + 2pq + q\u00b2 = 1\n\t'
-                '{0} = 1 - {1} - {3} = 1 - {2} - {4}\n\t'
-                '{0} = 1 - {5} = {6}'
-                ''.format(as_text[solve_for], as_text[givens[0]],
-                          self.values[givens[0]], as_text[givens[1]],
-                          self.values[givens[1]],
-                          round(self.values[givens[0]] +
-                                self.values[givens[1]], 2),
-                          self.values[solve_for]))
-        return step
+        return Step('from_two', (Term(solve_for), Term(givens[0]),
+                                 self.values[givens[0]], Term(givens[1]),
+                                 self.values[givens[1]],
+                                 (self.hundredths(givens[0]) +
+                                  self.hundredths(givens[1])) / 100),
+                    self.values[solve_for])
 
     def solve(self):
         options = ['p2', '_2pq', 'q2']
         for each in self.given:
             options.remove(each)
-        step = [self.solve_from_two(options[0]),
-                self.solve_square_or_root('p'), self.solve_square_or_root('q'),
-                self.check_equations()]
-        return '\n\n'.join(step)
+        return [self.solve_from_two(options[0]),
+                self.solve_square_or_root('p'),
+                self.solve_square_or_root('q')] + self.check_equations()
 
 
 class PopSizeQuestion(Question):
-    def __init__(self):
-        super().__init__()
-        self.pop_size = random.choice([1000, 2000, 5000, 10000])
+    def __init__(self, rng=random):
+        self.pop_size = rng.choice(POP_SIZES)
+        super().__init__(rng)
+
+    def p_choices(self):
+        return VALID_POP_P[self.pop_size]
+
+    def count(self, name, per_individual=1):
+        """Number of individuals (or alleles) a value stands for
+
+        :param name: string (a key of values)
+        :param per_individual: int (2 to count alleles)
+        :return: int
+        """
+        return self.hundredths(name) * self.pop_size * per_individual // 100
 
 
 class GivenSqWithPop(PopSizeQuestion):
-    def __init__(self):
-        super().__init__()
-        self.given = random.choice(['p2', 'q2'])
+    given_options = ['p2', 'q2']
+
+    def __init__(self, rng=random):
+        super().__init__(rng)
+        self.given = rng.choice(self.given_options)
+        self.make_question()
+
+    def make_question(self):
         if self.given == 'p2':
             self.given_trait = self.trait_dom
         if self.given == 'q2':
@@ -237,36 +536,35 @@ class GivenSqWithPop(PopSizeQuestion):
             " dominant over being {3}. {4} {1} are {5}."
             "".format(self.pop_size, self.animal,
                       self.trait_dom, self.trait_rec,
-                      int(self.values[self.given] * self.pop_size),
-                      self.given_trait))
-        self.solution = self.solve()
+                      self.count(self.given), self.given_trait))
+        self.steps = self.solve()
 
     def solve(self):
         solve_dict = {'p': 'q', 'q': 'p'}
-        step = [self.solve_geno_from_pop(),
+        return [self.solve_geno_from_pop(),
                 self.solve_square_or_root(self.given[0]),
                 self.solve_p_plus_q(solve_dict[self.given[0]]),
                 self.solve_square_or_root(solve_dict[self.given[0]] + '2'),
-                self.solve_2pq(), self.check_equations()]
-        return '\n\n'.join(step)
+                self.solve_2pq()] + self.check_equations()
 
     def solve_geno_from_pop(self):
         solve_dict = {'q2': 'aa', 'p2': 'AA'}
         geno = solve_dict[self.given]
-        step = ('Solve for {0} frequency:\n\t'
-                'There are {1} {2}s in the population.\n\t{3} are {4} ({0}).'
-                '\n\t{5}\u00b2 = {3} / {1}\n\t{5}\u00b2 = {6}'
-                ''.format(geno, self.pop_size, self.animal,
-                          int(self.values[self.given] * self.pop_size),
-                          self.given_trait, self.given[0],
-                          self.values[self.given]))
-        return step
+        return Step('geno_from_pop', (geno, self.pop_size, self.animal,
+                                      self.count(self.given), self.given_trait,
+                                      Term(self.given[0])),
+                    self.values[self.given])
 
 
 class GivenPQWithPop(PopSizeQuestion):
-    def __init__(self):
-        super().__init__()
-        self.given = random.choice(['p', 'q'])
+    given_options = ['p', 'q']
+
+    def __init__(self, rng=random):
+        super().__init__(rng)
+        self.given = rng.choice(self.given_options)
+        self.make_question()
+
+    def make_question(self):
         if self.given == 'p':
             self.given_trait = self.trait_dom
         if self.given == 'q':
@@ -276,42 +574,33 @@ class GivenPQWithPop(PopSizeQuestion):
             "There are {4} {5} alleles in the population."
             "".format(self.pop_size, self.animal,
                       self.trait_dom, self.trait_rec,
-                      int(self.values[self.given] * self.pop_size * 2),
-                      self.given_trait))
-        self.solution = self.solve()
+                      self.count(self.given, 2), self.given_trait))
+        self.steps = self.solve()
 
     def solve(self):
         solve_dict = {'p': 'q', 'q': 'p'}
-        step = [self.solve_alleles_from_pop(),
+        return [self.solve_alleles_from_pop(),
                 self.solve_p_plus_q(solve_dict[self.given]),
                 self.solve_square_or_root('p2'),
                 self.solve_square_or_root('q2'),
-                self.solve_2pq(), self.check_equations()]
-        return '\n\n'.join(step)
+                self.solve_2pq()] + self.check_equations()
 
     def solve_alleles_from_pop(self):
-        step = (
-            'Solve for {0} allele frequency:\n\tThere are {1} {2} in the '
-            'population.\n\tEach individual has 2 alleles.\n\t'
-            '{1} {2}s x 2 alleles = {3} alleles in the population\n\t'
-            '{4} = {0} alleles / alleles in the population\n\t{4} = '
-            '{5} {0} alleles / {3} alleles in the population\n\t{4} = {6}'
-            ''. format(self.given_trait, self.pop_size, self.animal,
-                       self.pop_size * 2, self.given,
-                       int(self.values[self.given] * self.pop_size * 2),
-                       self.values[self.given]))
-        return step
+        return Step('alleles_from_pop', (self.given_trait, self.pop_size,
+                                         self.animal, self.pop_size * 2,
+                                         Term(self.given),
+                                         self.count(self.given, 2)),
+                    self.values[self.given])
 
 
+# how often each is asked is set in registry.HW_WEIGHTS
 question_types = [GivenPorQ, GivenPQWithPop, GivenP2orQ2, GivenSqWithPop,
-                  GivenTwo, GivenTwo]
+                  GivenTwo]
+QUESTION_CLASSES = {cls.__name__: cls for cls in question_types}
 
 
 def run():
-    resp = 'New Question'
-    while resp == 'New Question':
-        question = random.choice(question_types)()
-        resp = question.ask()
+    registry.QUESTIONS.run(['hardy-weinberg'])
     return 'Main Menu'
 
 if __name__ == "__main__":
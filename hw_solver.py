@@ -0,0 +1,165 @@
+"""Solve batches of Hardy-Weinberg problems given any mix of values
+
+Imported problems give some subset of p, q, p², 2pq, and q², or raw
+counts from a population. A batch is a set of arrays with one row per
+problem and a mask of which entries were given. Every missing value is
+worked out at once with numpy, rows whose givens disagree are flagged, and
+each row is matched to the Question class whose solution steps fit it.
+"""
+import collections
+
+import numpy
+
+import hardy_weinberg
+
+VALUE_NAMES = hardy_weinberg.VALUE_NAMES
+# individuals that are AA and aa, then A and a alleles
+COUNT_NAMES = ['p2_count', 'q2_count', 'p_count', 'q_count']
+PER_COUNT = [1, 1, 2, 2]    # each individual has two alleles
+
+PATHS = ['GivenPorQ', 'GivenP2orQ2', 'GivenTwo', 'GivenSqWithPop',
+         'GivenPQWithPop']
+NO_PATH = -1
+
+TOLERANCE = 0.011       # values are given to the hundredth
+
+Batch = collections.namedtuple('Batch', ['values', 'mask', 'pop_size',
+                                         'counts', 'count_mask'])
+Solved = collections.namedtuple('Solved', ['values', 'solvable',
+                                           'consistent', 'path'])
+
+
+def batch_from_rows(rows):
+    """Build a batch from problems given as dicts
+
+    :param rows: list of dicts {name: number or None} (names from
+        VALUE_NAMES, COUNT_NAMES, and 'pop_size'; missing or None means
+        not given)
+    :return: Batch
+    """
+    def column(name):
+        return [row.get(name) for row in rows]
+
+    values = numpy.array([column(name) for name in VALUE_NAMES],
+                         dtype=float).T.reshape(len(rows), len(VALUE_NAMES))
+    counts = numpy.array([column(name) for name in COUNT_NAMES],
+                         dtype=float).T.reshape(len(rows), len(COUNT_NAMES))
+    pop_size = numpy.array(column('pop_size'), dtype=float)
+    return Batch(numpy.nan_to_num(values), ~numpy.isnan(values),
+                 numpy.nan_to_num(pop_size).astype(numpy.int64),
+                 numpy.nan_to_num(counts).astype(numpy.int64),
+                 ~numpy.isnan(counts))
+
+
+def counts_to_values(batch):
+    """Turn given counts into frequencies
+
+    :param batch: Batch
+    :return: (float array of p², q², p, q; bool array of which are known)
+    """
+    has_pop = batch.pop_size > 0
+    known = batch.count_mask & has_pop[:, None]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        freqs = batch.counts / (batch.pop_size[:, None] *
+                                numpy.array(PER_COUNT))
+    return numpy.where(known, freqs, 0.0), known
+
+
+def solve_batch(batch, tolerance=TOLERANCE):
+    """Work out all five values for every problem in a batch
+
+    p comes from p or q (values or allele counts) when given, otherwise
+    from p² or q², and everything else from p. A row given only 2pq has two
+    answers, so it is not solvable.
+
+    :param batch: Batch
+    :param tolerance: float (how far a given value may be from the
+        solved one)
+    :return: Solved: values (rows of VALUE_NAMES), solvable and consistent
+        (bool per row), and path (index into PATHS per row, or NO_PATH)
+    """
+    values = numpy.asarray(batch.values, dtype=float)
+    mask = numpy.asarray(batch.mask, dtype=bool)
+    count_values, count_known = counts_to_values(batch)
+
+    column = {name: num for num, name in enumerate(VALUE_NAMES)}
+
+    def given_value(name, count_num):
+        known = mask[:, column[name]] | count_known[:, count_num]
+        value = numpy.where(mask[:, column[name]], values[:, column[name]],
+                            count_values[:, count_num])
+        return numpy.where(known, value, numpy.nan)
+
+    p_given, q_given = given_value('p', 2), given_value('q', 3)
+    p2, q2 = given_value('p2', 0), given_value('q2', 1)
+    two_pq = numpy.where(mask[:, column['_2pq']], values[:, column['_2pq']],
+                         numpy.nan)
+    # two genotype frequencies give the third
+    p2 = numpy.where(numpy.isnan(p2), 1 - q2 - two_pq, p2)
+    q2 = numpy.where(numpy.isnan(q2), 1 - p2 - two_pq, q2)
+
+    # p is taken straight from p or q when given. Otherwise it is the root
+    # of the larger of p² and q², which rounding changes the least.
+    from_alleles = numpy.where(numpy.isnan(p_given), 1 - q_given, p_given)
+    use_p2 = ~numpy.isnan(p2) & ~(q2 > p2)
+    with numpy.errstate(invalid='ignore'):
+        from_squares = numpy.where(use_p2, numpy.sqrt(p2),
+                                   1 - numpy.sqrt(q2))
+    p = numpy.where(numpy.isnan(from_alleles), from_squares, from_alleles)
+    solvable = ~numpy.isnan(p)
+
+    q = 1 - p
+    solved = numpy.stack([p, q, p * p, 2 * p * q, q * q], axis=1)
+
+    # every given value and count must be possible and agree with the
+    # solution, and so must the solved p
+    with numpy.errstate(invalid='ignore'):
+        in_range = ((values >= 0) & (values <= 1)) | ~mask
+        counts_in_range = ((batch.counts >= 0) &
+                           (batch.counts <= batch.pop_size[:, None] *
+                            numpy.array(PER_COUNT))) | ~count_known
+        p_in_range = (p >= 0) & (p <= 1)
+        consistent = (numpy.abs(values - solved) <= tolerance) | ~mask
+        count_columns = [VALUE_NAMES.index(name) for name in
+                         ('p2', 'q2', 'p', 'q')]
+        count_fits = (numpy.abs(count_values - solved[:, count_columns]) <=
+                      tolerance) | ~count_known
+    both_alleles = count_known[:, 2] & count_known[:, 3]
+    alleles_add_up = ~both_alleles | (
+        batch.counts[:, 2] + batch.counts[:, 3] == 2 * batch.pop_size)
+    consistent = (solvable & p_in_range & in_range.all(axis=1) &
+                  counts_in_range.all(axis=1) & consistent.all(axis=1) &
+                  count_fits.all(axis=1) & alleles_add_up)
+
+    return Solved(solved, solvable, consistent,
+                  solution_paths(mask, count_known))
+
+
+def solution_paths(mask, count_known):
+    """Match each row to the Question class whose steps solve it
+
+    :param mask: bool array (rows of VALUE_NAMES given)
+    :param count_known: bool array (rows of p², q², p, q counts given)
+    :return: int array (index into PATHS, or NO_PATH)
+    """
+    column = {name: num for num, name in enumerate(VALUE_NAMES)}
+    allele = mask[:, column['p']] | mask[:, column['q']]
+    genotypes = mask[:, [column['p2'], column['_2pq'], column['q2']]].sum(
+        axis=1)
+    square = mask[:, column['p2']] | mask[:, column['q2']]
+    conditions = [count_known[:, :2].any(axis=1),
+                  count_known[:, 2:].any(axis=1), allele, genotypes >= 2,
+                  square]
+    choices = [PATHS.index(name) for name in
+               ('GivenSqWithPop', 'GivenPQWithPop', 'GivenPorQ', 'GivenTwo',
+                'GivenP2orQ2')]
+    return numpy.select(conditions, choices, NO_PATH)
+
+
+def path_names(solved):
+    """Name the solution path of each row
+
+    :param solved: Solved
+    :return: list of strings or None
+    """
+    return [PATHS[path] if path != NO_PATH else None for path in solved.path]
@@ -0,0 +1,212 @@
+"""Work backwards from an offspring ratio to the parents' genotypes
+
+The inverse index is built from every cross of every trait (and pair of
+traits) in the trait catalog. It maps each reduced offspring ratio to all
+of the (mom, dad) genotype pairs that give it, so finding or checking the
+parents of a ratio is a single dict lookup. Each trait set's part of the
+index is kept by its catalog, so a reload only rebuilds the parts for
+traits that changed.
+"""
+import collections
+import itertools
+import random
+
+import cache
+import catalog
+import frontend
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+RATIO_KINDS = ['geno', 'pheno']
+RATIO_NAMES = {'geno': 'genotypic', 'pheno': 'phenotypic'}
+
+
+def ratio_key(kids, traits, kind):
+    """Normalize an offspring count into a reduced ratio of packed codes
+
+    :param kids: dict {genotype code: count} (from punnet.cross)
+    :param traits: list of trait dictionaries
+    :param kind: string ('geno' or 'pheno')
+    :return: tuple of tuples (code, count), sorted by code
+    """
+    if kind == 'geno':
+        counts = kids
+    elif kind == 'pheno':
+        counts = collections.Counter()
+        for code, count in kids.items():
+            counts[punnet.phenotype_code(code, traits)] += count
+    else:
+        raise ValueError('Ratio kind must be one of', RATIO_KINDS)
+    return tuple(punnet.reduce_ratio(sorted(counts.items())))
+
+
+def build_crosses(traits):
+    """Cross every pair of genotypes for one trait set
+
+    :param traits: list of trait dictionaries (the first trait is the
+        first locus of a packed genotype)
+    :return: dict {(kind, ratio): frozenset of (mom code, dad code)}, with
+        mom code <= dad code
+    """
+    index = collections.defaultdict(set)
+    codes = sorted(punnet.pack_loci(loci) for loci in itertools.product(
+        range(3), repeat=len(traits)))
+    for mom, dad in itertools.combinations_with_replacement(codes, 2):
+        kids = punnet.cross(mom, dad, len(traits))
+        for kind in RATIO_KINDS:
+            index[kind, ratio_key(kids, traits, kind)].add((mom, dad))
+    return {key: frozenset(pairs) for key, pairs in index.items()}
+
+
+def build_index(the_catalog=None):
+    """Cross every pair of genotypes for every trait set
+
+    Two-trait sets are included in both orders, since the first trait
+    is always the first locus of a packed genotype.
+
+    :param the_catalog: catalog.Catalog or None (the current one)
+    :return: dict {(trait indices, kind, ratio): frozenset of
+        (mom code, dad code)}, with mom code <= dad code
+    """
+    if the_catalog is None:
+        the_catalog = catalog.current()
+    return {(trait_set,) + key: pairs
+            for trait_set in the_catalog.trait_sets()
+            for key, pairs in the_catalog.crosses(trait_set).items()}
+
+
+def parent_pairs(trait_set, kind, ratio, the_catalog=None):
+    """Find every (mom, dad) genotype pair that gives an offspring ratio
+
+    :param trait_set: tuple of ints (indices into the catalog's traits)
+    :param kind: string ('geno' or 'pheno')
+    :param ratio: tuple (from ratio_key)
+    :param the_catalog: catalog.Catalog or None (the current one)
+    :return: frozenset of (mom code, dad code), with mom code <= dad code
+    """
+    if the_catalog is None:
+        the_catalog = catalog.current()
+    return the_catalog.crosses(trait_set).get((kind, ratio), frozenset())
+
+
+def grade_key(question, raw_answers):
+    """Cache key for grading parent genotypes against a ratio
+
+    :param question: ParentQuestion
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return (question.catalog.trait_key(question.trait_set), question.kind,
+            question.ratio, tuple(raw_answers))
+
+
+class ParentQuestion(object):
+    def __init__(self, loci_num=None, kind=None, rng=random):
+        """Pick a random cross and ask for parents that give its ratio
+
+        :param loci_num: int or None (1 or 2; None picks one)
+        :param kind: string or None ('geno' or 'pheno'; None picks one)
+        :param rng: random.Random or the random module
+        """
+        if loci_num is None:
+            loci_num = rng.choice([1, 2])
+        if kind is None:
+            kind = rng.choice(RATIO_KINDS)
+        if kind not in RATIO_KINDS:
+            raise ValueError('Ratio kind must be one of', RATIO_KINDS)
+        punnet_set = punnet.PunnetSet(loci_num, rng=rng)
+        self.loci_num = loci_num
+        self.kind = kind
+        self.catalog = punnet_set.catalog
+        self.traits = punnet_set.traits
+        self.trait_set = punnet_set.configuration.traits
+        self.mom_code = punnet_set.mom.code
+        self.dad_code = punnet_set.dad.code
+        self.ratio = ratio_key(punnet_set.kids, self.traits, kind)
+        self.parents = parent_pairs(self.trait_set, kind, self.ratio,
+                                    self.catalog)
+        self.info = punnet_set.make_trait_info(rng)
+        self.question = self.make_question()
+        self.solution = self.make_solution()
+
+    def describe_code(self, code):
+        """Display a packed genotype or phenotype from this question's ratio
+
+        :param code: int
+        :return: string
+        """
+        if self.kind == 'geno':
+            return punnet.decode_genotype(code, self.traits)
+        return ' and '.join(punnet.decode_phenotype(code, self.traits))
+
+    def ratio_text(self):
+        return ': '.join('{} {}'.format(count, self.describe_code(code))
+                         for code, count in self.ratio)
+
+    def make_question(self):
+        return ('{}\n\nTwo animals were crossed, and their offspring have a '
+                '{} ratio of {}.'.format(self.info, RATIO_NAMES[self.kind],
+                                         self.ratio_text()))
+
+    def make_solution(self):
+        pairs = sorted(self.parents)
+        crosses = '\n'.join('\t{} x {}'.format(
+            punnet.decode_genotype(mom, self.traits),
+            punnet.decode_genotype(dad, self.traits)) for mom, dad in pairs)
+        return ('Work backwards from the offspring. Each offspring gets one '
+                'allele for each trait from each parent, so the alleles '
+                'found in the offspring show which alleles the parents must '
+                'carry, and the ratio shows how many copies of each they '
+                'have. Drawing the punnet square for each possible pair of '
+                'parents shows that {} {} a {} ratio of {}:\n{}\n\nEither '
+                'parent can be mom.'.format(
+                    'this cross' if len(pairs) == 1 else 'these crosses',
+                    'gives' if len(pairs) == 1 else 'give',
+                    RATIO_NAMES[self.kind], self.ratio_text(), crosses))
+
+    def parse_genotype(self, answer):
+        try:
+            return punnet.encode_genotype(answer.strip(), self.traits)
+        except ValueError:
+            return None
+
+    @cache.cached_method(cache.GRADES, grade_key, copy=list)
+    def answer_checker(self, raw_answers):
+        """Check that the parents given would produce this ratio
+
+        Any pair from the inverse index is correct. If each genotype could
+        be a parent but the two don't go together, dad is marked wrong.
+
+        :param raw_answers: list of strings (mom's and dad's genotypes)
+        :return: list of booleans
+        """
+        codes = [self.parse_genotype(answer) for answer in raw_answers[:2]]
+        codes += [None] * (2 - len(codes))
+        if None not in codes and tuple(sorted(codes)) in self.parents:
+            return [True, True]
+        possible = {code for pair in self.parents for code in pair}
+        result = [code in possible for code in codes]
+        if all(result):
+            result[1] = False
+        return result
+
+    def ask(self):
+        prompt = ('\n\nPlease enter genotypes for a mom and dad that could '
+                  'have had these offspring.')
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + prompt,
+            questions=["What could mom's genotype be?",
+                       "What could dad's genotype be?"],
+            correct_answers=[
+                punnet.decode_genotype(self.mom_code, self.traits),
+                punnet.decode_genotype(self.dad_code, self.traits)],
+            solution=self.solution,
+            checker=self.answer_checker,
+            problem=self)
+        return loop.main_loop()
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['inverse'])
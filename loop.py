@@ -0,0 +1,186 @@
+"""Question flow shared by every front-end
+
+QuestionLoop decides what to show next (the question, right/wrong
+feedback, answers, or the solution). Front-ends subclass it and fill in
+how each of those screens is displayed; a subclass missing one of the
+abstract screens can't be instantiated.
+"""
+import abc
+import time
+
+import attempts
+
+
+class QuestionLoop(abc.ABC):
+    def __init__(self, title, prompt, questions, correct_answers, solution,
+                 solution_table=None, checker=None, solution_key=None,
+                 problem=None):
+        self.title = title
+        self.prompt = prompt
+        self.questions = questions
+        self.correct_answers = correct_answers
+        self.solution = solution
+        self.solution_table = solution_table
+        self.solution_key = solution_key
+        self.problem = problem     # what is being asked, for attempts
+
+        if checker is None:
+            checker = self.default_checker
+        self.answer_checker = checker
+        self.tries = 0
+
+    def solution_text(self):
+        """The solution, rendered now if it was given as a function
+
+        :return: string
+        """
+        if callable(self.solution):
+            return self.solution()
+        return self.solution
+
+    def default_checker(self, raw_answers):
+        """Compare raw_answers to correct answers
+
+        :param raw_answers: list of strings (user answers)
+        :return: list of booleans
+        """
+        formatted_answers = [x.strip().lower() for x in raw_answers]
+        result = [user == correct for user, correct
+                  in zip(formatted_answers, self.correct_answers)]
+        len_diff = len(self.correct_answers) - len(formatted_answers)
+        if len_diff > 0:
+            for _ in range(len_diff):
+                result.append(False)
+        return result
+
+    def ask_question(self, old_answers, old_correct_list):
+        """Display the question and request a user response
+
+        :param old_answers: list of strings
+        :param old_correct_list: list of booleans
+        :return: (list of strings, list of booleans)
+        """
+        start = time.perf_counter()
+        raw_answers = self.get_answers(old_answers, old_correct_list)
+        seconds = time.perf_counter() - start
+        is_correct_list = self.answer_checker(raw_answers)
+        self.tries += 1
+        attempts.record(self, raw_answers, is_correct_list, seconds)
+        return raw_answers, is_correct_list
+
+    @abc.abstractmethod
+    def get_answers(self, old_answers, old_correct_list):
+        """Display the question and return the user's raw answers
+
+        :param old_answers: list of strings
+        :param old_correct_list: list of booleans
+        :return: list of strings
+        """
+
+    def correct_buttons(self):
+        """Buttons offered once an answer has been checked
+
+        :return: list of strings
+        """
+        all_buttons = ['New Question', 'Show Solution', 'Main Menu']
+        if self.solution is None:
+            all_buttons.remove('Show Solution')
+        return all_buttons
+
+    def incorrect_message(self, is_correct_list):
+        """Describe how many answers were correct
+
+        :param is_correct_list: list of booleans
+        :return: string
+        """
+        correct_num = sum(is_correct_list)
+        tried_num = len(self.correct_answers)
+        if correct_num == tried_num:
+            correct_num -= 1  # -1 credit if given extra answers
+        return '{} of {} correct.'.format(correct_num, tried_num)
+
+    @staticmethod
+    def corrected_answers(correct_answers, raw_answers, is_correct_list):
+        """Pair each wrong user answer with the correct one
+
+        :param correct_answers: list of correct answers
+        :param raw_answers:  list of un-formatted user answers
+        :param is_correct_list: list of booleans
+        :return: list of strings
+        """
+        return [real if is_correct else '{} ({})'.format(real, user)
+                for real, user, is_correct in
+                zip(correct_answers, raw_answers, is_correct_list)]
+
+    @abc.abstractmethod
+    def display_correct_window(self):
+        """Tell the user they were right and return the button clicked
+
+        :return: string
+        """
+
+    @abc.abstractmethod
+    def display_incorrect_window(self, is_correct_list):
+        """Display number of correct answers when fewer than all are correct
+
+        :param is_correct_list: list of booleans
+        :return: string
+        """
+
+    @abc.abstractmethod
+    def show_answers(self, correct_answers, raw_answers, is_correct_list):
+        """Display correct answers along with user answers when incorrect
+
+        :param correct_answers: list of correct answers
+        :param raw_answers:  list of un-formatted user answers
+        :param is_correct_list: list of booleans
+        :return: string
+        """
+
+    @abc.abstractmethod
+    def show_solution(self):
+        """Display the solution
+
+        :return: string
+        """
+
+    def main_loop(self, old_answers=None, old_correct_list=None):
+        """Display the question, solution, and answer as requested by the user
+
+        :param old_answers: list of strings: user's previous answers
+        :param old_correct_list: list of booleans: if old answers were correct
+        :return: string): user-response
+        """
+        if old_answers is None:
+            old_answers = []
+        if old_correct_list is None:
+            old_correct_list = []
+        # Try Again loops rather than recursing, so a long run of retries
+        # doesn't keep every earlier attempt's frame alive
+        user_response = 'Try Again'
+        while user_response == 'Try Again':
+            raw_answers, is_correct_list = self.ask_question(old_answers,
+                                                             old_correct_list)
+            if sum(is_correct_list) == len(self.correct_answers):
+                user_response = self.display_correct_window()
+            else:
+                user_response = self.display_incorrect_window(
+                    is_correct_list)
+            old_answers, old_correct_list = raw_answers, is_correct_list
+        if user_response == 'Show Answers':
+            user_response = self.show_answers(self.correct_answers,
+                                              raw_answers, is_correct_list)
+        if user_response == 'Show Solution':
+            user_response = self.show_solution()
+        return user_response
+
+
+class RadioLoop(QuestionLoop):
+    def __init__(self, title, prompt, questions, correct_answers, solution,
+                 choices, solution_table=None, checker=None,
+                 solution_key=None, problem=None):
+        super().__init__(title, prompt, questions, correct_answers, solution,
+                         solution_table, checker, solution_key, problem)
+        if type(choices[0]) is not list:
+            raise TypeError('Choices must be a nested list, not', choices)
+        self.choices = choices
@@ -1,23 +1,35 @@
-import gui
-import hardy_weinberg
+import frontend
 import punnet
+import registry
 
 BOX_TITLE = "BZ 111 Quiz Program"
 
+# question types (registry tags) asked from each main menu button; their
+# modules are only imported once a button is clicked
+MENU_TAGS = {'Hardy-Weinberg': ['hardy-weinberg'],
+             'Parents from Offspring': ['inverse'],
+             'Chi-Square': ['chi-square'],
+             'Pedigrees': ['pedigree'],
+             'Polygenic Traits': ['polygenic'],
+             'Random Mating': ['mating']}
+
 
 def run():
     user_choice = ''
     while user_choice not in ['Exit Program', None]:
-        window = gui.SimpleWindow(title=BOX_TITLE,
-                                  msg='BZ 111 Practice Problems',
-                                  buttons=['Hardy-Weinberg', 'Punnet Squares',
-                                           'Exit Program'])
+        window = frontend.current().SimpleWindow(
+            title=BOX_TITLE,
+            msg='BZ 111 Practice Problems',
+            buttons=['Hardy-Weinberg', 'Punnet Squares',
+                     'Parents from Offspring', 'Chi-Square', 'Pedigrees',
+                     'Polygenic Traits', 'Random Mating', 'Exit Program'])
         window.run()
         user_choice = window.clicked
-        if user_choice == 'Hardy-Weinberg':
-            user_choice = hardy_weinberg.run()
         if user_choice == 'Punnet Squares':
             user_choice = punnet.run()
+        if user_choice in MENU_TAGS:
+            registry.QUESTIONS.run(MENU_TAGS[user_choice])
+            user_choice = 'Main Menu'
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
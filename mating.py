@@ -0,0 +1,292 @@
+"""Genotype frequencies in a randomly mating population
+
+Genotypes for one or two loci are numbered in base 3 (locus codes as in
+punnet, first locus lowest), so a population is a vector of 3 or 9
+genotype frequencies. The offspring of every cross are worked out once
+into a transmission matrix, and the next generation is the table of
+random matings (the outer product of the population with itself) times
+that matrix. Any number of populations can be stacked along the leading
+axes and advanced with the same single matrix product.
+"""
+import itertools
+import random
+
+import numpy
+
+import frontend
+import hardy_weinberg
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+LOCI_NUMS = [1, 2]
+START_STEPS = 20        # one-locus starting frequencies are multiples of 1/20
+MAX_START_GENOTYPES = 3
+
+_transmissions = {}
+
+
+def genotype_loci(loci_num):
+    """Per-locus codes of each genotype, in index order
+
+    :param loci_num: int
+    :return: list of tuples of ints
+    """
+    return [tuple(reversed(loci))
+            for loci in itertools.product(range(3), repeat=loci_num)]
+
+
+def genotype_codes(loci_num):
+    """Packed punnet genotype code of each genotype, in index order
+
+    :param loci_num: int
+    :return: list of ints
+    """
+    return [punnet.pack_loci(loci) for loci in genotype_loci(loci_num)]
+
+
+def build_transmission(loci_num):
+    """Offspring distribution for every ordered pair of parent genotypes
+
+    :param loci_num: int
+    :return: numpy array, shape (3 ** loci_num * 3 ** loci_num,
+        3 ** loci_num): row mom * size + dad holds the fraction of their
+        offspring with each genotype
+    """
+    codes = genotype_codes(loci_num)
+    index = {code: num for num, code in enumerate(codes)}
+    size = len(codes)
+    matrix = numpy.zeros((size * size, size))
+    for mom, dad in itertools.product(range(size), repeat=2):
+        kids = punnet.cross(codes[mom], codes[dad], loci_num)
+        for kid, count in kids.items():
+            matrix[mom * size + dad, index[kid]] = count / 4 ** loci_num
+    return matrix
+
+
+def get_transmission(loci_num):
+    """Return the transmission matrix, building it on first use
+
+    :param loci_num: int
+    :return: numpy array (see build_transmission)
+    """
+    if loci_num not in _transmissions:
+        _transmissions[loci_num] = build_transmission(loci_num)
+    return _transmissions[loci_num]
+
+
+def mating_table(freqs):
+    """Frequency of each ordered (mom, dad) pairing under random mating
+
+    :param freqs: array-like, shape (..., size)
+    :return: numpy array, shape (..., size, size)
+    """
+    freqs = numpy.asarray(freqs, dtype=float)
+    return freqs[..., :, None] * freqs[..., None, :]
+
+
+def loci_for_size(size):
+    for loci_num in LOCI_NUMS:
+        if 3 ** loci_num == size:
+            return loci_num
+    raise ValueError('Populations need 3 or 9 genotype frequencies, not',
+                     size)
+
+
+def next_generation(freqs):
+    """Genotype frequencies after one generation of random mating
+
+    :param freqs: array-like, shape (..., 3) or (..., 9), each population
+        summing to 1
+    :return: numpy array, same shape as freqs
+    """
+    freqs = numpy.asarray(freqs, dtype=float)
+    size = freqs.shape[-1]
+    table = mating_table(freqs).reshape(freqs.shape[:-1] + (size * size,))
+    return table @ get_transmission(loci_for_size(size))
+
+
+def generations(freqs, count):
+    """Genotype frequencies for several generations of random mating
+
+    :param freqs: array-like, shape (..., 3) or (..., 9)
+    :param count: int (generations after the first)
+    :return: numpy array, shape (count + 1, ...) + freqs.shape[-1:]
+    """
+    result = [numpy.asarray(freqs, dtype=float)]
+    for _ in range(count):
+        result.append(next_generation(result[-1]))
+    return numpy.stack(result)
+
+
+def allele_frequencies(freqs):
+    """Frequency of each locus's second allele
+
+    :param freqs: array-like, shape (..., 3) or (..., 9)
+    :return: numpy array, shape (..., loci_num)
+    """
+    freqs = numpy.asarray(freqs, dtype=float)
+    loci = numpy.array(genotype_loci(loci_for_size(freqs.shape[-1])))
+    return freqs @ loci / 2
+
+
+def equilibrium(freqs):
+    """Hardy-Weinberg (and linkage) equilibrium frequencies
+
+    :param freqs: array-like, shape (..., 3) or (..., 9)
+    :return: numpy array, same shape as freqs
+    """
+    freqs = numpy.asarray(freqs, dtype=float)
+    loci_num = loci_for_size(freqs.shape[-1])
+    q = allele_frequencies(freqs)
+    locus_freqs = numpy.stack([(1 - q) ** 2, 2 * q * (1 - q), q ** 2],
+                              axis=-1)
+    result = numpy.ones(freqs.shape[:-1] + (1,))
+    for locus_num in reversed(range(loci_num)):
+        result = (result[..., :, None] *
+                  locus_freqs[..., locus_num, None, :]).reshape(
+            freqs.shape[:-1] + (-1,))
+    return result
+
+
+def random_start(loci_num, rng=random):
+    """Draw starting genotype frequencies that are not at equilibrium
+
+    :param loci_num: int
+    :param rng: random.Random or the random module
+    :return: numpy array of 3 ** loci_num frequencies
+    """
+    size = 3 ** loci_num
+    while True:
+        freqs = numpy.zeros(size)
+        if loci_num == 1:
+            cuts = sorted(rng.randint(0, START_STEPS) for _ in range(2))
+            freqs[:] = numpy.diff([0] + cuts + [START_STEPS]) / START_STEPS
+        else:
+            chosen = rng.sample(range(size),
+                                rng.randint(2, MAX_START_GENOTYPES))
+            weights = [rng.randint(1, 4) for _ in chosen]
+            freqs[chosen] = numpy.array(weights) / sum(weights)
+            freqs = freqs.round(2)
+            freqs[chosen[0]] += 1 - freqs.sum()
+        if numpy.abs(next_generation(freqs) - freqs).max() >= 0.02:
+            return freqs
+
+
+class MatingQuestion(object):
+    def __init__(self, loci_num=None, rng=random):
+        """Ask for genotype frequencies after a generation of random mating
+
+        :param loci_num: int or None (1 or 2; None picks one)
+        :param rng: random.Random or the random module
+        """
+        if loci_num is None:
+            loci_num = rng.choice(LOCI_NUMS)
+        if loci_num not in LOCI_NUMS:
+            raise ValueError('Loci number must be one of', LOCI_NUMS)
+        self.loci_num = loci_num
+        self.traits = [rng.choice(punnet.TRAITS)]
+        while len(self.traits) < loci_num:
+            trait = rng.choice(punnet.TRAITS)
+            if punnet.can_pair(self.traits[0], trait):
+                self.traits.append(trait)
+        self.animal = rng.choice(hardy_weinberg.animals)
+        self.genotypes = [punnet.decode_genotype(code, self.traits)
+                          for code in genotype_codes(loci_num)]
+        self.start = random_start(loci_num, rng)
+        self.after = next_generation(self.start)
+
+        # one locus asks about every genotype, two loci about a few of them
+        if loci_num == 1:
+            self.asked = [0, 1, 2]
+        else:
+            present = [num for num, freq in enumerate(self.after)
+                       if freq >= 0.005]
+            self.asked = sorted(rng.sample(present, min(3, len(present))))
+        self.question = self.make_question()
+        self.solution = self.make_solution()
+
+    def make_question(self):
+        population = ', '.join(
+            '{:.0%} {}'.format(freq, genotype)
+            for freq, genotype in zip(self.start, self.genotypes) if freq)
+        traits = ' and '.join(trait['name'] for trait in self.traits)
+        return ('A population of {} is {} for {}. They mate at random, and '
+                'every pair has the same number of offspring.'.format(
+                    self.animal, population, traits))
+
+    def make_solution(self):
+        size = len(self.genotypes)
+        transmission = get_transmission(self.loci_num)
+        table = mating_table(self.start)
+        crosses = []
+        for mom, dad in itertools.combinations_with_replacement(
+                range(size), 2):
+            if not table[mom, dad]:
+                continue
+            freq = table[mom, dad] * (1 if mom == dad else 2)
+            kids = ', '.join(
+                '{:g}% {}'.format(100 * share, self.genotypes[kid])
+                for kid, share in enumerate(transmission[mom * size + dad])
+                if share)
+            crosses.append('\t{} x {}: {}{:.2f} x {:.2f} = {:.4f} of matings '
+                           '({})'.format(
+                               self.genotypes[mom], self.genotypes[dad],
+                               '' if mom == dad else '2 x ', self.start[mom],
+                               self.start[dad], freq, kids))
+        answers = '\n'.join('\t{}: {:.2f}'.format(self.genotypes[num],
+                                                  self.after[num])
+                            for num in self.asked)
+        if self.loci_num == 1:
+            balance = ('One generation of random mating is enough to reach '
+                       'Hardy-Weinberg equilibrium, so these frequencies now '
+                       'equal p², 2pq, and q².')
+        else:
+            balance = ('Each locus is at Hardy-Weinberg equilibrium after one '
+                       'generation, but the two loci together only approach '
+                       'equilibrium over several generations.')
+        return ('Under random mating, a cross between two genotypes happens '
+                'as often as the product of their frequencies (doubled when '
+                'the genotypes differ, since either can be mom):\n{}\n\nThe '
+                'frequency of each offspring genotype is the sum of each '
+                'mating\'s frequency times the share of its offspring with '
+                'that genotype:\n{}\n\n{}'.format('\n'.join(crosses), answers,
+                                                  balance))
+
+    def correct_answers(self):
+        return ['{:.2f}'.format(self.after[num]) for num in self.asked]
+
+    def answer_checker(self, raw_answers):
+        """Compare user answers (raw) to the next generation's frequencies
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        result = []
+        for position, num in enumerate(self.asked):
+            try:
+                user = float(raw_answers[position])
+            except (ValueError, IndexError):
+                result.append(False)
+                continue
+            result.append(hardy_weinberg.fuzzy_equal(user, self.after[num]))
+        return result
+
+    def ask(self):
+        prompt = ('\n\nReport the frequency of each genotype in the next '
+                  'generation as a proportion, rounding to two decimal '
+                  'places.')
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + prompt,
+            questions=['{}:'.format(self.genotypes[num])
+                       for num in self.asked],
+            correct_answers=self.correct_answers(),
+            solution=self.solution,
+            checker=self.answer_checker,
+            problem=self)
+        return loop.main_loop()
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['mating'])
@@ -0,0 +1,417 @@
+"""Punnet squares for traits with three or more alleles
+
+A trait lists its alleles as a dominance hierarchy: levels from most to
+least dominant, where alleles sharing a level are co-dominant. Alleles are
+numbered in hierarchy order, so a genotype is a pair of allele indices and
+the genotype and phenotype of every pairing are looked up in arrays. The
+offspring counts of every possible cross are worked out once per trait, so
+a six-allele cross costs the same as a two-allele one.
+"""
+import itertools
+import random
+
+import numpy
+
+import cache
+import frontend
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+MAX_ALLELES = 6
+
+MULTI_ALLELE_TRAITS = [
+    ['blood type', [['A', 'B'], ['i']],
+     {'A': 'blood type A', 'B': 'blood type B', 'AB': 'blood type AB',
+      'i': 'blood type O'}],
+    ['coat color', [['C'], ['K'], ['H'], ['c']],
+     {'C': 'full color fur', 'K': 'chinchilla fur', 'H': 'himalayan fur',
+      'c': 'albino fur'}],
+    ['shell color', [['R'], ['O', 'Y'], ['G'], ['w']],
+     {'R': 'red shells', 'O': 'orange shells', 'Y': 'yellow shells',
+      'OY': 'orange shells with yellow bands', 'G': 'green shells',
+      'w': 'white shells'}],
+    ['wing pattern', [['S'], ['T'], ['D', 'E'], ['P'], ['p']],
+     {'S': 'solid wings', 'T': 'striped wings', 'D': 'dotted wings',
+      'E': 'edged wings', 'DE': 'dotted and edged wings',
+      'P': 'plain wings', 'p': 'clear wings'}]
+]
+
+
+def convert_multi_allele_traits(given_traits):
+    """For each in given_traits, number the alleles and build lookup arrays
+
+    :param given_traits: list of [name, dominance levels, phenotypes]
+        (phenotypes are keyed by the allele, or the co-dominant alleles,
+        that an animal shows)
+    :return: list of trait dictionaries
+    """
+    trait_list = []
+    for trait_name, levels, pheno_dict in given_traits:
+        alleles = [allele for level in levels for allele in level]
+        if not 3 <= len(alleles) <= MAX_ALLELES:
+            raise ValueError('Each trait should have 3 to {} alleles. Not: '
+                             ''.format(MAX_ALLELES), alleles)
+        if len(set(alleles)) != len(alleles) or any(
+                len(allele) != 1 for allele in alleles):
+            raise ValueError('Alleles must be single, unique letters:',
+                             alleles)
+        rank = {allele: level_num for level_num, level in enumerate(levels)
+                for allele in level}
+
+        genotypes = []
+        genotype_index = numpy.zeros((len(alleles), len(alleles)), dtype=int)
+        pheno_names = []
+        pheno_codes = []
+        for first, second in itertools.combinations_with_replacement(
+                range(len(alleles)), 2):
+            genotype_index[first, second] = len(genotypes)
+            genotype_index[second, first] = len(genotypes)
+            genotypes.append(alleles[first] + alleles[second])
+            if rank[alleles[first]] == rank[alleles[second]]:
+                shown = genotypes[-1] if first != second else alleles[first]
+            else:
+                shown = alleles[first]
+            if shown not in pheno_dict:
+                raise ValueError('No phenotype given for', shown)
+            if pheno_dict[shown] not in pheno_names:
+                pheno_names.append(pheno_dict[shown])
+            pheno_codes.append(pheno_names.index(pheno_dict[shown]))
+
+        trait_list.append({'name': trait_name, 'alleles': alleles,
+                           'levels': levels, 'dom_type': 'multiple alleles',
+                           'phenos': pheno_dict, 'genotypes': genotypes,
+                           'genotype_index': genotype_index,
+                           'pheno_names': pheno_names,
+                           'pheno_codes': numpy.array(pheno_codes)})
+    return trait_list
+
+MULTI_ALLELE_TRAITS = convert_multi_allele_traits(MULTI_ALLELE_TRAITS)
+
+_cross_tables = {}
+
+
+def trait_index(trait):
+    """Position of a trait in MULTI_ALLELE_TRAITS
+
+    Traits hold numpy arrays, so they are found by identity, not equality.
+
+    :param trait: trait dictionary
+    :return: int
+    """
+    return next(num for num, each in enumerate(MULTI_ALLELE_TRAITS)
+                if each is trait)
+
+
+def build_cross_table(trait):
+    """Count the offspring genotypes of every pair of parent genotypes
+
+    :param trait: trait dictionary
+    :return: numpy array, shape (genotypes, genotypes, genotypes): entry
+        [mom, dad, kid] counts kid among the 4 squares of the cross
+    """
+    size = len(trait['alleles'])
+    pairs = numpy.array([[first, second] for first, second
+                         in itertools.combinations_with_replacement(
+                             range(size), 2)])
+    # kids[mom, dad] holds the 4 kid genotypes, one per mom and dad gamete
+    kids = trait['genotype_index'][pairs[:, None, :, None],
+                                   pairs[None, :, None, :]]
+    kids = kids.reshape(len(pairs), len(pairs), 4)
+    return numpy.eye(len(pairs), dtype=int)[kids].sum(axis=2)
+
+
+def get_cross_table(trait):
+    """Return the cross table for a trait, building it on first use
+
+    :param trait: trait dictionary
+    :return: numpy array (see build_cross_table)
+    """
+    key = trait_index(trait)
+    if key not in _cross_tables:
+        _cross_tables[key] = build_cross_table(trait)
+    return _cross_tables[key]
+
+
+def cross_counts(trait, mom, dad):
+    """Offspring genotype and phenotype counts of a cross
+
+    :param trait: trait dictionary
+    :param mom: int or array of ints (genotype index)
+    :param dad: int or array of ints, broadcastable with mom
+    :return: tuple of numpy arrays (genotype counts, phenotype counts),
+        each with a last axis over the trait's genotypes or phenotypes
+    """
+    geno = get_cross_table(trait)[mom, dad]
+    pheno = numpy.zeros(geno.shape[:-1] + (len(trait['pheno_names']),),
+                        dtype=int)
+    numpy.add.at(pheno.T, trait['pheno_codes'], geno.T)
+    return geno, pheno
+
+
+def encode_genotype(genotype, trait):
+    """Find the index of a genotype, with its alleles in any order
+
+    :param genotype: string
+    :param trait: trait dictionary
+    :return: int
+    """
+    genotype = genotype.strip()
+    if len(genotype) != 2 or any(allele not in trait['alleles']
+                                 for allele in genotype):
+        raise ValueError('{} is not a genotype for {}.'.format(
+            genotype, trait['name']))
+    return int(trait['genotype_index'][trait['alleles'].index(genotype[0]),
+                                       trait['alleles'].index(genotype[1])])
+
+
+def dominance_text(trait):
+    """Describe a trait's dominance hierarchy
+
+    :param trait: trait dictionary
+    :return: string
+    """
+    levels = []
+    for level in trait['levels']:
+        levels.append(' and '.join('{} ({})'.format(
+            allele, trait['phenos'][allele]) for allele in level))
+    text = ('There are {} alleles for {}. From most to least dominant, they '
+            'are: {}.'.format(len(trait['alleles']), trait['name'],
+                              ', then '.join(levels)))
+    for level in trait['levels']:
+        for pair in itertools.combinations(level, 2):
+            text += (' {} and {} are co-dominant, so {} animals have {}.'
+                     ''.format(pair[0], pair[1], ''.join(pair),
+                               trait['phenos'][''.join(pair)]))
+    return text
+
+
+def grade_key(multi_cross, raw_answers):
+    """Cache key for grading raw answers against a cross
+
+    :param multi_cross: MultiAlleleCross
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return (trait_index(multi_cross.trait), multi_cross.mom,
+            multi_cross.dad, tuple(raw_answers))
+
+
+class MultiAlleleCross(object):
+    def __init__(self, trait=None, mom=None, dad=None, rng=random):
+        """Cross two parents for a trait with three or more alleles
+
+        :param trait: trait dictionary or None (one of MULTI_ALLELE_TRAITS)
+        :param mom: string or None (genotype; None picks one)
+        :param dad: string or None
+        :param rng: random.Random or the random module
+        """
+        if trait is None:
+            trait = rng.choice(MULTI_ALLELE_TRAITS)
+        self.trait = trait
+        self.mom = self.pick_genotype(mom, rng)
+        self.dad = self.pick_genotype(dad, rng)
+
+        geno, pheno = cross_counts(trait, self.mom, self.dad)
+        self.kid_geno = [(trait['genotypes'][num], int(count))
+                         for num, count in enumerate(geno) if count]
+        self.kid_pheno = [(trait['pheno_names'][num], int(count))
+                          for num, count in enumerate(pheno) if count]
+        self.kid_geno_reduced = punnet.reduce_ratio(self.kid_geno)
+        self.kid_pheno_reduced = punnet.reduce_ratio(self.kid_pheno)
+        self.info = '{}\n\nMom is {}. Dad is {}.'.format(
+            dominance_text(trait), self.genotype(self.mom),
+            self.genotype(self.dad))
+        self.square = self.make_geno_square()
+
+    def pick_genotype(self, genotype, rng):
+        if genotype is None:
+            return rng.randrange(len(self.trait['genotypes']))
+        return encode_genotype(genotype, self.trait)
+
+    def genotype(self, index):
+        return self.trait['genotypes'][index]
+
+    def phenotype(self, index):
+        return self.trait['pheno_names'][self.trait['pheno_codes'][index]]
+
+    def gametes(self, index):
+        return sorted(set(self.genotype(index)),
+                      key=self.trait['alleles'].index)
+
+    def correct_grammar(self, genotype):
+        """Write a genotype with its most dominant allele first
+
+        :param genotype: string
+        :return: string (unchanged if it is not a genotype)
+        """
+        try:
+            return self.genotype(encode_genotype(genotype, self.trait))
+        except ValueError:
+            return genotype
+
+    def make_geno_square(self):
+        mom = list(self.genotype(self.mom))
+        dad = list(self.genotype(self.dad))
+        square = [[''] + mom]
+        for d in dad:
+            square.append([d] + [self.correct_grammar(m + d) for m in mom])
+        return square
+
+    def make_pheno_square(self, geno_square):
+        pheno_square = [geno_square[0]]
+        for row in geno_square[1:]:
+            pheno_square.append([row[0]] + [
+                '{}\n({})'.format(self.phenotype(
+                    encode_genotype(geno, self.trait)), geno)
+                for geno in row[1:]])
+        return pheno_square
+
+    def gamete_question(self):
+        prompt = ('\n\nPlease enter the gametes each parent can make below, '
+                  'separated by spaces.')
+        solution = ('Each gamete gets 1 of the 2 alleles its parent has for '
+                    '{}. Mom is {}, so her eggs can be: {}. Dad is {}, so his '
+                    'sperm can be: {}.'.format(
+                        self.trait['name'], self.genotype(self.mom),
+                        ', '.join(self.gametes(self.mom)),
+                        self.genotype(self.dad),
+                        ', '.join(self.gametes(self.dad))))
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + prompt,
+            questions=['What eggs can mom make?', 'What sperm can dad make?'],
+            correct_answers=[' '.join(self.gametes(self.mom)),
+                             ' '.join(self.gametes(self.dad))],
+            solution=solution,
+            checker=self.check_gamete_answers,
+            problem=self)
+        return loop.main_loop()
+
+    @cache.cached_method(cache.GRADES, grade_key, copy=list)
+    def check_gamete_answers(self, raw_answers):
+        """Compare user answers (raw) to the gametes of each parent
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        raw_answers = list(raw_answers) + [''] * (2 - len(raw_answers))
+        return [set(answer.split()) == set(self.gametes(parent))
+                for answer, parent in zip(raw_answers, (self.mom, self.dad))]
+
+    def kid_genotype_question(self):
+        prompt = ('\n\nPlease enter the genotypic ratio of the offspring '
+                  'below. Include a single genotype in each box, along with '
+                  'the number of offspring that will have that genotype. '
+                  'Some boxes may remain blank.')
+        correct_answers = ['{} {}'.format(num, geno)
+                           for geno, num in self.kid_geno]
+        solution = ('Construct a punnet square like the one shown below, '
+                    'then count the squares with each unique genotype. The '
+                    'genotype ratio of this problem is: {}'.format(
+                        ': '.join('{} {}'.format(num, geno)
+                                  for geno, num in self.kid_geno)))
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + prompt,
+            questions=[''] * 4,
+            correct_answers=correct_answers,
+            solution=solution,
+            checker=self.kid_genotype_checker,
+            solution_table=self.square,
+            solution_key=(grade_key(self, ())[:3], 'geno'),
+            problem=self)
+        return loop.main_loop()
+
+    @cache.cached_method(cache.GRADES, grade_key, copy=list)
+    def kid_genotype_checker(self, raw_answers):
+        """Compare user answers (raw) to the kid genotypic ratio
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        num_answers = [int(word) for phrase in raw_answers
+                       for word in phrase.split() if word.isnumeric()]
+        geno_answers = [self.correct_grammar(word)
+                        for phrase in raw_answers for word in phrase.split()
+                        if not word.isnumeric()]
+        formatted_answers = list(zip(geno_answers, num_answers))
+        return self.best_match(formatted_answers, self.kid_geno,
+                               self.kid_geno_reduced)
+
+    def kid_phenotype_question(self):
+        prompt = ('\n\nPlease enter the phenotypic ratio of the offspring '
+                  'below. Include a single phenotype in each box, along with '
+                  'the number of offspring that will have that phenotype. '
+                  'Some boxes may remain blank.')
+        correct_answers = ['{} {}'.format(num, pheno)
+                           for pheno, num in self.kid_pheno]
+        solution = ('Construct a punnet square like the one shown below. '
+                    'Each offspring shows its most dominant allele (or both, '
+                    'if they are co-dominant). Count the squares with each '
+                    'unique phenotype. The phenotype ratio of this problem '
+                    'is: {}'.format(': '.join(
+                        '{} {}'.format(num, pheno)
+                        for pheno, num in self.kid_pheno)))
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + prompt,
+            questions=[''] * 4,
+            correct_answers=correct_answers,
+            solution=solution,
+            checker=self.kid_phenotype_checker,
+            solution_table=self.make_pheno_square(self.square),
+            solution_key=(grade_key(self, ())[:3], 'pheno'),
+            problem=self)
+        return loop.main_loop()
+
+    @cache.cached_method(cache.GRADES, grade_key, copy=list)
+    def kid_phenotype_checker(self, raw_answers):
+        """Compare user answers (raw) to the kid phenotypic ratio
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        formatted_answers = []
+        for phrase in raw_answers:
+            phrase = phrase.strip()
+            digits = len(phrase) - len(phrase.lstrip('0123456789'))
+            formatted_answers.append((phrase[digits:].strip().lower(),
+                                      int(phrase[:digits] or '0')))
+        return self.best_match(
+            formatted_answers,
+            [(pheno.lower(), num) for pheno, num in self.kid_pheno],
+            [(pheno.lower(), num) for pheno, num in self.kid_pheno_reduced])
+
+    @staticmethod
+    def best_match(formatted_answers, ratio, reduced_ratio):
+        """Grade against the full and reduced ratio, keeping the better
+
+        :param formatted_answers: list of tuples (string, int)
+        :param ratio: list of tuples (string, int)
+        :param reduced_ratio: list of tuples (string, int)
+        :return: list of booleans
+        """
+        correct_list = punnet.PunnetSet.multi_answer_checker(
+            formatted_answers, ratio)
+        reduced_correct_list = punnet.PunnetSet.multi_answer_checker(
+            formatted_answers, reduced_ratio)
+        if sum(reduced_correct_list) > sum(correct_list):
+            return reduced_correct_list
+        return correct_list
+
+    def ask(self):
+        """Ask all questions for this cross
+
+        :return: string (user response)
+        """
+        for question in (self.gamete_question, self.kid_genotype_question,
+                         self.kid_phenotype_question):
+            response = question()
+            if response in ("Main Menu", "Exit", None):
+                return response
+        return response
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['multiple alleles'])
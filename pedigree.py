@@ -0,0 +1,439 @@
+"""Pedigree problems for a recessive trait
+
+A pedigree is a family of Members (each holding a punnet.Person) in which
+only some phenotypes are known. The solver finds the genotype
+probabilities of any member by passing messages through the family graph
+(people connected through the families they are parents or children in).
+Messages are memoized, so each one is computed once, and no joint
+genotype assignment is ever enumerated. This is exact for pedigrees
+without loops, which is every pedigree the generator makes.
+"""
+import collections
+import random
+
+import frontend
+import hardy_weinberg
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+ALLELE_FREQS = [0.1, 0.2, 0.3]
+PEDIGREE_SIZES = (8, 20)
+MAX_CHILDREN = 4
+MARRY_CHANCE = 0.7
+OBSERVE_CHANCE = 0.7
+
+GENOTYPE_CODES = range(3)   # copies of the recessive allele
+
+# TRANSMISSION[dad][mom][kid]: chance of kid's genotype code from parents'
+# (a parent with code c passes on the recessive allele with chance c / 2)
+TRANSMISSION = [[[sum((dad / 2 if from_dad else 1 - dad / 2) *
+                      (mom / 2 if from_mom else 1 - mom / 2)
+                      for from_dad in (0, 1) for from_mom in (0, 1)
+                      if from_dad + from_mom == kid)
+                  for kid in GENOTYPE_CODES]
+                 for mom in GENOTYPE_CODES] for dad in GENOTYPE_CODES]
+
+Member = collections.namedtuple('Member', ['name', 'sex', 'father', 'mother',
+                                          'person', 'observed'])
+Family = collections.namedtuple('Family', ['father', 'mother', 'children'])
+
+
+def make_person(code, trait):
+    """Build a Person from a one-trait genotype code
+
+    :param code: int (copies of the trait's second allele)
+    :param trait: trait dictionary
+    :return: punnet.Person (namedTuple)
+    """
+    traits = [trait]
+    phenotype = set(punnet.decode_phenotype(
+        punnet.phenotype_code(code, traits), traits))
+    gametes = {punnet.decode_gamete(gamete, traits)
+               for gamete in punnet.make_gametes(code, 1)}
+    return punnet.Person(punnet.decode_genotype(code, traits), phenotype,
+                         gametes, code)
+
+
+def roman(number):
+    numerals = [(10, 'X'), (9, 'IX'), (5, 'V'), (4, 'IV'), (1, 'I')]
+    text = ''
+    for value, numeral in numerals:
+        while number >= value:
+            text += numeral
+            number -= value
+    return text
+
+
+class Pedigree(object):
+    def __init__(self, trait, members, allele_freq):
+        """A family with some known phenotypes
+
+        :param trait: trait dictionary (complete dominance)
+        :param members: list of Members (parents listed before children)
+        :param allele_freq: float (frequency of the recessive
+            allele among people with no parents in the pedigree)
+        """
+        if trait['dom_type'] != 'complete':
+            raise ValueError('Pedigrees need a completely dominant trait.')
+        self.trait = trait
+        self.members = collections.OrderedDict(
+            (member.name, member) for member in members)
+        self.allele_freq = allele_freq
+        q = allele_freq
+        self.founder_prior = [(1 - q) ** 2, 2 * q * (1 - q), q ** 2]
+
+        families = collections.OrderedDict()
+        for member in members:
+            if (member.father is None) != (member.mother is None):
+                raise ValueError('{} needs both parents or neither.'.format(
+                    member.name))
+            if member.father is not None:
+                families.setdefault((member.father, member.mother),
+                                    []).append(member.name)
+        self.families = [Family(father, mother, tuple(children)) for
+                         (father, mother), children in families.items()]
+        self.child_in = {}                  # name: Family
+        self.parent_in = collections.defaultdict(list)
+        for family in self.families:
+            self.parent_in[family.father].append(family)
+            self.parent_in[family.mother].append(family)
+            for child in family.children:
+                self.child_in[child] = family
+        self.check_no_loops()
+        self.messages = {}
+
+    def check_no_loops(self):
+        """Raise ValueError unless the family graph is a forest
+
+        :return: None
+        """
+        parent = {name: name for name in self.members}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for family in self.families:
+            members = [family.father, family.mother] + list(family.children)
+            roots = {find(name) for name in members}
+            if len(roots) != len(members):
+                raise ValueError('Pedigree has a loop through', members)
+            for root in roots:
+                parent[root] = find(family.father)
+
+    def penetrance(self, name):
+        """Chance of each genotype code producing what was observed
+
+        :param name: string
+        :return: list of 3 numbers
+        """
+        member = self.members[name]
+        if not member.observed:
+            return [1, 1, 1]
+        pheno = punnet.phenotype_code(member.person.code, [self.trait])
+        return [1 if self.trait['pheno_codes'][code] == pheno else 0
+                for code in GENOTYPE_CODES]
+
+    def to_family(self, name, family):
+        """Message from a person to one of their families
+
+        Everything known about name from outside family: their own
+        phenotype and every other family they belong to.
+
+        :param name: string
+        :param family: Family
+        :return: list of 3 numbers
+        """
+        key = (name, family)
+        if key not in self.messages:
+            message = self.penetrance(name)
+            if name not in self.child_in:
+                message = [x * y for x, y in zip(message,
+                                                 self.founder_prior)]
+            for other in self.families_of(name):
+                if other is not family:
+                    message = [x * y for x, y in zip(
+                        message, self.to_person(other, name))]
+            self.messages[key] = message
+        return self.messages[key]
+
+    def to_person(self, family, name):
+        """Message from a family to one of its members
+
+        :param family: Family
+        :param name: string (father, mother, or a child of family)
+        :return: list of 3 numbers
+        """
+        key = (family, name)
+        if key in self.messages:
+            return self.messages[key]
+        father = self.to_family(family.father, family) if (
+            name != family.father) else None
+        mother = self.to_family(family.mother, family) if (
+            name != family.mother) else None
+        children = [self.to_family(child, family)
+                    for child in family.children if child != name]
+
+        def children_given(dad, mom):
+            product = 1
+            for message in children:
+                product *= sum(TRANSMISSION[dad][mom][kid] * message[kid]
+                               for kid in GENOTYPE_CODES)
+            return product
+
+        if name == family.father:
+            message = [sum(mother[mom] * children_given(dad, mom)
+                           for mom in GENOTYPE_CODES)
+                       for dad in GENOTYPE_CODES]
+        elif name == family.mother:
+            message = [sum(father[dad] * children_given(dad, mom)
+                           for dad in GENOTYPE_CODES)
+                       for mom in GENOTYPE_CODES]
+        else:
+            message = [0, 0, 0]
+            for dad in GENOTYPE_CODES:
+                for mom in GENOTYPE_CODES:
+                    weight = father[dad] * mother[mom] * children_given(
+                        dad, mom)
+                    for kid in GENOTYPE_CODES:
+                        message[kid] += weight * TRANSMISSION[dad][mom][kid]
+        self.messages[key] = message
+        return message
+
+    def families_of(self, name):
+        families = list(self.parent_in.get(name, []))
+        if name in self.child_in:
+            families.append(self.child_in[name])
+        return families
+
+    def evidence(self, name):
+        """Split what is known about name into ancestry and descendants
+
+        :param name: string
+        :return: (list above, list below): above comes from name's parents
+            and everyone related through them (or the population for
+            people who married in); below comes from name's own phenotype
+            and their children's families
+        """
+        if name in self.child_in:
+            above = self.to_person(self.child_in[name], name)
+        else:
+            above = list(self.founder_prior)
+        below = self.penetrance(name)
+        for family in self.parent_in.get(name, []):
+            below = [x * y for x, y in zip(below,
+                                           self.to_person(family, name))]
+        return above, below
+
+    def genotype_probabilities(self, name):
+        """Chance of each genotype code given every known phenotype
+
+        :param name: string
+        :return: list of 3 numbers (homozygous dominant, heterozygous,
+            homozygous recessive)
+        """
+        above, below = self.evidence(name)
+        return normalize([x * y for x, y in zip(above, below)])
+
+    def carrier_probability(self, name):
+        return self.genotype_probabilities(name)[1]
+
+
+def normalize(weights):
+    total = sum(weights)
+    if not total:
+        raise ValueError('Observed phenotypes are impossible.')
+    return [weight / total for weight in weights]
+
+
+def random_pedigree(size=None, trait=None, allele_freq=None, rng=random):
+    """Simulate a family for a recessive trait and hide some phenotypes
+
+    Each couple is one person from the family and one person who married
+    in, so the pedigree never has loops.
+
+    :param size: int or None (most members; None picks from PEDIGREE_SIZES)
+    :param trait: trait dictionary or None (None picks a complete trait)
+    :param allele_freq: float or None (None picks from ALLELE_FREQS)
+    :param rng: random.Random or the random module
+    :return: Pedigree
+    """
+    if size is None:
+        size = rng.randint(*PEDIGREE_SIZES)
+    if size < 3:
+        raise ValueError('A pedigree needs at least 3 members.')
+    if trait is None:
+        trait = rng.choice([x for x in punnet.TRAITS
+                            if x['dom_type'] == 'complete'])
+    if allele_freq is None:
+        allele_freq = rng.choice(ALLELE_FREQS)
+    prior = [(1 - allele_freq) ** 2, 2 * allele_freq * (1 - allele_freq),
+             allele_freq ** 2]
+
+    # (generation, sex, father, mother, code); father/mother are indices
+    people = []
+
+    def add(generation, sex, father=None, mother=None):
+        if father is None:
+            code = rng.choices(GENOTYPE_CODES, prior)[0]
+        else:
+            code = sum(rng.random() < people[parent][4] / 2
+                       for parent in (father, mother))
+        people.append((generation, sex, father, mother, code))
+        return len(people) - 1
+
+    couples = collections.deque([(add(0, 'male'), add(0, 'female'))])
+    while couples and len(people) < size:
+        father, mother = couples.popleft()
+        generation = people[father][0] + 1
+        for _ in range(rng.randint(1, MAX_CHILDREN)):
+            if len(people) >= size:
+                break
+            child = add(generation, rng.choice(['male', 'female']), father,
+                        mother)
+            if len(people) < size and rng.random() < MARRY_CHANCE:
+                if people[child][1] == 'male':
+                    couples.append((child, add(generation, 'female')))
+                else:
+                    couples.append((add(generation, 'male'), child))
+
+    # name people by generation, in the order they were added
+    names = []
+    counts = collections.Counter()
+    for generation, _, _, _, _ in people:
+        counts[generation] += 1
+        names.append('{}-{}'.format(roman(generation + 1), counts[generation]))
+    members = [Member(names[num], sex,
+                      None if father is None else names[father],
+                      None if mother is None else names[mother],
+                      make_person(code, trait),
+                      rng.random() < OBSERVE_CHANCE)
+               for num, (_, sex, father, mother, code) in enumerate(people)]
+    return Pedigree(trait, members, allele_freq)
+
+
+class PedigreeQuestion(object):
+    def __init__(self, size=None, rng=random):
+        """Make a pedigree and pick someone whose carrier status is unsure
+
+        :param size: int or None (most members of the pedigree)
+        :param rng: random.Random or the random module
+        """
+        while True:
+            self.pedigree = random_pedigree(size, rng=rng)
+            if not any(self.is_affected(member) and member.observed
+                       for member in self.pedigree.members.values()):
+                continue
+            options = [name for name, member
+                       in self.pedigree.members.items()
+                       if not (member.observed and self.is_affected(member))
+                       and 0.005 < self.pedigree.carrier_probability(name)
+                       < 0.995]
+            if options:
+                break
+        self.target = rng.choice(options)
+        self.probabilities = self.pedigree.genotype_probabilities(
+            self.target)
+        self.question = self.make_question()
+        self.solution = self.make_solution()
+
+    def is_affected(self, member):
+        return member.person.code == 2
+
+    def make_question(self):
+        trait = self.pedigree.trait
+        dom, rec = trait['alleles']
+        dom_pheno = trait['phenos'][dom + dom]
+        rec_pheno = trait['phenos'][rec + rec]
+        lines = ['{} ({}) is dominant to {} ({}). The frequency of the {} '
+                 'allele is {} in the population that everyone who married '
+                 'into this family comes from.'.format(
+                     dom_pheno.capitalize(), dom, rec_pheno, rec, rec,
+                     self.pedigree.allele_freq), '']
+        members = self.pedigree.members
+        for family in self.pedigree.families:
+            lines.append('{} ({}) and {} ({}) have {}.'.format(
+                family.father, members[family.father].sex, family.mother,
+                members[family.mother].sex, ', '.join(
+                    '{} ({})'.format(child, members[child].sex)
+                    for child in family.children)))
+        lines.append('')
+        groups = collections.OrderedDict([(dom_pheno, []), (rec_pheno, []),
+                                          ('phenotype not known', [])])
+        for name, member in members.items():
+            if member.observed:
+                groups[''.join(member.person.phenotype)].append(name)
+            else:
+                groups['phenotype not known'].append(name)
+        for group, names in groups.items():
+            if names:
+                lines.append('{}: {}'.format(group.capitalize(),
+                                             ', '.join(names)))
+        return '\n'.join(lines)
+
+    def make_solution(self):
+        genotypes = self.pedigree.trait['genotypes']
+        above, below = self.pedigree.evidence(self.target)
+        parents = self.pedigree.child_in.get(self.target)
+        if parents is None:
+            above_text = ('{} married into the family, so before looking at '
+                          'their family, their genotype chances are the '
+                          'population frequencies (p\u00b2, 2pq, q\u00b2):'
+                          ''.format(self.target))
+        else:
+            above_text = ('Start from {}\'s parents, {} and {}. Using what '
+                          'the rest of the pedigree says about the parents, '
+                          'the chances of each genotype {} could inherit '
+                          'are:'.format(self.target, parents.father,
+                                        parents.mother, self.target))
+        return ('{}\n{}\n\n{}\'s own phenotype and their children (if any) '
+                'make each genotype this much more or less likely (relative '
+                'to each other):\n{}\n\nMultiply each pair and divide by the '
+                'total so the chances add up to 1:\n{}\n\nSo the chance '
+                'that {} is a carrier ({}) is {:.3f}.'.format(
+                    above_text, self.format_odds(normalize(above)),
+                    self.target, self.format_odds(relative(below)),
+                    self.format_odds(self.probabilities), self.target,
+                    genotypes[1], self.probabilities[1]))
+
+    def format_odds(self, values):
+        return '\n'.join('\t{}: {:.3f}'.format(geno, value) for geno, value
+                         in zip(self.pedigree.trait['genotypes'], values))
+
+    def answer_checker(self, raw_answers):
+        try:
+            answer = float(raw_answers[0])
+        except (IndexError, ValueError):
+            return [False]
+        return [hardy_weinberg.fuzzy_equal(answer, self.probabilities[1])]
+
+    def ask(self):
+        het = self.pedigree.trait['genotypes'][1]
+        prompt = ('\n\nWhat is the probability that {} is a carrier ({})? '
+                  'Round to two decimal places.'.format(self.target, het))
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + prompt,
+            questions=['Probability {} is {}:'.format(self.target, het)],
+            correct_answers=[round(self.probabilities[1], 2)],
+            solution=self.solution,
+            checker=self.answer_checker,
+            problem=self)
+        return loop.main_loop()
+
+
+def relative(weights):
+    """Scale weights so the largest is 1
+
+    :param weights: list of numbers
+    :return: list of numbers
+    """
+    largest = max(weights)
+    return [weight / largest for weight in weights]
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['pedigree'])
@@ -0,0 +1,248 @@
+"""Quantitative traits controlled by many additive loci
+
+Each uppercase allele adds one step to the trait, so an offspring's
+phenotype depends only on how many uppercase alleles it inherits. That
+count is found by convolving every parent's per-locus gamete counts with
+numpy instead of listing gametes, so crosses with dozens of loci are
+instant and still give exact whole-number ratios.
+"""
+import random
+import string
+from fractions import Fraction
+
+import numpy
+
+import frontend
+import hardy_weinberg
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+LOCI_NUMS = [2, 3, 4]
+MAX_LOCI = 30           # 4 ** 30 kid counts still fit in an int64
+LETTERS = [x for x in string.ascii_uppercase if x not in 'IO']
+# fractions of offspring can be tiny with many loci, so they are checked
+# relative to their size
+FRACTION_TOLERANCE = 0.005
+
+POLYGENIC_TRAITS = [
+    ['height', {'base': 150, 'step': 5, 'unit': 'cm'}],
+    ['tail length', {'base': 10, 'step': 2, 'unit': 'cm'}],
+    ['seed weight', {'base': 100, 'step': 10, 'unit': 'mg'}],
+    ['skin darkness', {'base': 0, 'step': 1, 'unit': 'shades'}],
+    ['wing span', {'base': 20, 'step': 1.5, 'unit': 'cm'}]
+]
+
+
+def convert_polygenic_traits(given_traits):
+    """For each in given_traits, build a trait dictionary
+
+    :param given_traits: list of [name, {'base', 'step', 'unit'}]
+    :return: list of trait dictionaries
+    """
+    trait_list = []
+    for trait_name, values in given_traits:
+        if values['step'] <= 0:
+            raise ValueError('Each allele must add a positive step:',
+                             trait_name)
+        trait_list.append({'name': trait_name, 'dom_type': 'additive',
+                           'base': values['base'], 'step': values['step'],
+                           'unit': values['unit']})
+    return trait_list
+
+POLYGENIC_TRAITS = convert_polygenic_traits(POLYGENIC_TRAITS)
+
+
+def gamete_counts(codes):
+    """Count a parent's gametes by how many uppercase alleles they carry
+
+    :param codes: list of ints (uppercase alleles at each locus, 0 to 2)
+    :return: numpy array (entry k: gametes with k uppercase alleles)
+    """
+    counts = numpy.ones(1, dtype=numpy.int64)
+    for code in codes:
+        # one gamete of each allele; homozygotes need only one gamete
+        locus = [[1, 0], [1, 1], [0, 1]][code]
+        counts = numpy.convolve(counts, locus)
+    return counts
+
+
+def offspring_counts(mom_codes, dad_codes):
+    """Count offspring by how many uppercase alleles they inherit
+
+    :param mom_codes: list of ints (uppercase alleles at each locus)
+    :param dad_codes: list of ints
+    :return: numpy array (entry k: offspring with k uppercase alleles)
+    """
+    if len(mom_codes) != len(dad_codes):
+        raise ValueError('Parents need the same number of loci.')
+    if len(mom_codes) > MAX_LOCI:
+        raise ValueError('At most {} loci are supported.'.format(MAX_LOCI))
+    return numpy.convolve(gamete_counts(mom_codes), gamete_counts(dad_codes))
+
+
+def phenotype_value(trait, count):
+    return trait['base'] + trait['step'] * count
+
+
+def format_value(trait, value):
+    return '{:g} {}'.format(value, trait['unit'])
+
+
+def parse_number(answer):
+    """Read a number, fraction, or percent from the start of an answer
+
+    :param answer: string (such as '160 cm', '3/8', or '37.5%')
+    :return: float or None
+    """
+    words = answer.replace(',', '').split()
+    if not words:
+        return None
+    word = words[0]
+    try:
+        if word.endswith('%'):
+            return float(word[:-1]) / 100
+        return float(Fraction(word))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+class PolygenicCross(object):
+    def __init__(self, loci_num=None, trait=None, rng=random):
+        """Cross two parents for a random additive trait
+
+        :param loci_num: int or None (None picks from LOCI_NUMS)
+        :param trait: trait dictionary or None (one of POLYGENIC_TRAITS)
+        :param rng: random.Random or the random module
+        """
+        if loci_num is None:
+            loci_num = rng.choice(LOCI_NUMS)
+        if not 1 <= loci_num <= min(MAX_LOCI, len(LETTERS)):
+            raise ValueError('Loci number must be between 1 and',
+                             min(MAX_LOCI, len(LETTERS)))
+        if trait is None:
+            trait = rng.choice(POLYGENIC_TRAITS)
+        self.trait = trait
+        self.loci_num = loci_num
+        self.letters = LETTERS[:loci_num]
+        self.mom_codes = [rng.randint(0, 2) for _ in self.letters]
+        self.dad_codes = [rng.randint(0, 2) for _ in self.letters]
+
+        counts = offspring_counts(self.mom_codes, self.dad_codes)
+        self.kid_counts = counts
+        self.kid_pheno = [(format_value(trait, phenotype_value(trait, num)),
+                           int(count))
+                          for num, count in enumerate(counts) if count]
+        self.kid_pheno_reduced = punnet.reduce_ratio(self.kid_pheno)
+        self.total = int(counts.sum())
+        self.target = rng.choice(self.kid_pheno_reduced)[0]
+
+        self.question = self.make_question()
+        self.solution = self.make_solution()
+
+    def genotype(self, codes):
+        return ''.join(letter * code + letter.lower() * (2 - code)
+                       for letter, code in zip(self.letters, codes))
+
+    def phenotype(self, codes):
+        return format_value(self.trait,
+                            phenotype_value(self.trait, sum(codes)))
+
+    def target_fraction(self):
+        count = dict(self.kid_pheno)[self.target]
+        return Fraction(count, self.total)
+
+    def make_question(self):
+        letters = ', '.join(self.letters)
+        return ('{} is controlled by {} genes ({}) that add together. An '
+                'animal with only lowercase alleles has a {} of {}, and each '
+                'uppercase allele adds {}.\n\nMom is {}. Dad is {}.'
+                ''.format(self.trait['name'].capitalize(), self.loci_num,
+                          letters, self.trait['name'],
+                          format_value(self.trait, self.trait['base']),
+                          format_value(self.trait, self.trait['step']),
+                          self.genotype(self.mom_codes),
+                          self.genotype(self.dad_codes)))
+
+    def correct_answers(self):
+        fraction = self.target_fraction()
+        return [self.phenotype(self.mom_codes),
+                self.phenotype(self.dad_codes),
+                self.kid_pheno[-1][0], self.kid_pheno[0][0],
+                '{}/{}'.format(fraction.numerator, fraction.denominator)]
+
+    def make_solution(self):
+        parents = []
+        for name, codes in (('Mom', self.mom_codes), ('Dad', self.dad_codes)):
+            gametes = gamete_counts(codes)
+            parents.append(
+                '{} ({}) has {} uppercase alleles, so {} is {} + {} x {} = '
+                '{}. {} gametes can carry {} to {} uppercase alleles.'.format(
+                    name, self.genotype(codes), sum(codes), name.lower(),
+                    format_value(self.trait, self.trait['base']), sum(codes),
+                    format_value(self.trait, self.trait['step']),
+                    self.phenotype(codes),
+                    'Her' if name == 'Mom' else 'His',
+                    int(numpy.flatnonzero(gametes)[0]),
+                    int(numpy.flatnonzero(gametes)[-1])))
+        ratio = ': '.join('{} {}'.format(num, pheno)
+                          for pheno, num in self.kid_pheno_reduced)
+        fraction = self.target_fraction()
+        return ('{}\n\nAn offspring\'s {} only depends on how many uppercase '
+                'alleles it gets from both parents together. Counting the '
+                'ways each parent\'s gametes can combine gives a phenotypic '
+                'ratio of:\n\t{}\n\nThe largest possible offspring {} is {} '
+                'and the smallest is {}. Offspring with {} are {} of the {} '
+                'parts of the ratio, or {}/{}.'.format(
+                    '\n'.join(parents), self.trait['name'], ratio,
+                    self.trait['name'],
+                    self.kid_pheno[-1][0], self.kid_pheno[0][0], self.target,
+                    dict(self.kid_pheno_reduced)[self.target],
+                    sum(num for _, num in self.kid_pheno_reduced),
+                    fraction.numerator, fraction.denominator))
+
+    def answer_checker(self, raw_answers):
+        """Compare user answers (raw) as numbers, ignoring units
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        present = numpy.flatnonzero(self.kid_counts)
+        real = [phenotype_value(self.trait, sum(self.mom_codes)),
+                phenotype_value(self.trait, sum(self.dad_codes)),
+                phenotype_value(self.trait, int(present[-1])),
+                phenotype_value(self.trait, int(present[0])),
+                float(self.target_fraction())]
+        fuzz = [0.01, 0.01, 0.01, 0.01, real[4] * FRACTION_TOLERANCE]
+        result = []
+        for num, correct in enumerate(real):
+            answer = (parse_number(raw_answers[num])
+                      if num < len(raw_answers) else None)
+            result.append(answer is not None and hardy_weinberg.fuzzy_equal(
+                answer, correct, fuzz[num]))
+        return result
+
+    def ask(self):
+        prompt = ('\n\nEnter values as numbers (units are optional), and the '
+                  'fraction as a fraction, decimal, or percent.')
+        name = self.trait['name']
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + prompt,
+            questions=["What is mom's {}?".format(name),
+                       "What is dad's {}?".format(name),
+                       'What is the largest possible offspring {}?'.format(
+                           name),
+                       'What is the smallest possible offspring {}?'.format(
+                           name),
+                       'What fraction of offspring have {}?'.format(
+                           self.target)],
+            correct_answers=self.correct_answers(),
+            solution=self.solution,
+            checker=self.answer_checker,
+            problem=self)
+        return loop.main_loop()
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['polygenic'])
@@ -2,15 +2,19 @@ import random
 import math
 import itertools
 import collections
+from fractions import Fraction
 
-import gui
+import cache
+import catalog
+import frontend
 import main
+import registry
 
 # TODO add spell check to phenotype questions?
 
 BOX_TITLE = "BZ 111 Quiz Program"
 
-TRAITS = [
+TRAIT_SOURCE = [
     # Complete dominant
     ['hair color', {'B': 'brown hair', 'b': 'blond hair'}],
     ['eye color', {'G': 'green eyes', 'g': 'blue eyes'}],
@@ -75,17 +79,220 @@ def convert_traits(given_traits):
                                   rec + rec: pheno_dict[rec]}
             else:
                 dom_type = 'incomplete'
+
+        # Order alleles so locus codes count copies of the second allele
+        hetero = [key for key in new_pheno_dict.keys() if key[0] != key[1]][0]
+        if dom_type == 'co-dom':
+            alleles = [hetero[0], hetero[1]]
+        else:
+            alleles = [alleles[0].upper(), alleles[0].lower()]
+        genotypes = [alleles[0] * 2, hetero, alleles[1] * 2]
+        pheno_names = []
+        for geno in genotypes:
+            if new_pheno_dict[geno] not in pheno_names:
+                pheno_names.append(new_pheno_dict[geno])
+        pheno_codes = [pheno_names.index(new_pheno_dict[geno])
+                       for geno in genotypes]
+
         this_dict = {'name': trait_name, 'alleles': alleles,
-                     'dom_type': dom_type, 'phenos': new_pheno_dict}
+                     'dom_type': dom_type, 'phenos': new_pheno_dict,
+                     'genotypes': genotypes, 'pheno_names': pheno_names,
+                     'pheno_codes': pheno_codes}
         trait_list.append(this_dict)
     return trait_list
 
-TRAITS = convert_traits(TRAITS)
+TRAITS = convert_traits(TRAIT_SOURCE)
 DOMINANCE_TYPES = ['complete dominance', 'incomplete dominance',
                    'co-dominance']
 
 
-Person = collections.namedtuple('Person', ['genotype', 'phenotype', 'gametes'])
+Person = collections.namedtuple('Person', ['genotype', 'phenotype', 'gametes',
+                                          'code', 'haplotypes'],
+                                defaults=(None,))
+Configuration = collections.namedtuple('Configuration',
+                                       ['traits', 'genotypes', 'info_type'])
+
+
+# Genotypes are packed into ints with 2 bits per locus. Each locus holds the
+# number of copies of the trait's second allele (0, 1, or 2), so a gamete
+# (0 or 1 per locus) from mom plus one from dad is the kid's genotype.
+LOCUS_BITS = 2
+LOCUS_MASK = 3
+GAMETE_ALLELES = ((0, 0), (0, 1), (1, 1))
+
+RECOMBINATION_FREQS = [Fraction(1, 20), Fraction(1, 10), Fraction(1, 5),
+                       Fraction(3, 10), Fraction(2, 5)]
+
+# registry tags asked for by each type of punnet square problem
+PROB_TYPE_TAGS = {'1': ['one trait'], '2': ['two trait'],
+                  'both': ['one trait', 'two trait'], 'linked': ['linked']}
+
+
+def locus_codes(code, loci_num):
+    """Split a packed genotype, gamete, or phenotype into per-locus codes
+
+    :param code: int
+    :param loci_num: int
+    :return: list of ints
+    """
+    return [(code >> (LOCUS_BITS * locus_num)) & LOCUS_MASK
+            for locus_num in range(loci_num)]
+
+
+def pack_loci(codes):
+    """Combine per-locus codes into a single int
+
+    :param codes: iterable of ints
+    :return: int
+    """
+    return sum(code << (LOCUS_BITS * locus_num)
+               for locus_num, code in enumerate(codes))
+
+
+def encode_genotype(genotype, traits):
+    """Pack a genotype into an int
+
+    :param genotype: string or tuple of strings (alleles in any order)
+    :param traits: list of trait dictionaries
+    :return: int
+    """
+    genotype = ''.join(genotype)
+    if len(genotype) != 2 * len(traits):
+        raise ValueError('Genotype {} should have {} alleles.'.format(
+            genotype, 2 * len(traits)))
+    codes = []
+    for trait in traits:
+        locus = [let for let in genotype if let in trait['alleles']]
+        if len(locus) != 2:
+            raise ValueError('Genotype {} should have 2 alleles for {}.'
+                             ''.format(genotype, trait['name']))
+        codes.append(locus.count(trait['alleles'][1]))
+    return pack_loci(codes)
+
+
+def decode_genotype(code, traits):
+    """Convert a packed genotype into its display string
+
+    :param code: int
+    :param traits: list of trait dictionaries
+    :return: string
+    """
+    return ''.join(trait['genotypes'][locus] for trait, locus
+                   in zip(traits, locus_codes(code, len(traits))))
+
+
+def decode_gamete(code, traits):
+    """Convert a packed gamete into its display string
+
+    :param code: int
+    :param traits: list of trait dictionaries
+    :return: string
+    """
+    return ''.join(trait['alleles'][locus] for trait, locus
+                   in zip(traits, locus_codes(code, len(traits))))
+
+
+def make_gametes(code, loci_num):
+    """List every gamete (including repeats) a packed genotype can make
+
+    :param code: int
+    :param loci_num: int
+    :return: list of ints (2 ** loci_num gametes)
+    """
+    options = [GAMETE_ALLELES[locus] for locus in locus_codes(code, loci_num)]
+    return [pack_loci(alleles) for alleles in itertools.product(*options)]
+
+
+def cross(mom_code, dad_code, loci_num):
+    """Count kid genotypes from every pairing of mom and dad gametes
+
+    :param mom_code: int
+    :param dad_code: int
+    :param loci_num: int
+    :return: collections.Counter {genotype code: count}
+        (counts total 4 ** loci_num)
+    """
+    return collections.Counter(
+        mom + dad for mom, dad in itertools.product(
+            make_gametes(mom_code, loci_num), make_gametes(dad_code, loci_num)))
+
+
+def make_haplotypes(code, loci_num, repulsion=False):
+    """Split a packed genotype into the gametes on its two chromosomes
+
+    :param code: int (packed genotype)
+    :param loci_num: int
+    :param repulsion: boolean (for a double heterozygote, put the first
+        allele of trait 1 on the same chromosome as the second allele of
+        trait 2)
+    :return: tuple of 2 ints (packed gametes)
+    """
+    pairs = [GAMETE_ALLELES[locus] for locus in locus_codes(code, loci_num)]
+    first = [pair[0] for pair in pairs]
+    second = [pair[1] for pair in pairs]
+    if repulsion and loci_num == 2 and pairs == [(0, 1), (0, 1)]:
+        first[1], second[1] = second[1], first[1]
+    return pack_loci(first), pack_loci(second)
+
+
+def linked_gametes(haplotypes, recombination):
+    """Find the chance of each gamete when two loci are linked
+
+    :param haplotypes: tuple of 2 ints (from make_haplotypes)
+    :param recombination: Fraction (recombination frequency, 0 to 1/2)
+    :return: collections.Counter {gamete code: Fraction}
+    """
+    first, second = haplotypes
+    recombinants = [(first & LOCUS_MASK) | (second & ~LOCUS_MASK),
+                    (second & LOCUS_MASK) | (first & ~LOCUS_MASK)]
+    weights = collections.Counter()
+    for gamete in haplotypes:
+        weights[gamete] += (1 - recombination) / 2
+    for gamete in recombinants:
+        weights[gamete] += recombination / 2
+    return collections.Counter({gamete: weight for gamete, weight
+                                in weights.items() if weight})
+
+
+def weighted_cross(mom_weights, dad_weights):
+    """Count kid genotypes from weighted gametes
+
+    Each kid genotype gets the sum of mom weight x dad weight over the
+    gamete pairs that make it, scaled to the smallest whole numbers.
+
+    :param mom_weights: dict {gamete code: Fraction}
+    :param dad_weights: dict {gamete code: Fraction}
+    :return: collections.Counter {genotype code: count}
+    """
+    kids = collections.Counter()
+    for mom, mom_weight in mom_weights.items():
+        for dad, dad_weight in dad_weights.items():
+            kids[mom + dad] += mom_weight * dad_weight
+    scale = math.lcm(*[weight.denominator for weight in kids.values()])
+    return collections.Counter({code: int(weight * scale)
+                                for code, weight in kids.items()})
+
+
+def phenotype_code(code, traits):
+    """Find the packed phenotype of a packed genotype
+
+    :param code: int
+    :param traits: list of trait dictionaries
+    :return: int
+    """
+    return pack_loci(trait['pheno_codes'][locus] for trait, locus
+                     in zip(traits, locus_codes(code, len(traits))))
+
+
+def decode_phenotype(code, traits):
+    """Convert a packed phenotype into phenotype strings
+
+    :param code: int
+    :param traits: list of trait dictionaries
+    :return: tuple of strings
+    """
+    return tuple(trait['pheno_names'][locus] for trait, locus
+                 in zip(traits, locus_codes(code, len(traits))))
 
 
 def gcd_list(a_list):
@@ -126,10 +333,11 @@ def case_match(target_string, case_type):
         return target_string.lower()
 
 
-def select_genotype(trait):
+def select_genotype(trait, rng=random):
     """Randomly choose a genotype from trait
 
     :param trait: trait dictionary
+    :param rng: random.Random or the random module
     :return: string (genotype)
     """
     possibles = list(trait['phenos'].keys())
@@ -139,19 +347,235 @@ def select_genotype(trait):
             hetero = geno
     if hetero:
         possibles.append(hetero)
-    chosen = random.choice(possibles)
+    chosen = rng.choice(possibles)
     return chosen
 
 
+def can_pair(trait1, trait2):
+    """Determine if two traits can be crossed together in one PunnetSet
+
+    :param trait1: trait dictionary
+    :param trait2: trait dictionary
+    :return: boolean
+    """
+    return trait1['name'] != trait2['name'] and not any(
+        [x in trait1['alleles'] for x in trait2['alleles']])
+
+
+def info_type_options(trait1, trait2=None):
+    """List the ways a parent can be described for the given traits
+
+    :param trait1: trait dictionary
+    :param trait2: trait dictionary or None
+    :return: list of strings ('geno', 'pheno', 'zygous')
+    """
+    options = ['geno', 'pheno', 'zygous']
+    if trait1['dom_type'] == 'complete' or (trait2 is None) or (
+            trait2['dom_type'] == 'complete'):
+        options.remove('pheno')
+    return options
+
+
+def iter_configurations(loci_nums=(1, 2)):
+    """Lazily yield every distinct PunnetSet configuration
+
+    Traits are paired in index order and mom/dad are unordered, so crosses
+    that only differ by swapping the traits or the parents are yielded once.
+
+    :param loci_nums: iterable of ints (1 and/or 2)
+    :return: generator of Configuration (namedTuple)
+    """
+    the_catalog = catalog.current()
+    for loci_num in loci_nums:
+        if loci_num == 1:
+            trait_sets = ((index,) for index
+                          in range(len(the_catalog.traits)))
+        elif loci_num == 2:
+            trait_sets = (
+                (index1, index2)
+                for index1, partners in enumerate(the_catalog.partners)
+                for index2 in partners if index2 > index1)
+        else:
+            raise ValueError('Loci number must be 1 or 2.')
+
+        for trait_set in trait_sets:
+            traits = [the_catalog.traits[index] for index in trait_set]
+            genotypes = list(itertools.product(
+                *[list(trait['phenos'].keys()) for trait in traits]))
+            if loci_num == 1:
+                genotypes = [geno[0] for geno in genotypes]
+            parents = itertools.product(genotypes, info_type_options(*traits))
+            for mom, dad in itertools.combinations_with_replacement(
+                    list(parents), 2):
+                yield Configuration(trait_set, (mom[0], dad[0]),
+                                    (mom[1], dad[1]))
+
+
+def count_configurations(loci_nums=(1, 2)):
+    """Count the distinct configurations for each combination of dom types
+
+    :param loci_nums: iterable of ints (1 and/or 2)
+    :return: collections.Counter {(dom_type, ...): count}
+    """
+    counts = collections.Counter()
+    traits = catalog.current().traits
+    for configuration in iter_configurations(loci_nums):
+        counts[tuple(sorted(traits[index]['dom_type']
+                            for index in configuration.traits))] += 1
+    return counts
+
+
+def traits_key(punnet_set, *args):
+    """Cache key for text that depends only on the traits
+
+    :param punnet_set: PunnetSet
+    :param args: hashable arguments of the cached method
+    :return: tuple
+    """
+    return punnet_set.trait_key() + args
+
+
+def parents_key(punnet_set, *args):
+    """Cache key for text that depends on the traits and parents' genotypes
+
+    :param punnet_set: PunnetSet
+    :param args: hashable arguments of the cached method
+    :return: tuple
+    """
+    return (punnet_set.trait_key() + (punnet_set.mom.genotype,
+                                      punnet_set.dad.genotype,
+                                      punnet_set.linkage_key()) + args)
+
+
+def configuration_key(punnet_set, *args):
+    """Cache key for text that also depends on the info given for parents
+
+    :param punnet_set: PunnetSet
+    :param args: hashable arguments of the cached method
+    :return: tuple
+    """
+    return (punnet_set.trait_key() + (punnet_set.configuration[1:],
+                                      punnet_set.linkage_key()) + args)
+
+
+def normalize_answer(answer):
+    """Strip an answer and collapse its runs of whitespace
+
+    :param answer: string
+    :return: string
+    """
+    return ' '.join(answer.split())
+
+
+def grade_key(punnet_set, raw_answers):
+    """Cache key for grading raw answers against the parents' cross
+
+    Answers that differ only in spacing share a key.
+
+    :param punnet_set: PunnetSet
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return parents_key(punnet_set, tuple(normalize_answer(answer)
+                                         for answer in raw_answers))
+
+
+def phenotype_grade_key(punnet_set, raw_answers):
+    """Grading key for phenotypes, which are compared ignoring case
+
+    :param punnet_set: PunnetSet
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return grade_key(punnet_set, [answer.lower() for answer in raw_answers])
+
+
+def gamete_grade_key(punnet_set, raw_answers):
+    """Grading key for gametes, as the set of gametes in each answer
+
+    :param punnet_set: PunnetSet
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return grade_key(punnet_set, [
+        ' '.join(sorted({punnet_set.correct_grammar(gamete, True)
+                         for gamete in answer.split()}))
+        for answer in raw_answers])
+
+
+def genotype_grade_key(punnet_set, raw_answers):
+    """Grading key for parent genotypes, spelled as correct_grammar does
+
+    :param punnet_set: PunnetSet
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return grade_key(punnet_set, [
+        punnet_set.correct_grammar(normalize_answer(answer))
+        for answer in raw_answers])
+
+
+def ratio_grade_key(punnet_set, raw_answers):
+    """Grading key for genotypic ratios, with each genotype respelled
+
+    :param punnet_set: PunnetSet
+    :param raw_answers: list of strings
+    :return: tuple
+    """
+    return grade_key(punnet_set, [
+        ' '.join(word if word.isnumeric() else
+                 punnet_set.correct_grammar(word) for word in answer.split())
+        for answer in raw_answers])
+
+
 class PunnetSet(object):
-    def __init__(self, loci_num):
+    def __init__(self, loci_num, configuration=None, rng=random,
+                 recombination=None, repulsion=None, trait_catalog=None):
+        """Make a cross, at random or from a configuration
+
+        :param loci_num: int (1 or 2)
+        :param configuration: Configuration or None
+        :param rng: random.Random or the random module
+        :param recombination: Fraction, float, or None (link the two loci
+            with this recombination frequency; None assorts independently)
+        :param repulsion: tuple of 2 booleans or None (for mom and dad; see
+            make_haplotypes; None picks at random)
+        :param trait_catalog: catalog.Catalog or None (the current one;
+            configuration's trait indices refer to it)
+        """
+        # keep the catalog this cross was made from, even if it is reloaded
+        if trait_catalog is None:
+            trait_catalog = catalog.current()
+        self.catalog = trait_catalog
+        if recombination is not None:
+            if loci_num != 2:
+                raise ValueError('Only two loci can be linked.')
+            recombination = Fraction(recombination).limit_denominator(1000)
+            if not 0 <= recombination <= Fraction(1, 2):
+                raise ValueError('Recombination frequency must be between 0 '
+                                 'and 0.5.')
+            if repulsion is None:
+                repulsion = (rng.random() < 0.5, rng.random() < 0.5)
+        self.recombination = recombination
+        if repulsion is None:
+            repulsion = (False, False)
+        if configuration is not None and (
+                len(configuration.traits) != loci_num):
+            raise ValueError('Configuration does not have {} loci.'.format(
+                loci_num))
         self.loci_num = loci_num
-        self.trait1 = random.choice(TRAITS)
+        if configuration is None:
+            self.trait1 = rng.choice(self.catalog.traits)
+        else:
+            self.trait1 = self.catalog.traits[configuration.traits[0]]
         if self.loci_num == 1:
             self.trait2 = None
             self.traits = [self.trait1]
         elif self.loci_num == 2:
-            self.trait2 = self.get_trait2()
+            if configuration is None:
+                self.trait2 = self.get_trait2(rng)
+            else:
+                self.trait2 = self.catalog.traits[configuration.traits[1]]
             self.traits = [self.trait1, self.trait2]
         else:
             raise ValueError('Loci number must be 1 or 2.')
@@ -162,42 +586,155 @@ class PunnetSet(object):
         except TypeError:
             self.all_phenos = self.trait1['phenos']
 
-        self.mom = self.make_person()
-        self.dad = self.make_person()
+        if configuration is None:
+            self.mom = self.make_person(rng=rng, repulsion=repulsion[0])
+            self.dad = self.make_person(rng=rng, repulsion=repulsion[1])
+        else:
+            self.mom = self.make_person(configuration.genotypes[0],
+                                        repulsion=repulsion[0])
+            self.dad = self.make_person(configuration.genotypes[1],
+                                        repulsion=repulsion[1])
         self.kids = self.make_offspring()
         self.kid_geno = self.genotypic_ratio()
         self.kid_pheno = self.phenotypic_ratio()
         self.kid_pheno_reduced = reduce_ratio(self.kid_pheno)
         self.kid_geno_reduced = reduce_ratio(self.kid_geno)
 
-        self.info_type = self.choose_info_type()
-        self.info = self.make_trait_info() + '\n\n' + self.make_parent_info()
+        if configuration is None:
+            self.info_type = self.choose_info_type(rng)
+        else:
+            self.info_type = list(configuration.info_type)
+        self.info = (self.make_trait_info(rng) + '\n\n' +
+                     self.make_parent_info())
+        if self.recombination is not None:
+            self.info += ' ' + self.make_linkage_info()
 
         self.gamete_solution()
 
         self.square = self.make_geno_square()
 
-    def get_trait2(self):
+    @property
+    def configuration(self):
+        """The Configuration this PunnetSet was built from
+
+        :return: Configuration (namedTuple)
+        """
+        return Configuration(
+            tuple(self.catalog.index(trait) for trait in self.traits),
+            (self.mom.genotype, self.dad.genotype), tuple(self.info_type))
+
+    @classmethod
+    def from_dict(cls, data, trait_catalog=None):
+        """Restore a PunnetSet saved with to_dict without regenerating it
+
+        :param data: dict
+        :param trait_catalog: catalog.Catalog or None (the current one)
+        :return: PunnetSet
+        :raises ValueError: if data was saved under a different catalog
+        """
+        if trait_catalog is None:
+            trait_catalog = catalog.current()
+        if bytes.fromhex(data['catalog']) != trait_catalog.fingerprint:
+            raise ValueError('PunnetSet was saved with a different trait '
+                             'catalog.')
+        punnet_set = cls.__new__(cls)
+        punnet_set.catalog = trait_catalog
+        punnet_set.loci_num = len(data['traits'])
+        punnet_set.traits = [punnet_set.catalog.traits[index]
+                             for index in data['traits']]
+        punnet_set.trait1 = punnet_set.traits[0]
+        if punnet_set.loci_num == 2:
+            punnet_set.trait2 = punnet_set.traits[1]
+        else:
+            punnet_set.trait2 = None
+        punnet_set.all_phenos = {key: value for trait in punnet_set.traits
+                                 for key, value in trait['phenos'].items()}
+
+        punnet_set.recombination = data.get('recombination')
+        if punnet_set.recombination is not None:
+            punnet_set.recombination = Fraction(punnet_set.recombination)
+        for parent in ('mom', 'dad'):
+            genotype, phenotype, gametes, code = data[parent][:4]
+            haplotypes = None
+            if len(data[parent]) > 4:
+                haplotypes = tuple(data[parent][4])
+            if punnet_set.loci_num == 2:
+                genotype = tuple(genotype)
+            setattr(punnet_set, parent,
+                    Person(genotype, set(phenotype), set(gametes), code,
+                           haplotypes))
+        punnet_set.kids = collections.Counter(dict(data['kids']))
+        for name in ('kid_geno', 'kid_geno_reduced'):
+            setattr(punnet_set, name,
+                    [(geno, num) for geno, num in data[name]])
+        for name in ('kid_pheno', 'kid_pheno_reduced'):
+            setattr(punnet_set, name,
+                    [(set(pheno), num) for pheno, num in data[name]])
+        punnet_set.info_type = data['info_type']
+        punnet_set.info = data['info']
+        punnet_set.square = data['square']
+        return punnet_set
+
+    def to_dict(self):
+        """Convert to a JSON-ready dict, with traits stored as catalog indices
+
+        The catalog's fingerprint is stored too, so the indices are only
+        read back against the same catalog.
+
+        :return: dict
+        """
+        data = {'type': type(self).__name__,
+                'catalog': self.catalog.fingerprint.hex(),
+                'traits': [self.catalog.index(trait)
+                           for trait in self.traits],
+                'kids': sorted(self.kids.items()),
+                'info_type': self.info_type, 'info': self.info,
+                'square': self.square}
+        for parent in ('mom', 'dad'):
+            person = getattr(self, parent)
+            data[parent] = [person.genotype, sorted(person.phenotype),
+                            sorted(person.gametes), person.code]
+            if self.recombination is not None:
+                data[parent].append(list(person.haplotypes))
+        if self.recombination is not None:
+            data['recombination'] = str(self.recombination)
+        for name in ('kid_geno', 'kid_geno_reduced'):
+            data[name] = getattr(self, name)
+        for name in ('kid_pheno', 'kid_pheno_reduced'):
+            data[name] = [(sorted(pheno), num)
+                          for pheno, num in getattr(self, name)]
+        return data
+
+    def get_trait2(self, rng=random):
         """Randomly select a second trait with a different name than trait 1
 
+        :param rng: random.Random or the random module
         :return: trait dictionary
         """
-        trait2 = random.choice(TRAITS)
-        want_same_dom_type = random.choice([True, False])
+        traits = self.catalog.traits
+        trait2 = rng.choice(traits)
+        want_same_dom_type = rng.choice([True, False])
         if want_same_dom_type:
-            while self.trait1['name'] == trait2['name'] or (
-                    any([x in self.trait1['alleles']
-                         for x in trait2['alleles']])) or (
+            while not can_pair(self.trait1, trait2) or (
                     self.trait1['dom_type'] != trait2['dom_type']):
-                trait2 = random.choice(TRAITS)
+                trait2 = rng.choice(traits)
         else:
-            while self.trait1['name'] == trait2['name'] or (
-                    any([x in self.trait1['alleles']
-                         for x in trait2['alleles']])) or (
+            while not can_pair(self.trait1, trait2) or (
                     self.trait1['dom_type'] == trait2['dom_type']):
-                trait2 = random.choice(TRAITS)
+                trait2 = rng.choice(traits)
         return trait2
 
+    def trait_key(self):
+        """Cache key part for this cross's traits
+
+        Traits are keyed by their catalog entries rather than their
+        positions, so cached text is kept for traits a reload leaves alone
+        and never reused for ones it changes.
+
+        :return: tuple
+        """
+        return self.catalog.trait_key(self.configuration.traits)
+
     def correct_grammar(self, genotype, is_gamete=False, target_trait=None):
         """Reorder genotype to be trait1 and dominants first
 
@@ -224,23 +761,13 @@ class PunnetSet(object):
                 genotype = ''.join(genotype)
                 if target_trait is None:
                     target_trait = self.trait1
-                locus1 = [let for let in genotype
-                          if let in target_trait['alleles']]
-                options1 = [''.join(pair)
-                            for pair in itertools.permutations(locus1)]
-                geno1 = [geno for geno in options1
-                         if geno in target_trait['phenos'].keys()][0]
                 if len(genotype) > 2:
-                    locus2 = [let for let in genotype
-                              if let in self.trait2['alleles']]
-                    options2 = [''.join(pair)
-                                for pair in itertools.permutations(locus2)]
-                    geno2 = [geno for geno in options2
-                             if geno in self.trait2['phenos'].keys()][0]
-                    return geno1 + geno2
+                    traits = [self.trait1, self.trait2]
                 else:
-                    return geno1
-        except IndexError:
+                    traits = [target_trait]
+                return decode_genotype(encode_genotype(genotype, traits),
+                                       traits)
+        except (IndexError, TypeError, ValueError):
             return genotype
 
     def make_geno_square(self):
@@ -248,14 +775,35 @@ class PunnetSet(object):
             num = 2
         else:
             num = 4
-        mom = list(self.mom.gametes) * int(num/len(self.mom.gametes))
-        dad = list(self.dad.gametes) * int(num/len(self.dad.gametes))
-        mom.insert(0, '')
-        dad.insert(0, '')
-        square = [self.correct_grammar(m + d)
-                  for m, d in itertools.product(dad, mom)]
-
-        square = [square[i:i+num+1] for i in range(0, len(square), num + 1)]
+        if self.recombination is not None:
+            return self.make_weighted_square()
+        mom = sorted(set(make_gametes(self.mom.code, self.loci_num)))
+        dad = sorted(set(make_gametes(self.dad.code, self.loci_num)))
+        mom = mom * int(num/len(mom))
+        dad = dad * int(num/len(dad))
+        square = [[''] + [decode_gamete(m, self.traits) for m in mom]]
+        for d in dad:
+            square.append([decode_gamete(d, self.traits)] +
+                          [decode_genotype(m + d, self.traits) for m in mom])
+        return square
+
+    def make_weighted_square(self):
+        """Square of each parent's unique gametes, labelled with their chances
+
+        Only for display: the kid ratios come from weighted_cross.
+
+        :return: list of lists of strings
+        """
+        mom = sorted(self.gamete_weights(self.mom).items())
+        dad = sorted(self.gamete_weights(self.dad).items())
+        def label(gamete, weight):
+            return '{}\n({:g}%)'.format(decode_gamete(gamete, self.traits),
+                                         float(weight * 100))
+
+        square = [[''] + [label(m, weight) for m, weight in mom]]
+        for d, weight in dad:
+            square.append([label(d, weight)] +
+                          [decode_genotype(m + d, self.traits) for m, _ in mom])
         return square
 
     def make_pheno_square(self, geno_square):
@@ -279,9 +827,10 @@ class PunnetSet(object):
 
         return pheno_square
 
-    def make_trait_info(self):
+    def make_trait_info(self, rng=random):
         """Generate given info for user
 
+        :param rng: random.Random or the random module
         :return: string
         """
         given_info = []
@@ -289,7 +838,7 @@ class PunnetSet(object):
             if trait['dom_type'] == 'complete':
                 dom1 = trait['alleles'][0].upper()
                 rec1 = dom1.lower()
-                if random.choice([True, False]):
+                if rng.choice([True, False]):
                     given = (
                         '{0}{0} and {0}{1} animals have {2}, and '
                         '{1}{1} animals have {3}.'. format(
@@ -309,39 +858,37 @@ class PunnetSet(object):
             given_info.append(given)
         return ' '.join(given_info)
 
-    def choose_info_type(self):
+    def choose_info_type(self, rng=random):
         """Chose info type for each parent: genotype, phenotype, or zygosity
 
+        :param rng: random.Random or the random module
         :return:
         """
-        mom_options = ['geno', 'pheno', 'zygous']
-        dad_options = ['geno', 'pheno', 'zygous']
-
-        if self.trait1['dom_type'] == 'complete' or (
-                        self.trait2 is None) or (
-                    self.trait2['dom_type'] == 'complete'):
-            mom_options.remove('pheno')
-            dad_options.remove('pheno')
+        options = info_type_options(self.trait1, self.trait2)
+        return [rng.choice(options) for _ in ['mom', 'dad']]
 
-        return [random.choice(x) for x in [mom_options, dad_options]]
+    def make_zygous(self, code):
+        """Describe the zygosity of a packed genotype for each trait
 
-    def make_zygous(self, geno):
-        geno = ''.join(geno)
+        :param code: int (packed genotype)
+        :return: list of strings
+        """
         description = []
-        for trait, locus in zip([self.trait1, self.trait2],
-                                [geno[:2], geno[2:]]):
+        for trait, locus in zip(self.traits,
+                                locus_codes(code, self.loci_num)):
             zygous = ''
             if trait is not None:
-                if locus[0] != locus[1]:
+                if locus == 1:
                     zygous += 'heterozygous'
                     if self.trait2 is not None:
                         zygous += ' for {}'.format(trait['name'])
                 else:
                     zygous += 'homozygous '
                     if trait['dom_type'] == 'co-dom':
-                        zygous += 'for {}'.format(self.all_phenos[locus])
+                        zygous += 'for {}'.format(
+                            trait['phenos'][trait['genotypes'][locus]])
                     else:
-                        if locus[0].isupper():
+                        if locus == 0:
                             zygous += 'dominant'
                         else:
                             zygous += 'recessive'
@@ -359,15 +906,14 @@ class PunnetSet(object):
     def make_parent_info(self):
         description = []
 
-        for info, geno, pheno in zip(
-                self.info_type, [self.mom.genotype, self.dad.genotype],
-                [self.mom.phenotype, self.dad.phenotype]):
+        for info, parent in zip(self.info_type, [self.mom, self.dad]):
             if info == 'geno':
-                description.append('is ' + ''.join(geno))
+                description.append('is ' + ''.join(parent.genotype))
             elif info == 'pheno':
-                description.append('has ' + ' and '.join(pheno))
+                description.append('has ' + ' and '.join(parent.phenotype))
             elif info == 'zygous':
-                description.append('is ' + ' and '.join(self.make_zygous(geno)))
+                description.append(
+                    'is ' + ' and '.join(self.make_zygous(parent.code)))
             else:
                 raise ValueError('info_type must be "geno", "pheno", '
                                  'or "zygous".')
@@ -375,63 +921,91 @@ class PunnetSet(object):
         dad_phrase = 'Dad {}.'.format(description[1])
         return mom_phrase + ' ' + dad_phrase
 
-    def make_person(self):
+    def make_person(self, genotype=None, rng=random, repulsion=False):
         """Randomly select a genotype and return with phenotype
 
+        :param genotype: string or tuple of strings (use instead of a random
+            genotype)
+        :param rng: random.Random or the random module
+        :param repulsion: boolean (chromosome phase when loci are linked;
+            see make_haplotypes)
         :return: Person (namedTuple)
         """
-        geno1 = select_genotype(self.trait1)
-        pheno1 = self.all_phenos[geno1]
-        if self.trait2 is not None:
-            geno2 = select_genotype(self.trait2)
-            pheno2 = self.all_phenos[geno2]
-            gametes = (geno1[0] + geno2[0], geno1[1] + geno2[0],
-                       geno1[0] + geno2[1], geno1[1] + geno2[1])
-            return Person((geno1, geno2), {pheno1, pheno2}, set(gametes))
-        return Person(geno1, {pheno1}, {geno1[0], geno1[1]})
+        if genotype is None:
+            genotype = tuple(select_genotype(trait, rng)
+                             for trait in self.traits)
+        elif self.trait2 is None:
+            genotype = (genotype,)
+        code = encode_genotype(genotype, self.traits)
+        phenotype = set(decode_phenotype(phenotype_code(code, self.traits),
+                                         self.traits))
+        haplotypes = None
+        if self.recombination is None:
+            gametes = {decode_gamete(gamete, self.traits)
+                       for gamete in make_gametes(code, self.loci_num)}
+        else:
+            haplotypes = make_haplotypes(code, self.loci_num, repulsion)
+            gametes = {decode_gamete(gamete, self.traits) for gamete
+                       in linked_gametes(haplotypes, self.recombination)}
+        if self.trait2 is None:
+            genotype = genotype[0]
+        return Person(genotype, phenotype, gametes, code, haplotypes)
 
     def make_offspring(self):
         """Combine parent genotypes to form kid genotypes
 
-        :return: list of strings (genotypes)
+        :return: collections.Counter {genotype code: count}
         """
-        if self.loci_num == 1:
-            kids = [x + y for x, y in
-                    itertools.product(self.mom.gametes, self.dad.gametes)]
-        else:
-            kids = [x[0] + y[0] + x[1] + y[1] for x, y in
-                    itertools.product(self.mom.gametes, self.dad.gametes)]
-        result = []
-        for geno in kids:
-            next_kid = ''
-            if geno[1].isupper():
-                next_kid += geno[1] + geno[0]
-            else:
-                next_kid += geno[0] + geno[1]
-            if self.loci_num == 2:
-                if geno[3].isupper():
-                    next_kid += geno[3] + geno[2]
-                else:
-                    next_kid += geno[2] + geno[3]
-            result.append(next_kid)
-        return result
+        if self.recombination is None:
+            return cross(self.mom.code, self.dad.code, self.loci_num)
+        return weighted_cross(self.gamete_weights(self.mom),
+                              self.gamete_weights(self.dad))
+
+    def gamete_weights(self, person):
+        """Chance of each gamete a parent makes
+
+        :param person: Person (mom or dad)
+        :return: collections.Counter {gamete code: Fraction}
+        """
+        if self.recombination is not None:
+            return linked_gametes(person.haplotypes, self.recombination)
+        gametes = make_gametes(person.code, self.loci_num)
+        return collections.Counter({
+            gamete: Fraction(num, len(gametes))
+            for gamete, num in collections.Counter(gametes).items()})
+
+    def linkage_key(self):
+        """What besides the configuration changes a linked cross
+
+        :return: tuple or None
+        """
+        if self.recombination is None:
+            return None
+        return self.recombination, self.mom.haplotypes, self.dad.haplotypes
+
+    def make_linkage_info(self):
+        """Describe the linkage and chromosome phase for the user
+
+        :return: string
+        """
+        text = ('The {} and {} genes are linked, with a recombination '
+                'frequency of {:g}%.'.format(self.trait1['name'],
+                                             self.trait2['name'],
+                                             float(self.recombination * 100)))
+        for name, person in (('Mom', self.mom), ('Dad', self.dad)):
+            if locus_codes(person.code, 2) == [1, 1]:
+                text += " {}'s chromosomes carry {} and {}.".format(
+                    name, *[decode_gamete(gamete, self.traits)
+                            for gamete in person.haplotypes])
+        return text
 
     def genotypic_ratio(self):
         """Calculate genotypic ratio of kids
 
         :return: list [(genotype, count of genotype), ...]
         """
-        uniques = set(self.kids)
-        geno_count = []
-        for geno in uniques:
-            geno_count.append((geno, self.kids.count(geno)))
-        if len(geno_count[0][0]) == 4:
-            multiple = 16 / sum([num for geno, num in geno_count])
-        elif len(geno_count[0][0]) == 2:
-            multiple = 4 / sum([num for geno, num in geno_count])
-        else:
-            raise ValueError('Kid genotypes should be 2 or 4 alleles.')
-        geno_count = [(geno, int(num * multiple)) for geno, num in geno_count]
+        geno_count = [(decode_genotype(code, self.traits), num)
+                      for code, num in self.kids.items()]
         geno_count.sort()
         return geno_count
 
@@ -440,21 +1014,11 @@ class PunnetSet(object):
 
         :return: list [({phenotype}, count of phenotype), ...]
         """
-        pheno_dict = {}
-        for geno, count in self.kid_geno:
-            geno = self.correct_grammar(geno)
-            if len(geno) == 4:
-                phenotype = (self.all_phenos[geno[:2]],
-                             self.all_phenos[geno[2:]])
-            elif len(geno) == 2:
-                phenotype = tuple([self.all_phenos[geno]])
-            else:
-                raise ValueError('Genotype must consist of 2 or 4 alleles.')
-            try:
-                pheno_dict[phenotype] += count
-            except KeyError:
-                pheno_dict[phenotype] = count
-        pheno_count = [(set(key), value) for key, value in pheno_dict.items()]
+        pheno_dict = collections.Counter()
+        for code, count in self.kids.items():
+            pheno_dict[phenotype_code(code, self.traits)] += count
+        pheno_count = [(set(decode_phenotype(code, self.traits)), value)
+                       for code, value in pheno_dict.items()]
         pheno_count.sort()
         return pheno_count
 
@@ -477,14 +1041,17 @@ class PunnetSet(object):
 
         radio_choices = [DOMINANCE_TYPES for _ in self.traits]
         dom_solution = self.dom_type_solution()
-        loop = gui.RadioLoop(title=BOX_TITLE,
-                             prompt=self.info + '\n' + prompt,
-                             questions=questions,
-                             correct_answers=correct_answers,
-                             solution=dom_solution,
-                             choices=radio_choices)
+        loop = frontend.current().RadioLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=dom_solution,
+            choices=radio_choices,
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.SOLUTIONS, traits_key)
     def dom_type_solution(self):
         text = ""
         for trait in self.traits:
@@ -549,14 +1116,17 @@ class PunnetSet(object):
                            ' '.join(self.dad.gametes)]
 
         gamete_solution = self.gamete_solution()
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.info + '\n' + prompt,
-                                questions=questions,
-                                correct_answers=correct_answers,
-                                solution=gamete_solution,
-                                checker=self.check_gamete_answers)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=gamete_solution,
+            checker=self.check_gamete_answers,
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.SOLUTIONS, parents_key)
     def gamete_solution(self):
         """Create string explaining how to solve for parent gametes
 
@@ -602,8 +1172,54 @@ class PunnetSet(object):
                         He=target['he'].capitalize(),
                         trait1=self.trait1['name'],
                         sperm=target['sperm'], gametes=target['gametes']))
+        if self.recombination is not None:
+            text += self.linked_gamete_solution()
+        return text
+
+    def linked_gamete_solution(self):
+        """Explain the chance of each gamete when the loci are linked
+
+        :return: string
+        """
+        text = ('\nThe genes are linked, so gametes that keep a chromosome '
+                'together (parental gametes) are more common than gametes '
+                'made by crossing over (recombinant gametes). With a '
+                'recombination frequency of {0:g}%, each recombinant gamete '
+                'is {0:g}% / 2 = {1:g}% of the gametes, and each parental '
+                'gamete is (100% - {0:g}%) / 2 = {2:g}%. A gamete that is '
+                'both parental and recombinant adds up both chances.\n'
+                ''.format(float(self.recombination * 100),
+                          float(self.recombination * 50),
+                          float((1 - self.recombination) * 50)))
+        for name, person in (('Mom', self.mom), ('Dad', self.dad)):
+            text += '\n{} ({} / {}): {}\n'.format(
+                name, *[decode_gamete(gamete, self.traits)
+                        for gamete in person.haplotypes],
+                ', '.join('{} {:g}%'.format(decode_gamete(gamete, self.traits),
+                                             float(weight * 100))
+                          for gamete, weight
+                          in sorted(self.gamete_weights(person).items())))
         return text
 
+    def count_instructions(self, word):
+        """First steps of the kid ratio solutions
+
+        :param word: string ('genotype' or 'phenotype')
+        :return: string
+        """
+        if self.recombination is None:
+            return ('To answer this question you should construct a punnet '
+                    'square like the one shown below. Then you need to count '
+                    'the number of squares (representing children) with each '
+                    'unique {}. '.format(word))
+        return ('To answer this question you should construct a punnet '
+                'square like the one shown below, with the chance of each '
+                'gamete. The chance of each square is the chance of its egg '
+                'times the chance of its sperm. Add up the chances of the '
+                'squares with each unique {}, then scale them to whole '
+                'numbers. '.format(word))
+
+    @cache.cached_method(cache.GRADES, gamete_grade_key, copy=list)
     def check_gamete_answers(self, raw_answers):
         """Compare user answers (raw) to the gametes of this PunnetSet
 
@@ -635,21 +1251,25 @@ class PunnetSet(object):
 
         parent_pheno_solution = self.parent_solution_for("pheno")
 
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.info + '\n' + prompt,
-                                questions=questions,
-                                correct_answers=correct_answers,
-                                solution=parent_pheno_solution,
-                                checker=self.parent_phenotype_checker)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=parent_pheno_solution,
+            checker=self.parent_phenotype_checker,
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.GRADES, phenotype_grade_key, copy=list)
     def parent_phenotype_checker(self, raw_answers):
         """Compare user answers (raw) to the parent phenotypes
 
         :param raw_answers: list of strings
         :return: list of booleans
         """
-        formatted = [set(x.lower().split(' and ')) for x in raw_answers]
+        formatted = [set(normalize_answer(x).lower().split(' and '))
+                     for x in raw_answers]
         correct_answers = [self.mom.phenotype, self.dad.phenotype]
         correct_answers = [set([x.lower() for x in parent])
                            for parent in correct_answers]
@@ -670,14 +1290,17 @@ class PunnetSet(object):
         parent_geno_solution = self.parent_solution_for("geno")
         correct_answers = [self.correct_grammar(''.join(x))
                            for x in [self.mom.genotype, self.dad.genotype]]
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.info + '\n' + prompt,
-                                questions=questions,
-                                correct_answers=correct_answers,
-                                solution=parent_geno_solution,
-                                checker=self.parent_genotype_checker)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=parent_geno_solution,
+            checker=self.parent_genotype_checker,
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.SOLUTIONS, configuration_key)
     def parent_solution_for(self, question_type):
         """Return solution for parent_genotype or parent_phenotype
 
@@ -688,9 +1311,11 @@ class PunnetSet(object):
             raise ValueError("question_type must be 'geno' or 'pheno'.")
 
         parent_words = {'dad': {'his': 'his', 'info':self.info_type[1],
+                                'code': self.dad.code,
                                 'geno': ''.join(self.dad.genotype),
                                 'pheno': ' and '.join(self.dad.phenotype)},
                         'mom': {'his': 'her', 'info':self.info_type[0],
+                                'code': self.mom.code,
                                 'geno': ''.join(self.mom.genotype),
                                 'pheno': ' and '.join(self.mom.phenotype)}}
         text = self.dom_type_solution() + "\n"
@@ -714,7 +1339,7 @@ class PunnetSet(object):
                                    other_calc_ed=parent[q_words['other_short']],
                                    self_calc_ed=parent[q_words['self_short']]))
             if parent["info"] == "zygous":
-                zygous_type = " and ".join(self.make_zygous(parent["geno"]))
+                zygous_type = " and ".join(self.make_zygous(parent["code"]))
                 text += ("Homozygous means having two of the same allele. "
                          "Heterozygous means having two different alleles. "
                          "Since we know {name} is {zygous}, we can "
@@ -731,13 +1356,15 @@ class PunnetSet(object):
 
         return text
 
+    @cache.cached_method(cache.GRADES, genotype_grade_key, copy=list)
     def parent_genotype_checker(self, raw_answers):
         """Compare user answers (raw) to the parent genotypes
 
         :param raw_answers: list of strings
         :return: list of booleans
         """
-        formatted = [self.correct_grammar(geno) for geno in raw_answers ]
+        formatted = [self.correct_grammar(normalize_answer(geno))
+                     for geno in raw_answers]
         correct_answers = [self.correct_grammar(''.join(x))
                            for x in [self.mom.genotype, self.dad.genotype]]
         result = [user == correct for user, correct in
@@ -766,21 +1393,21 @@ class PunnetSet(object):
         else:
             entry_num = 9
         questions = [""] * entry_num
-        kid_phenotype_solution = (
-            'To answer this question you should construct a punnet square '
-            'like the one shown below. Then you need to count the number of '
-            'squares (representing children) with each unique phenotype. '
+        kid_phenotype_solution = self.count_instructions('phenotype') + (
             'The phenotype ratio of this problem is: {}').format(
             ': '.join(['{} {}'.format(num, ' and '.join(phenos))
                       for phenos, num in self.kid_pheno]))
         kid_phenotype_table = self.make_pheno_square(self.make_geno_square())
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.info + '\n' + prompt,
-                                questions=questions,
-                                correct_answers=correct_answers,
-                                solution=kid_phenotype_solution,
-                                checker=self.kid_phenotype_checker,
-                                solution_table=kid_phenotype_table)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=kid_phenotype_solution,
+            checker=self.kid_phenotype_checker,
+            solution_table=kid_phenotype_table,
+            solution_key=configuration_key(self, 'pheno'),
+            problem=self)
         return loop.main_loop()
 
     @staticmethod
@@ -806,6 +1433,7 @@ class PunnetSet(object):
                 correct_list.append(False)
         return correct_list
 
+    @cache.cached_method(cache.GRADES, phenotype_grade_key, copy=list)
     def kid_phenotype_checker(self, raw_answers):
         """Compare user answers (raw) to the kid phenotypic ratio.
 
@@ -816,16 +1444,12 @@ class PunnetSet(object):
         :return: list of booleans
         """
         numeric_answers = []
+        pheno_answers = []
         for phrase in raw_answers:
-            if phrase:
-                if phrase[0].isnumeric():
-                    numeric_answers.append(phrase[0])
-                else:
-                    numeric_answers.append('0')
-            else:
-                numeric_answers.append('0')
-        pheno_answers = [x.replace(num, '').strip().lower()
-                         for x, num in zip(raw_answers, numeric_answers)]
+            phrase = normalize_answer(phrase)
+            digits = len(phrase) - len(phrase.lstrip('0123456789'))
+            numeric_answers.append(phrase[:digits] or '0')
+            pheno_answers.append(phrase[digits:].strip().lower())
         formatted_answers = [(set(phrase), int(num)) for phrase, num in zip(
             [set(x.lower().split(' and ')) for x in pheno_answers],
             numeric_answers)]
@@ -848,10 +1472,7 @@ class PunnetSet(object):
                   'below. Include a single genotype in each box, along with '
                   'the number number of offspring that will have that '
                   'genotype. Some boxes may remain blank.')
-        kid_geno_solution = (
-            'To answer this question you should construct a punnet square '
-            'like the one shown below. Then you need to count the number of '
-            'squares (representing children) with each unique genotype. '
+        kid_geno_solution = self.count_instructions('genotype') + (
             'The genotype ratio of this problem is: {}').format(
             ': '.join(['{} {}'.format(num, geno)
                       for geno, num in self.kid_geno]))
@@ -866,15 +1487,19 @@ class PunnetSet(object):
         else:
             entry_num = 9
         questions = [""] * entry_num
-        loop = gui.QuestionLoop(title=BOX_TITLE,
-                                prompt=self.info + '\n' + prompt,
-                                questions=questions,
-                                correct_answers=correct_answers,
-                                solution=kid_geno_solution,
-                                checker=self.kid_genotype_checker,
-                                solution_table=kid_geno_table)
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.info + '\n' + prompt,
+            questions=questions,
+            correct_answers=correct_answers,
+            solution=kid_geno_solution,
+            checker=self.kid_genotype_checker,
+            solution_table=kid_geno_table,
+            solution_key=configuration_key(self, 'geno'),
+            problem=self)
         return loop.main_loop()
 
+    @cache.cached_method(cache.GRADES, ratio_grade_key, copy=list)
     def kid_genotype_checker(self, raw_answers):
         """Compare user answers (raw) to the kid genotypic ratio.
 
@@ -903,10 +1528,10 @@ class PunnetSet(object):
             return correct_list
     # endregion
 
-    def ask(self):
-        """Ask all appropriate questions for this PunnetSet
+    def question_methods(self):
+        """List the questions to ask, leaving out what the info already gives
 
-        :return: string, int, int (response, points earned, points possible)
+        :return: list of bound methods
         """
         question_list = [self.dom_type_question,
                          self.parent_phenotype_question,
@@ -921,33 +1546,37 @@ class PunnetSet(object):
             question_list.remove(self.parent_genotype_question)
         if self.loci_num == 2:
             question_list.remove(self.kid_genotype_question)
+        return question_list
+
+    def ask(self):
+        """Ask all appropriate questions for this PunnetSet
 
-        for question in question_list:
+        :return: string, int, int (response, points earned, points possible)
+        """
+        for question in self.question_methods():
             response = question()
             if response in ("Main Menu", "Exit", None):
                 return response
         return response
 
 
+def linked_punnet_set(rng=random):
+    """Make a two trait PunnetSet with linked loci
+
+    :param rng: random.Random or the random module
+    :return: PunnetSet
+    """
+    return PunnetSet(2, rng=rng,
+                     recombination=rng.choice(RECOMBINATION_FREQS))
+
+
 def ask_questions(prob_type='both'):
     """Sequentially ask all question for a PunnetSet
 
-    :param prob_type: string (1, 2, or both)
+    :param prob_type: string (1, 2, both, or linked; see PROB_TYPE_TAGS)
     :return: None
     """
-    want_more = True
-    while want_more:
-        want_more = False
-        if prob_type == 'both':
-            num = random.choice([1, 2])
-            question = PunnetSet(num)
-        elif prob_type == '2':
-            question = PunnetSet(2)
-        else:
-            question = PunnetSet(1)
-        response = question.ask()
-        if response == "New Question":
-            want_more = True
+    registry.QUESTIONS.run(PROB_TYPE_TAGS.get(prob_type, ['one trait']))
 
 
 
@@ -957,11 +1586,11 @@ def run():
     :return: string (user response)
     """
 
-    window = gui.SimpleWindow(
+    window = frontend.current().SimpleWindow(
         title=BOX_TITLE, msg=('Which type of punnet square problems '
-                              'would you like to practice?'),
+        'would you like to practice?'),
         buttons=['One trait', 'Two trait', 'One and two trait',
-                 'Main Menu', 'Exit Program'])
+        'Linked traits', 'Multiple alleles', 'Main Menu', 'Exit Program'])
     window.run()
     user_choice = window.clicked
     if user_choice == 'One trait':
@@ -970,6 +1599,10 @@ def run():
         ask_questions('2')
     elif user_choice == 'One and two trait':
         ask_questions('both')
+    elif user_choice == 'Linked traits':
+        ask_questions('linked')
+    elif user_choice == 'Multiple alleles':
+        registry.QUESTIONS.run(['multiple alleles'])
     elif user_choice == 'Main Menus':
         main.run()
     return user_choice
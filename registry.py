@@ -0,0 +1,231 @@
+"""Weighted registry of question types, loaded on first use
+
+Each question type is declared by name with a "module:attribute" path to
+the class (or function) that makes it, a weight, and tags such as
+'hardy-weinberg' or 'punnet'. A declaration imports nothing: the module is
+imported the first time that type is drawn, so adding problem families
+doesn't slow down startup.
+
+Types are drawn in constant time with an alias table (Vose's method),
+built once for each set of tags asked for and rebuilt only when a type is
+registered. Other packages can add types through the ENTRY_POINT_GROUP
+entry point group, for example in pyproject.toml:
+
+    [project.entry-points."problem_maker.question_types"]
+    my_question = "my_package.questions:MyQuestion [punnet]"
+
+where the extras in brackets become its tags (entry points carry no
+weight, so they get DEFAULT_WEIGHT).
+"""
+import collections
+import importlib
+import random
+from importlib import metadata
+
+ENTRY_POINT_GROUP = 'problem_maker.question_types'
+DEFAULT_WEIGHT = 1
+
+QuestionType = collections.namedtuple(
+    'QuestionType', ['name', 'path', 'weight', 'tags', 'args', 'kwargs'],
+    defaults=(DEFAULT_WEIGHT, frozenset(), (), None))
+
+AliasTable = collections.namedtuple('AliasTable', ['types', 'probs',
+                                                   'aliases'])
+
+
+def build_alias_table(types):
+    """Precompute Vose's alias table for drawing types by weight
+
+    :param types: list of QuestionType (weights must be positive)
+    :return: AliasTable
+    """
+    if not types:
+        raise ValueError('There are no question types to draw from.')
+    total = sum(each.weight for each in types)
+    scaled = [each.weight * len(types) / total for each in types]
+    probs = [1.0] * len(types)
+    aliases = list(range(len(types)))
+    small = [num for num, prob in enumerate(scaled) if prob < 1]
+    large = [num for num, prob in enumerate(scaled) if prob >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probs[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] -= 1 - scaled[less]
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+    # anything left over is 1 up to rounding error
+    return AliasTable(tuple(types), probs, aliases)
+
+
+def draw_alias(table, rng=random):
+    """Draw one type from an alias table
+
+    :param table: AliasTable
+    :param rng: random.Random or the random module
+    :return: QuestionType
+    """
+    num = rng.randrange(len(table.types))
+    if rng.random() >= table.probs[num]:
+        num = table.aliases[num]
+    return table.types[num]
+
+
+def import_path(path):
+    """Import the object a "module:attribute" path names
+
+    :param path: string
+    :return: object
+    """
+    module_name, _, attribute = path.partition(':')
+    target = importlib.import_module(module_name)
+    for name in attribute.split('.'):
+        target = getattr(target, name)
+    return target
+
+
+class Registry(object):
+    def __init__(self):
+        self.types = collections.OrderedDict()
+        self.loaded = {}
+        self.tables = {}
+        self.entry_points_loaded = False
+
+    def register(self, name, path, weight=DEFAULT_WEIGHT, tags=(), args=(),
+                 kwargs=None):
+        """Declare a question type without importing it
+
+        :param name: string (unique)
+        :param path: string ("module:attribute" of the class or function
+            that makes a question; it is called with args, kwargs, and
+            rng=rng, and the result must have ask())
+        :param weight: number (how often it is drawn, relative to the
+            others drawn with it)
+        :param tags: iterable of strings
+        :param args: tuple
+        :param kwargs: dict or None
+        :return: QuestionType
+        """
+        if not weight > 0:
+            raise ValueError('Weight must be positive, not', weight)
+        if name in self.types:
+            raise ValueError('Question type already registered:', name)
+        question_type = QuestionType(name, path, weight, frozenset(tags),
+                                     tuple(args), kwargs)
+        self.types[name] = question_type
+        self.tables.clear()
+        return question_type
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        """Register the question types other packages declare
+
+        :param group: string (entry point group)
+        :return: None
+        """
+        self.entry_points_loaded = True
+        for entry_point in metadata.entry_points(group=group):
+            if entry_point.name not in self.types:
+                path = '{}:{}'.format(entry_point.module, entry_point.attr)
+                self.register(entry_point.name, path,
+                              tags=entry_point.extras)
+
+    def select(self, tags=None):
+        """List the types with any of the given tags
+
+        :param tags: iterable of strings or None (every type)
+        :return: list of QuestionType
+        """
+        if not self.entry_points_loaded:
+            self.load_entry_points()
+        if tags is None:
+            return list(self.types.values())
+        tags = frozenset(tags)
+        return [each for each in self.types.values() if each.tags & tags]
+
+    def alias_table(self, tags=None):
+        """Return the alias table for some tags, building it on first use
+
+        :param tags: iterable of strings or None
+        :return: AliasTable
+        """
+        key = None if tags is None else frozenset(tags)
+        table = self.tables.get(key)
+        if table is None:
+            table = build_alias_table(self.select(tags))
+            self.tables[key] = table
+        return table
+
+    def draw(self, tags=None, rng=random):
+        """Pick a question type by weight
+
+        :param tags: iterable of strings or None
+        :param rng: random.Random or the random module
+        :return: QuestionType
+        """
+        return draw_alias(self.alias_table(tags), rng)
+
+    def load(self, question_type):
+        """Return what makes a question type, importing it on first use
+
+        :param question_type: QuestionType or string (its name)
+        :return: class or function
+        """
+        if isinstance(question_type, str):
+            question_type = self.types[question_type]
+        maker = self.loaded.get(question_type.name)
+        if maker is None:
+            maker = import_path(question_type.path)
+            self.loaded[question_type.name] = maker
+        return maker
+
+    def make(self, tags=None, rng=random):
+        """Draw a question type and make a question of it
+
+        :param tags: iterable of strings or None
+        :param rng: random.Random or the random module
+        :return: question (with ask())
+        """
+        question_type = self.draw(tags, rng)
+        return self.load(question_type)(*question_type.args,
+                                        **dict(question_type.kwargs or {}),
+                                        rng=rng)
+
+    def run(self, tags=None):
+        """Ask questions drawn from tags until the user stops
+
+        :param tags: iterable of strings or None
+        :return: string (the last button clicked)
+        """
+        resp = 'New Question'
+        while resp == 'New Question':
+            resp = self.make(tags).ask()
+        return resp
+
+
+QUESTIONS = Registry()
+
+HW_WEIGHTS = [('GivenPorQ', 1), ('GivenPQWithPop', 1), ('GivenP2orQ2', 1),
+              ('GivenSqWithPop', 1), ('GivenTwo', 2)]
+for hw_name, hw_weight in HW_WEIGHTS:
+    QUESTIONS.register(hw_name, 'hardy_weinberg:' + hw_name, hw_weight,
+                       tags=['hardy-weinberg'])
+QUESTIONS.register('one trait', 'punnet:PunnetSet', args=(1,),
+                   tags=['punnet', 'one trait'])
+QUESTIONS.register('two trait', 'punnet:PunnetSet', args=(2,),
+                   tags=['punnet', 'two trait'])
+QUESTIONS.register('linked traits', 'punnet:linked_punnet_set',
+                   tags=['punnet', 'linked'])
+QUESTIONS.register('multiple alleles', 'multi_allele:MultiAlleleCross',
+                   tags=['multiple alleles'])
+QUESTIONS.register('parents from offspring', 'inverse:ParentQuestion',
+                   tags=['inverse'])
+QUESTIONS.register('chi-square', 'simulate:SimulatedCross',
+                   tags=['chi-square'])
+QUESTIONS.register('pedigree', 'pedigree:PedigreeQuestion',
+                   tags=['pedigree'])
+QUESTIONS.register('polygenic', 'polygenic:PolygenicCross',
+                   tags=['polygenic'])
+QUESTIONS.register('random mating', 'mating:MatingQuestion',
+                   tags=['mating'])
@@ -0,0 +1,206 @@
+"""Simulated large crosses checked against the expected ratio by chi-square
+
+The offspring of a PunnetSet cross are sampled in one multinomial draw, so
+making and grading a problem takes the same time for a hundred offspring
+or for millions.
+"""
+import random
+
+import numpy
+
+import frontend
+import hardy_weinberg
+import punnet
+import registry
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+OFFSPRING_NUMS = [100, 200, 500, 1000, 5000, 100000, 1000000, 5000000]
+
+# chi-square critical values for p = 0.05, by degrees of freedom
+CRITICAL_VALUES = {1: 3.84, 2: 5.99, 3: 7.81, 4: 9.49, 5: 11.07, 6: 12.59,
+                   7: 14.07, 8: 15.51}
+
+RATIO_KINDS = ['geno', 'pheno']
+RATIO_NAMES = {'geno': 'genotypic', 'pheno': 'phenotypic'}
+
+
+def simulate_offspring(ratio, offspring_num, generator):
+    """Draw offspring counts for every class of a ratio at once
+
+    :param ratio: list of tuples (label, count) (such as kid_geno)
+    :param offspring_num: int
+    :param generator: numpy.random.Generator
+    :return: list of ints (observed count for each class of ratio)
+    """
+    weights = numpy.array([count for _, count in ratio], dtype=float)
+    return generator.multinomial(offspring_num,
+                                 weights / weights.sum()).tolist()
+
+
+def expected_counts(ratio, offspring_num):
+    """Expected number of offspring in each class of a ratio
+
+    :param ratio: list of tuples (label, count)
+    :param offspring_num: int
+    :return: list of floats
+    """
+    total = sum(count for _, count in ratio)
+    return [offspring_num * count / total for _, count in ratio]
+
+
+def chi_square(observed, expected):
+    """Chi-square statistic for observed counts
+
+    :param observed: list of ints
+    :param expected: list of floats
+    :return: float
+    """
+    observed = numpy.asarray(observed, dtype=float)
+    expected = numpy.asarray(expected, dtype=float)
+    return float(((observed - expected) ** 2 / expected).sum())
+
+
+def number_checker(user, real, fuzz):
+    try:
+        return hardy_weinberg.fuzzy_equal(float(user), real, fuzz)
+    except ValueError:
+        return False
+
+
+class SimulatedCross(object):
+    def __init__(self, loci_num=None, kind=None, offspring_num=None,
+                 rng=random):
+        """Simulate a large cross and ask for a chi-square test of it
+
+        :param loci_num: int or None (1 or 2; None picks one)
+        :param kind: string or None ('geno' or 'pheno'; None picks one)
+        :param offspring_num: int or None (None picks from OFFSPRING_NUMS)
+        :param rng: random.Random or the random module
+        """
+        if loci_num is None:
+            loci_num = rng.choice([1, 2])
+        if kind is None:
+            kind = rng.choice(RATIO_KINDS)
+        if kind not in RATIO_KINDS:
+            raise ValueError('Ratio kind must be one of', RATIO_KINDS)
+        if offspring_num is None:
+            offspring_num = rng.choice(OFFSPRING_NUMS)
+        self.kind = kind
+        self.offspring_num = offspring_num
+
+        # a single class of offspring leaves nothing to test
+        self.punnet_set = punnet.PunnetSet(loci_num, rng=rng)
+        while len(self.ratio_for(self.punnet_set)) < 2:
+            self.punnet_set = punnet.PunnetSet(loci_num, rng=rng)
+        self.ratio = self.ratio_for(self.punnet_set)
+        self.labels = [label for label, _ in self.ratio]
+
+        generator = numpy.random.default_rng(rng.getrandbits(64))
+        self.observed = simulate_offspring(self.ratio, offspring_num,
+                                           generator)
+        self.expected = expected_counts(self.ratio, offspring_num)
+        self.chi_square = chi_square(self.observed, self.expected)
+        self.degrees = len(self.ratio) - 1
+        self.critical_value = CRITICAL_VALUES[self.degrees]
+        self.reject = self.chi_square > self.critical_value
+
+        self.question = self.make_question()
+        self.solution = self.make_solution()
+
+    def ratio_for(self, punnet_set):
+        """The expected ratio, with labels ready to display
+
+        :param punnet_set: PunnetSet
+        :return: list of tuples (string, int)
+        """
+        if self.kind == 'geno':
+            return punnet_set.genotypic_ratio()
+        return [(' and '.join(sorted(pheno)), num)
+                for pheno, num in punnet_set.phenotypic_ratio()]
+
+    def make_question(self):
+        counts = ', '.join('{:,} {}'.format(num, label)
+                           for label, num in zip(self.labels, self.observed))
+        return ('{}\n\nThey had {:,} offspring: {}.'
+                ''.format(self.punnet_set.info, self.offspring_num, counts))
+
+    def make_solution(self):
+        ratio = ': '.join('{} {}'.format(num, label)
+                          for label, num in self.ratio)
+        total = sum(num for _, num in self.ratio)
+        expected = '\n'.join(
+            '\t{}: {:,} x {}/{} = {:.2f}'.format(
+                label, self.offspring_num, num, total, value)
+            for (label, num), value in zip(self.ratio, self.expected))
+        terms = '\n'.join(
+            '\t{}: ({:,} - {:.2f})\u00b2 / {:.2f} = {:.2f}'.format(
+                label, observed, value, value, (observed - value) ** 2 / value)
+            for label, observed, value
+            in zip(self.labels, self.observed, self.expected))
+        if self.reject:
+            conclusion = ('{:.2f} is greater than the critical value, {}, so '
+                          'the offspring do not fit the expected ratio.')
+        else:
+            conclusion = ('{:.2f} is not greater than the critical value, '
+                          '{}, so the offspring fit the expected ratio.')
+        return ('The punnet square for these parents gives an expected {} '
+                'ratio of {}.\n\nMultiply the number of offspring by the '
+                'fraction expected in each class:\n{}\n\nAdd up (observed - '
+                'expected)\u00b2 / expected for every class:\n{}\n\t'
+                '\u03c7\u00b2 = {:.2f}\n\nThere are {} classes, so there '
+                'are {} - 1 = {} degrees of freedom. '.format(
+                    RATIO_NAMES[self.kind], ratio, expected, terms,
+                    self.chi_square, len(self.ratio), len(self.ratio),
+                    self.degrees) +
+                conclusion.format(self.chi_square, self.critical_value))
+
+    def correct_answers(self):
+        return (['{:.2f}'.format(value) for value in self.expected] +
+                ['{:.2f}'.format(self.chi_square), str(self.degrees),
+                 'yes' if self.reject else 'no'])
+
+    def answer_checker(self, raw_answers):
+        """Compare user answers (raw) to the chi-square test
+
+        Expected counts may be off by 0.5, and chi-square by 2% (plus 0.05
+        for rounding), so rounding the expected counts first is accepted.
+
+        :param raw_answers: list of strings
+        :return: list of booleans
+        """
+        raw_answers = list(raw_answers) + [''] * (
+            len(self.ratio) + 3 - len(raw_answers))
+        result = [number_checker(user, real, 0.5) for user, real
+                  in zip(raw_answers, self.expected)]
+        chi_answer, degree_answer, reject_answer = raw_answers[
+            len(self.ratio):len(self.ratio) + 3]
+        result.append(number_checker(chi_answer, self.chi_square,
+                                     0.02 * self.chi_square + 0.05))
+        result.append(degree_answer.strip() == str(self.degrees))
+        result.append(reject_answer.strip().lower() in (
+            ('yes', 'y') if self.reject else ('no', 'n')))
+        return result
+
+    def ask(self):
+        table = ', '.join('{} df: {}'.format(degrees, value)
+                          for degrees, value in sorted(CRITICAL_VALUES.items()))
+        prompt = ('\n\nUse a chi-square test to decide if these offspring '
+                  'fit the {} ratio expected from the parents. Round to two '
+                  'decimal places. Critical values for p = 0.05 are {}.'
+                  ''.format(RATIO_NAMES[self.kind], table))
+        questions = ['Expected {}:'.format(label) for label in self.labels]
+        questions += ['Chi-square:', 'Degrees of freedom:',
+                      'Reject the expected ratio? (yes/no)']
+        loop = frontend.current().QuestionLoop(
+            title=BOX_TITLE,
+            prompt=self.question + prompt,
+            questions=questions,
+            correct_answers=self.correct_answers(),
+            solution=self.solution,
+            checker=self.answer_checker,
+            problem=self)
+        return loop.main_loop()
+
+if __name__ == "__main__":
+    registry.QUESTIONS.run(['chi-square'])
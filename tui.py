@@ -0,0 +1,372 @@
+"""Curses front-end for thin clients and SSH sessions
+
+Runs the same question flow as the Tk front-end without importing tkinter
+or PIL. Start it with: python tui.py
+
+Keys: Tab/Up/Down move between fields, Left/Right pick a radio choice or a
+button, Enter moves to the next field or presses the selected button,
+1-9 press a button while the button bar is selected, and Page Up/Down
+scroll long text.
+"""
+import curses
+import os
+import textwrap
+
+import frontend
+import loop
+import main
+import watchdog
+
+BOX_TITLE = "BZ 111 Quiz Program"
+
+SCREEN = None   # curses window, set by run()
+
+INCORRECT = 1   # color pair for wrong answers
+
+ENTER_KEYS = ('\n', '\r', curses.KEY_ENTER)
+BACKSPACE_KEYS = ('\b', '\x7f', curses.KEY_BACKSPACE)
+NEXT_KEYS = ('\t', curses.KEY_DOWN)
+PREVIOUS_KEYS = (curses.KEY_BTAB, curses.KEY_UP)
+
+
+def text_table(nested_list):
+    """Draw a table (such as a punnet square) as a grid of text
+
+    :param nested_list: list of lists of strings (cells may hold newlines)
+    :return: list of strings (one per line)
+    """
+    cells = [[cell.split('\n') for cell in row] for row in nested_list]
+    widths = [max(len(line) for row in cells for line in row[col_num])
+              for col_num in range(len(cells[0]))]
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    lines = [border]
+    for row in cells:
+        for line_num in range(max(len(cell) for cell in row)):
+            parts = [' {} '.format((cell[line_num] if line_num < len(cell)
+                                    else '').center(width))
+                     for width, cell in zip(widths, row)]
+            lines.append('|' + '|'.join(parts) + '|')
+        lines.append(border)
+    return lines
+
+
+def wrap(msg, width):
+    """Wrap text to the screen, keeping blank lines and indents
+
+    :param msg: string
+    :param width: int
+    :return: list of strings
+    """
+    lines = []
+    for paragraph in msg.expandtabs(4).split('\n'):
+        indent = paragraph[:len(paragraph) - len(paragraph.lstrip())]
+        lines += textwrap.wrap(paragraph, max(width, 10),
+                               subsequent_indent=indent) or ['']
+    return lines
+
+
+class EntryField(object):
+    def __init__(self, label, value='', wrong=False):
+        self.label = label
+        self.value = value
+        self.wrong = wrong
+
+    def render(self, focused):
+        cursor = '_' if focused else ''
+        return '{} [{}{}]'.format(self.label, self.value, cursor)
+
+    def handle(self, key):
+        if key in BACKSPACE_KEYS:
+            self.value = self.value[:-1]
+        elif isinstance(key, str) and key.isprintable():
+            self.value += key
+
+
+class RadioField(object):
+    def __init__(self, label, choices, value=None, wrong=False):
+        self.label = label
+        self.choices = choices
+        self.value = value
+        self.wrong = wrong
+
+    def render(self, focused):
+        return '{}  {}'.format(self.label, '  '.join(
+            '({}) {}'.format('*' if choice == self.value else ' ', choice)
+            for choice in self.choices))
+
+    def handle(self, key):
+        if key in (curses.KEY_LEFT, curses.KEY_RIGHT, ' '):
+            step = -1 if key == curses.KEY_LEFT else 1
+            try:
+                index = self.choices.index(self.value) + step
+            except ValueError:
+                index = 0
+            self.value = self.choices[index % len(self.choices)]
+
+
+class Window(object):
+    def __init__(self, title='', msg='', buttons=None):
+        if buttons is None:
+            buttons = ['Okay']
+        self.title = title
+        self.msg = msg
+        self.buttons = buttons
+        self.clicked = None
+        self.extra_lines = []   # (text, attribute) shown after the message
+        self.fields = []        # EntryFields or RadioFields
+        self.focus = 0          # len(self.fields) is the button bar
+        self.button_num = 0
+        self.offset = 0
+        self.follow_focus = True
+        watchdog.screen_shown()
+
+    @staticmethod
+    def label_width(questions):
+        return max([len(each) for each in questions] + [0])
+
+    def run(self):
+        if SCREEN is None:
+            raise RuntimeError('Start the terminal front-end with tui.run().')
+        self.focus = 0
+        while self.clicked is None:
+            self.draw()
+            try:
+                key = SCREEN.get_wch()
+            except curses.error:
+                continue
+            self.handle(key)
+
+    def draw(self):
+        height, width = SCREEN.getmaxyx()
+        lines = [(self.title, curses.A_BOLD), ('', 0)]
+        lines += [(line, 0) for line in wrap(self.msg, width - 1)]
+        lines += self.extra_lines
+        focus_line = None
+        for field_num, field in enumerate(self.fields):
+            attribute = curses.color_pair(INCORRECT) if field.wrong else 0
+            if field_num == self.focus:
+                attribute |= curses.A_REVERSE
+                focus_line = len(lines)
+            lines.append((field.render(field_num == self.focus), attribute))
+
+        body_height = max(height - 2, 1)
+        if self.follow_focus and focus_line is not None:
+            if focus_line < self.offset:
+                self.offset = focus_line
+            elif focus_line >= self.offset + body_height:
+                self.offset = focus_line - body_height + 1
+        self.offset = max(0, min(self.offset, len(lines) - body_height))
+
+        SCREEN.erase()
+        for row, (text, attribute) in enumerate(
+                lines[self.offset:self.offset + body_height]):
+            SCREEN.addnstr(row, 0, text, width - 1, attribute)
+        column = 0
+        for button_num, name in enumerate(self.buttons):
+            label = '[{}] {}'.format(button_num + 1, name)
+            if self.focus == len(self.fields) and (
+                    button_num == self.button_num):
+                attribute = curses.A_REVERSE
+            else:
+                attribute = curses.A_BOLD
+            if column + len(label) < width:
+                SCREEN.addstr(height - 1, column, label, attribute)
+            column += len(label) + 2
+        SCREEN.refresh()
+
+    def handle(self, key):
+        """Respond to one key press
+
+        :param key: string or int (from get_wch)
+        :return: None
+        """
+        on_buttons = self.focus == len(self.fields)
+        page = max(SCREEN.getmaxyx()[0] - 3, 1)
+        if key == curses.KEY_NPAGE or (not self.fields and
+                                       key == curses.KEY_DOWN):
+            self.offset += page if key == curses.KEY_NPAGE else 1
+            self.follow_focus = False
+        elif key == curses.KEY_PPAGE or (not self.fields and
+                                         key == curses.KEY_UP):
+            self.offset -= page if key == curses.KEY_PPAGE else 1
+            self.follow_focus = False
+        elif key in NEXT_KEYS:
+            self.move_focus(1)
+        elif key in PREVIOUS_KEYS:
+            self.move_focus(-1)
+        elif on_buttons:
+            if key == curses.KEY_LEFT:
+                self.button_num = (self.button_num - 1) % len(self.buttons)
+            elif key == curses.KEY_RIGHT:
+                self.button_num = (self.button_num + 1) % len(self.buttons)
+            elif key in ENTER_KEYS:
+                self.click(self.buttons[self.button_num])
+            elif isinstance(key, str) and key.isdigit() and (
+                    1 <= int(key) <= len(self.buttons)):
+                self.click(self.buttons[int(key) - 1])
+        elif key in ENTER_KEYS:
+            self.move_focus(1)
+        else:
+            self.fields[self.focus].handle(key)
+
+    def move_focus(self, step):
+        self.focus = (self.focus + step) % (len(self.fields) + 1)
+        self.follow_focus = True
+
+    def click(self, button_name):
+        """Store the name of the button clicked and close the window
+
+        :param button_name: string
+        :return: None
+        """
+        self.clicked = button_name
+
+
+class SimpleWindow(Window):
+    pass
+
+
+class TableWindow(Window):
+    def __init__(self, table, title='', msg='', buttons=None):
+        super().__init__(title, msg, buttons)
+        self.extra_lines = [(line, 0) for line in text_table(table)]
+
+
+class EntryQuestion(Window):
+    def __init__(self, title='', msg='', questions=None, default_entry=None,
+                 colors=None, buttons=None, is_disabled=False):
+        super().__init__(title, msg, buttons or ['Submit'])
+        self.user_entries = []
+        questions = questions or []
+        default_entry = default_entry or []
+        colors = colors or []
+        width = self.label_width(questions)
+        for row_num, each_q in enumerate(questions):
+            value = default_entry[row_num] if row_num < len(
+                default_entry) else ''
+            wrong = row_num < len(colors) and not colors[row_num]
+            field = EntryField(each_q.rjust(width), value, wrong)
+            if is_disabled:
+                attribute = curses.color_pair(INCORRECT) if wrong else 0
+                self.extra_lines.append((field.render(False), attribute))
+            else:
+                self.fields.append(field)
+
+    def click(self, button_name):
+        self.user_entries = [field.value for field in self.fields]
+        super().click(button_name)
+
+
+class RadioQuestion(Window):
+    def __init__(self, title='', msg='', questions=None, choices=None,
+                 buttons=None, colors=None, default_entry=None):
+        super().__init__(title, msg, buttons or ['Submit'])
+        self.user_entries = []
+        questions = questions or []
+        choices = choices or [[]]
+        default_entry = default_entry or [None for _ in questions]
+        colors = colors or []
+        width = self.label_width(questions)
+        for row_num, (each_q, choice_list) in enumerate(
+                zip(questions, choices)):
+            wrong = row_num < len(colors) and not colors[row_num]
+            self.fields.append(RadioField(each_q.rjust(width), choice_list,
+                                          default_entry[row_num], wrong))
+
+    def click(self, button_name):
+        self.user_entries = [field.value or '' for field in self.fields]
+        super().click(button_name)
+
+
+class QuestionLoop(loop.QuestionLoop):
+    def get_answers(self, old_answers, old_correct_list):
+        the_question = EntryQuestion(title=self.title, msg=self.prompt,
+                                     questions=self.questions,
+                                     default_entry=old_answers,
+                                     colors=old_correct_list)
+        the_question.run()
+        return the_question.user_entries
+
+    def display_correct_window(self):
+        window = SimpleWindow(self.title, msg="That's right!",
+                              buttons=self.correct_buttons())
+        window.run()
+        return window.clicked
+
+    def display_incorrect_window(self, is_correct_list):
+        window = SimpleWindow(self.title,
+                              msg=self.incorrect_message(is_correct_list),
+                              buttons=['Try Again', 'Show Answers',
+                                       'Show Solution', 'Main Menu'])
+        window.run()
+        return window.clicked
+
+    def show_answers(self, correct_answers, raw_answers, is_correct_list):
+        corrected_answers = self.corrected_answers(
+            correct_answers, raw_answers, is_correct_list)
+        window = EntryQuestion(title=self.title, questions=self.questions,
+                               msg=('{}\n\nCorrect answer (Your answer)\n'
+                                    ''.format(self.prompt)),
+                               default_entry=corrected_answers,
+                               colors=is_correct_list,
+                               buttons=self.correct_buttons(),
+                               is_disabled=True)
+        window.run()
+        return window.clicked
+
+    def show_solution(self):
+        buttons = ['New Question', 'Main Menu']
+        message = ('{}\n\n{}'.format(self.prompt, self.solution_text()))
+        if self.solution_table:
+            window = TableWindow(title=self.title, buttons=buttons,
+                                 msg=message, table=self.solution_table)
+        else:
+            window = SimpleWindow(title=self.title, buttons=buttons,
+                                  msg=message)
+        window.run()
+        return window.clicked
+
+
+class RadioLoop(loop.RadioLoop, QuestionLoop):
+    def get_answers(self, old_answers, old_correct_list):
+        the_question = RadioQuestion(title=self.title, msg=self.prompt,
+                                     questions=self.questions,
+                                     default_entry=old_answers,
+                                     colors=old_correct_list,
+                                     choices=self.choices)
+        the_question.run()
+        return the_question.user_entries
+
+
+def start(screen):
+    """Set up the curses screen and show the main menu
+
+    :param screen: curses window (from curses.wrapper)
+    :return: None
+    """
+    global SCREEN
+    SCREEN = screen
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass
+    if curses.has_colors():
+        curses.use_default_colors()
+        curses.init_pair(INCORRECT, curses.COLOR_RED, -1)
+    main.run()
+
+
+def run():
+    """Run the quiz program in the terminal
+
+    :return: None
+    """
+    os.environ.setdefault('ESCDELAY', '25')
+    frontend.use('tui')
+    curses.wrapper(start)
+
+
+if __name__ == "__main__":
+    # frontend imports this file as tui, so run that copy instead of __main__
+    import tui
+    tui.run()
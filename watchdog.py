@@ -0,0 +1,271 @@
+"""Opt-in leak watchdog for long-running sessions
+
+Kiosks run main.run() all day, so anything a screen leaves behind adds up.
+While a Watchdog is running, every screen shown (each gui or tui Window,
+and each bot step) is counted, and every few screens it samples traced
+memory together with the Tk roots, widgets and images still alive. The
+growth per 1000 screens is fitted over the samples and logged, and check()
+raises LeakError once it is over budget:
+
+    with watchdog.Watchdog(budget=200000):
+        main.run()
+
+soak() does the same headless with a bot.Bot, for use as a soak test:
+
+    python watchdog.py 20000
+
+Bounded structures still grow until they are full, which looks like a leak
+over a short run, so soak() builds the lazy cross tables up front and
+shrinks the shared caches while it runs.
+"""
+import collections
+import gc
+import logging
+import tracemalloc
+import weakref
+
+SAMPLE_EVERY = 200      # screens between samples
+MAX_SAMPLES = 500       # the oldest samples are dropped after this many
+WARMUP_SCREENS = 2000   # growth before this is the caches filling up
+SOAK_SCREENS = 20000
+SOAK_BUDGET = 20000     # bytes of growth allowed per 1000 screens
+SOAK_CACHE_SIZE = 64
+
+logger = logging.getLogger(__name__)
+
+_active = None
+
+Sample = collections.namedtuple('Sample', ['screens', 'memory', 'roots',
+                                           'widgets', 'images'])
+
+
+class LeakError(Exception):
+    pass
+
+
+def screen_shown(window=None):
+    """Tell the running Watchdog (if any) that a screen was shown
+
+    :param window: gui.Window or None (kept track of while it is alive)
+    :return: None
+    """
+    if _active is not None:
+        _active.screen(window)
+
+
+def count_widgets(widget):
+    """Count a Tk widget and everything inside it
+
+    :param widget: tkinter widget
+    :return: int
+    """
+    return 1 + sum(count_widgets(child)
+                   for child in list(widget.children.values()))
+
+
+def growth_rate(points):
+    """Least-squares slope of (x, y) points
+
+    :param points: list of (number, number)
+    :return: float (0.0 for fewer than two distinct x)
+    """
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+class Watchdog(object):
+    def __init__(self, budget=None, every=SAMPLE_EVERY,
+                 warmup=WARMUP_SCREENS, max_samples=MAX_SAMPLES):
+        """Sample memory and live Tk objects while screens are shown
+
+        :param budget: int or None (bytes of growth allowed per 1000
+            screens; None only logs)
+        :param every: int (screens between samples)
+        :param warmup: int (screens before growth is counted)
+        :param max_samples: int (samples kept)
+        """
+        self.budget = budget
+        self.every = every
+        self.warmup = warmup
+        self.max_samples = max_samples
+        self.screens = 0
+        self.samples = []
+        self.windows = weakref.WeakSet()
+        self.started_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start counting screens, and tracing memory if nobody else is
+
+        :return: None
+        """
+        global _active
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        _active = self
+        self.sample()
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def screen(self, window=None):
+        """Count a screen, sampling every self.every screens
+
+        :param window: gui.Window or None
+        :return: None
+        """
+        self.screens += 1
+        if window is not None:
+            self.windows.add(window)
+        if self.screens % self.every == 0:
+            self.sample()
+
+    def sample(self):
+        """Record memory and live Tk objects now, and log the trend
+
+        :return: Sample
+        """
+        gc.collect()    # only count what is still reachable
+        windows = list(self.windows)
+        roots = {id(window.root): window.root for window in windows
+                 if getattr(window, 'root', None) is not None}
+        the_sample = Sample(self.screens, tracemalloc.get_traced_memory()[0],
+                            len(roots),
+                            sum(count_widgets(root)
+                                for root in roots.values()),
+                            sum(len(getattr(window, 'images', ()))
+                                for window in windows))
+        self.samples.append(the_sample)
+        del self.samples[:-self.max_samples]
+        if len(self.samples) > 1:
+            level = logging.WARNING if self.over_budget() else logging.INFO
+            logger.log(level, '%d screens: %d bytes traced (%+.0f per 1000 '
+                       'screens), %d Tk roots, %d widgets, %d images',
+                       the_sample.screens, the_sample.memory,
+                       self.growth('memory'), the_sample.roots,
+                       the_sample.widgets, the_sample.images)
+        return the_sample
+
+    def growth(self, name):
+        """Fitted growth per 1000 screens after the warmup
+
+        :param name: string (a Sample field)
+        :return: float
+        """
+        return 1000 * growth_rate([(each.screens, getattr(each, name))
+                                   for each in self.samples
+                                   if each.screens >= self.warmup])
+
+    def over_budget(self):
+        return self.budget is not None and self.growth('memory') > self.budget
+
+    def check(self):
+        """Fail if memory grew faster than the budget
+
+        :return: None
+        :raises LeakError: if over budget
+        """
+        if self.over_budget():
+            raise LeakError('Memory grew {:.0f} bytes per 1000 screens (budget '
+                            '{}).'.format(self.growth('memory'), self.budget))
+
+    def report(self):
+        """Summarize the samples
+
+        :return: dict
+        """
+        last = self.samples[-1] if self.samples else Sample(0, 0, 0, 0, 0)
+        return {'screens': self.screens, 'samples': len(self.samples),
+                'budget': self.budget,
+                'memory': last.memory, 'roots': last.roots,
+                'widgets': last.widgets, 'images': last.images,
+                'growth_per_1000_screens': {
+                    name: self.growth(name)
+                    for name in ('memory', 'roots', 'widgets', 'images')}}
+
+
+def build_tables():
+    """Build every lazily built cross table now
+
+    :return: None
+    """
+    import inverse
+    import multi_allele
+    inverse.build_index()
+    for trait in multi_allele.MULTI_ALLELE_TRAITS:
+        multi_allele.get_cross_table(trait)
+
+
+def soak(target, screens=SOAK_SCREENS, budget=SOAK_BUDGET, seed=None,
+         cache_size=SOAK_CACHE_SIZE, **watchdog_args):
+    """Drive target headless with a bot and fail on memory growth
+
+    :param target: function (main.run, hardy_weinberg.run, ...)
+    :param screens: int (bot steps; each step is one screen)
+    :param budget: int (bytes allowed per 1000 screens)
+    :param seed: int or None (passed to the bot)
+    :param cache_size: int or None (size of the shared caches during the
+        run, so they fill up early; None leaves them alone)
+    :param watchdog_args: passed to Watchdog
+    :return: dict (see Watchdog.report)
+    :raises LeakError: if over budget
+    """
+    import bot
+    import cache
+    build_tables()
+    sizes = (cache.SOLUTIONS.max_size, cache.GRADES.max_size)
+    if cache_size is not None:
+        cache.resize_caches(cache_size, cache_size)
+    dog = Watchdog(budget=budget, **watchdog_args)
+    student = bot.Bot(max_steps=screens, seed=seed, record=False,
+                      on_screen=dog.screen)
+    try:
+        with dog:
+            student.drive(target, trace_memory=False)
+    finally:
+        cache.resize_caches(*sizes)
+    dog.check()
+    return dog.report()
+
+
+def main(argv):
+    """Soak test the main menu: python watchdog.py [screens]
+
+    :param argv: list of strings (command line arguments)
+    :return: int (exit status)
+    """
+    import json
+
+    import main as menu
+    screens = int(argv[1]) if len(argv) > 1 else SOAK_SCREENS
+    logging.basicConfig(level=logging.INFO)
+    try:
+        report = soak(menu.run, screens)
+    except LeakError as error:
+        print(error)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main(sys.argv))
@@ -0,0 +1,256 @@
+"""Printable worksheets and answer keys in HTML or LaTeX
+
+Problems are generated and rendered in chunks, in parallel across worker
+processes, and written to disk as soon as each chunk is ready. Chunks are
+written in order, so problem numbers are stable for any number of workers.
+"""
+import collections
+import concurrent.futures
+import html
+import itertools
+import os
+import random
+
+import bank
+import hardy_weinberg
+
+CHUNK_SIZE = 25
+
+HW_PROMPT = ('Assuming the population is at hardy-weinberg equilibrium, '
+             'report the requested values below as a proportion, rounding '
+             'to two decimal places.')
+
+# what PunnetSet.ask() shows for each question it asks (the dominance
+# question is asked once per trait)
+PUNNET_QUESTIONS = {
+    'parent_phenotype_question': ["What is mom's phenotype?",
+                                  "What is dad's phenotype?"],
+    'parent_genotype_question': ["What is mom's genotype?",
+                                 "What is dad's genotype?"],
+    'gamete_question': ['What eggs can mom make?',
+                        'What sperm can dad make?'],
+    'kid_genotype_question': ['What is the genotypic ratio of the '
+                              'offspring?'],
+    'kid_phenotype_question': ['What is the phenotypic ratio of the '
+                               'offspring?']}
+
+HTML_HEADER = ('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+               '<title>{title}</title>\n<style>\n'
+               '.problem {{page-break-inside: avoid; margin-bottom: 2em;}}\n'
+               '.text {{white-space: pre-wrap;}}\n'
+               'table {{border-collapse: collapse;}}\n'
+               'td {{border: 1px solid gray; padding: 4px; '
+               'text-align: center;}}\n'
+               '</style>\n</head>\n<body>\n<h1>{title}</h1>\n')
+HTML_FOOTER = '</body>\n</html>\n'
+
+LATEX_HEADER = ('\\documentclass{{article}}\n\\usepackage[utf8]{{inputenc}}\n'
+                '\\usepackage[margin=1in]{{geometry}}\n\\begin{{document}}\n'
+                '\\section*{{{title}}}\n')
+LATEX_FOOTER = '\\end{document}\n'
+
+# rendered sections hold text already in the worksheet's format
+Section = collections.namedtuple('Section', ['heading', 'text', 'table',
+                                             'rendered'],
+                                 defaults=(False,))
+
+
+def describe(problem, fmt='html'):
+    """Split a problem into the parts printed on a worksheet
+
+    :param problem: hardy_weinberg.Question or punnet.PunnetSet
+    :param fmt: string ('html' or 'latex')
+    :return: (string prompt, list of strings questions,
+        list of Sections answers)
+    """
+    if isinstance(problem, hardy_weinberg.Question):
+        names = ['p', 'q', 'p2', '_2pq', 'q2']
+        questions = [hardy_weinberg.terms[name][problem.term_type] + ':'
+                     for name in names]
+        answers = [Section('Answers', '\n'.join(
+            '{} {}'.format(question, problem.values[name])
+            for question, name in zip(questions, names)), None),
+                   Section('Solution', problem.render_solution(fmt), None,
+                           rendered=True)]
+        return problem.question + '\n\n' + HW_PROMPT, questions, answers
+
+    asked = [method.__name__ for method in problem.question_methods()]
+    questions = []
+    for name in asked:
+        if name == 'dom_type_question':
+            questions += ['How is {} inherited?'.format(trait['name'])
+                          for trait in problem.traits]
+        else:
+            questions += PUNNET_QUESTIONS[name]
+    parents = [problem.mom, problem.dad]
+    geno_ratio = ': '.join('{} {}'.format(num, geno)
+                           for geno, num in problem.kid_geno)
+    pheno_ratio = ': '.join('{} {}'.format(num, ' and '.join(sorted(pheno)))
+                            for pheno, num in problem.kid_pheno)
+    answers = [
+        Section('Type of dominance', problem.dom_type_solution().strip(),
+                None),
+        Section('Parents', '\n'.join(
+            '{}: {} ({})'.format(name, ''.join(parent.genotype),
+                                 ' and '.join(sorted(parent.phenotype)))
+            for name, parent in zip(['Mom', 'Dad'], parents)), None),
+        Section('Gametes', problem.gamete_solution().strip(), None)]
+    if 'kid_genotype_question' in asked:
+        answers.append(Section('Genotypic ratio', geno_ratio, problem.square))
+    answers.append(Section('Phenotypic ratio', pheno_ratio,
+                           problem.make_pheno_square(problem.square)))
+    return problem.info, questions, answers
+
+
+def html_table(table):
+    rows = []
+    for row in table:
+        cells = ''.join('<td>{}</td>'.format(
+            html.escape(cell).replace('\n', '<br>')) for cell in row)
+        rows.append('<tr>{}</tr>'.format(cells))
+    return '<table>\n{}\n</table>\n'.format('\n'.join(rows))
+
+
+def latex_table(table):
+    columns = len(table[0])
+    escape = hardy_weinberg.latex_escape
+    rows = [' & '.join('\\shortstack{{{}}}'.format(escape(cell))
+                       for cell in row) + ' \\\\ \\hline' for row in table]
+    return ('\\begin{{tabular}}{{|{}|}}\n\\hline\n{}\n\\end{{tabular}}\n'
+            ''.format('|'.join('c' * columns), '\n'.join(rows)))
+
+
+def render_html(number, problem):
+    """Render one problem and its answers as HTML
+
+    :param number: int (problem number shown to students)
+    :param problem: hardy_weinberg.Question or punnet.PunnetSet
+    :return: (string problem, string answer)
+    """
+    prompt, questions, answers = describe(problem, 'html')
+    sheet = ('<div class="problem">\n<h2>Problem {}</h2>\n'
+             '<p class="text">{}</p>\n<ol>\n{}\n</ol>\n</div>\n'
+             ''.format(number, html.escape(prompt), '\n'.join(
+                 '<li>{}<br><br></li>'.format(html.escape(question))
+                 for question in questions)))
+    key = ['<div class="problem">\n<h2>Problem {}</h2>\n'.format(number)]
+    for section in answers:
+        key.append('<h3>{}</h3>\n'.format(html.escape(section.heading)))
+        if section.rendered:
+            key.append(section.text)
+        else:
+            key.append('<p class="text">{}</p>\n'.format(
+                html.escape(section.text)))
+        if section.table:
+            key.append(html_table(section.table))
+    key.append('</div>\n')
+    return sheet, ''.join(key)
+
+
+def render_latex(number, problem):
+    """Render one problem and its answers as LaTeX
+
+    :param number: int (problem number shown to students)
+    :param problem: hardy_weinberg.Question or punnet.PunnetSet
+    :return: (string problem, string answer)
+    """
+    escape = hardy_weinberg.latex_escape
+    prompt, questions, answers = describe(problem, 'latex')
+    items = '\n'.join('\\item {}\\vspace{{2em}}'.format(escape(question))
+                      for question in questions)
+    sheet = ('\\subsection*{{Problem {}}}\n{}\n\\begin{{enumerate}}\n{}\n'
+             '\\end{{enumerate}}\n'.format(number, escape(prompt), items))
+    key = ['\\subsection*{{Problem {}}}\n'.format(number)]
+    for section in answers:
+        text = section.text if section.rendered else escape(section.text)
+        key.append('\\paragraph{{{}}}\n{}\n\n'.format(
+            escape(section.heading), text.rstrip('\n')))
+        if section.table:
+            key.append(latex_table(section.table))
+    return sheet, ''.join(key)
+
+
+FORMATS = {'html': (HTML_HEADER, HTML_FOOTER, render_html, html.escape),
+           'latex': (LATEX_HEADER, LATEX_FOOTER, render_latex,
+                     hardy_weinberg.latex_escape)}
+
+
+def render_chunk(fmt, start, count, seed):
+    """Generate and render problems start + 1 to start + count
+
+    :param fmt: string ('html' or 'latex')
+    :param start: int (problems before this chunk)
+    :param count: int
+    :param seed: string or int (worksheet seed; each problem has its own
+        stream, see bank.problem_rng)
+    :return: (string problems, string answers)
+    """
+    render = FORMATS[fmt][2]
+    sheets, keys = [], []
+    for problem_num in range(start, start + count):
+        problem = bank.random_problem(bank.problem_rng(seed, problem_num))
+        sheet, key = render(problem_num + 1, problem)
+        sheets.append(sheet)
+        keys.append(key)
+    return ''.join(sheets), ''.join(keys)
+
+
+def key_path_for(path):
+    """Name the answer key file that goes with a worksheet file
+
+    :param path: string
+    :return: string
+    """
+    root, extension = os.path.splitext(path)
+    return root + '_key' + extension
+
+
+def write_worksheet(path, count, fmt='html', title='BZ 111 Practice Problems',
+                    workers=None, chunk_size=CHUNK_SIZE, seed=None):
+    """Write count problems to a worksheet and a separate answer key
+
+    At most two chunks per worker are held in memory at once.
+
+    :param path: string (worksheet file; the key adds _key to the name)
+    :param count: int (number of problems)
+    :param fmt: string ('html' or 'latex')
+    :param title: string
+    :param workers: int or None (processes; 1 renders in this process)
+    :param chunk_size: int (problems rendered per task)
+    :param seed: string, int, or None (same seed gives the same worksheet)
+    :return: (string worksheet path, string answer key path)
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Format must be one of', sorted(FORMATS))
+    header, footer, _, escape = FORMATS[fmt]
+    key_path = key_path_for(path)
+    if seed is None:
+        seed = random.getrandbits(64)
+    chunks = ((fmt, start, min(chunk_size, count - start), seed)
+              for start in range(0, count, chunk_size))
+
+    with open(path, 'w', encoding='utf-8') as sheet_file, \
+            open(key_path, 'w', encoding='utf-8') as key_file:
+        sheet_file.write(header.format(title=escape(title)))
+        key_file.write(header.format(title=escape(title + ' Answer Key')))
+        if workers == 1:
+            for chunk in chunks:
+                sheets, keys = render_chunk(*chunk)
+                sheet_file.write(sheets)
+                key_file.write(keys)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+                pending = collections.deque()
+                in_flight = 2 * (workers or os.cpu_count() or 1)
+                for chunk in itertools.islice(chunks, in_flight):
+                    pending.append(pool.submit(render_chunk, *chunk))
+                while pending:
+                    sheets, keys = pending.popleft().result()
+                    sheet_file.write(sheets)
+                    key_file.write(keys)
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        pending.append(pool.submit(render_chunk, *chunk))
+        sheet_file.write(footer)
+        key_file.write(footer)
+    return path, key_path